@@ -2,7 +2,8 @@
  * Stock Exchange Pro - AI-Powered Trading Analysis Platform
  * ==========================================================
  * Features:
- * - Live market data with 5-second REST API polling (Finnhub)
+ * - Live market data pushed from the server's shared Finnhub poller
+ *   (falls back to 5-second browser polling when the server has no quote feed)
  * - AI Trading Council integration via WebSocket
  * - 11 specific market symbols (crypto, forex, stocks)
  * - Collapsible panels with minimize/maximize
@@ -224,6 +225,19 @@ class FinnhubAPI {
         };
     }
 
+    // Candles plus indicator series computed by the server (null if it has none)
+    async getServerCandles(symbol, resolution, from, to, indicators) {
+        try {
+            const params = new URLSearchParams({ resolution, start: from, end: to, indicators });
+            const res = await fetch(`${CONFIG.API_BASE_URL}/api/candles/${encodeURIComponent(symbol)}?${params}`);
+            const data = await res.json();
+            return data && data.t && data.t.length ? data : null;
+        } catch (e) {
+            console.error('Server candles error:', e);
+            return null;
+        }
+    }
+
     async getNews(category = 'general') {
         return this.fetch('/news', { category });
     }
@@ -245,6 +259,7 @@ class ChartManager {
         this.series = null;
         this.volumeSeries = null;
         this.indicators = {};
+        this.serverIndicators = null;
         this.chartType = 'candlestick';
     }
 
@@ -339,7 +354,30 @@ class ChartManager {
         }
     }
 
+    setServerIndicators(times, indicators) {
+        this.serverIndicators = times ? { times, indicators } : null;
+    }
+
+    addServerLine(name, values, color, options = {}) {
+        if (!this.serverIndicators || !values) return false;
+
+        const { times } = this.serverIndicators;
+        const points = [];
+        values.forEach((value, i) => {
+            if (value !== null) points.push({ time: times[i], value });
+        });
+        if (!points.length) return false;
+
+        const series = this.chart.addLineSeries({ color, lineWidth: 1, ...options });
+        series.setData(points);
+        this.indicators[name] = series;
+        return true;
+    }
+
     addMA(period, color) {
+        const server = this.serverIndicators?.indicators[`sma:${period}`];
+        if (server && this.addServerLine(`ma${period}`, server.sma, color)) return;
+
         if (!this.currentData || this.currentData.length < period) return;
 
         const maData = [];
@@ -356,6 +394,21 @@ class ChartManager {
         this.indicators[`ma${period}`] = maSeries;
     }
 
+    addBollinger(period = 20, width = 2) {
+        const bands = this.serverIndicators?.indicators[`bb:${period}:${width}`];
+        if (!bands) return;
+        this.addServerLine('bb-upper', bands.upper, 'rgba(0, 212, 255, 0.6)');
+        this.addServerLine('bb-middle', bands.middle, 'rgba(0, 212, 255, 0.3)');
+        this.addServerLine('bb-lower', bands.lower, 'rgba(0, 212, 255, 0.6)');
+    }
+
+    addRSI(period = 14) {
+        const rsi = this.serverIndicators?.indicators[`rsi:${period}`];
+        if (rsi && this.addServerLine('rsi', rsi.rsi, '#B388FF', { priceScaleId: 'rsi' })) {
+            this.chart.priceScale('rsi').applyOptions({ scaleMargins: { top: 0.8, bottom: 0 } });
+        }
+    }
+
     clearIndicators() {
         Object.values(this.indicators).forEach(s => this.chart.removeSeries(s));
         this.indicators = {};
@@ -375,6 +428,10 @@ class AICouncilManager {
         this.connected = false;
         this.reconnectAttempts = 0;
         this.maxReconnectAttempts = 5;
+        this.onQuotes = null;
+        this.onQuotesUnavailable = null;
+        this.onSentiment = null;
+        this.sentimentTopic = null;
     }
 
     connect() {
@@ -388,6 +445,8 @@ class AICouncilManager {
                 this.connected = true;
                 this.reconnectAttempts = 0;
                 this.updateStatus(true);
+                this.subscribeQuotes();
+                if (this.sentimentTopic) this.subscribeSentiment(this.sentimentTopic);
             };
 
             this.ws.onmessage = (event) => {
@@ -398,7 +457,9 @@ class AICouncilManager {
             this.ws.onclose = () => {
                 console.log('AI Council disconnected');
                 this.connected = false;
+                this.setSessionActive(false);
                 this.updateStatus(false);
+                this.onQuotesUnavailable?.();
                 this.attemptReconnect();
             };
 
@@ -436,16 +497,42 @@ class AICouncilManager {
         }
     }
 
+    updateModelStatus(models) {
+        const statusEl = document.getElementById('council-status');
+        if (!statusEl || !Array.isArray(models)) return;
+
+        const online = models.filter(m => m.online).length;
+        const indicator = statusEl.querySelector('.status-indicator');
+        indicator.className = `status-indicator ${online > 0 ? 'online' : 'offline'}`;
+        statusEl.querySelector('span:last-child').textContent =
+            online > 0 ? `AI Council Ready (${online}/${models.length} models)` : 'AI Models Unavailable';
+        statusEl.title = models
+            .map(m => `${m.name}: ${m.state}${m.latency_ms != null ? ` (${m.latency_ms} ms)` : ''}`)
+            .join('\n');
+    }
+
     handleMessage(data) {
+        // Quote frames are not chat traffic
+        if (data.type === 'quotes') {
+            this.onQuotes?.(data.data || []);
+            return;
+        }
+        if (data.type === 'quotes_unavailable') {
+            this.onQuotesUnavailable?.();
+            return;
+        }
+
         const chatContainer = document.getElementById('chat-messages');
         if (!chatContainer) return;
 
         switch (data.type) {
             case 'model_status':
-                console.log('Model status:', data.data);
+                this.updateModelStatus(data.data);
                 break;
 
             case 'council_started':
+                this.setSessionActive(true);
+                document.getElementById('council-queue-status')?.remove();
                 this.addSystemMessage(chatContainer, data.message);
                 break;
 
@@ -453,6 +540,10 @@ class AICouncilManager {
                 this.addThinkingMessage(chatContainer, data.model_name);
                 break;
 
+            case 'model_token':
+                this.appendModelToken(chatContainer, data.model_name, data.data);
+                break;
+
             case 'model_response':
                 this.replaceThinkingWithResponse(chatContainer, data.data);
                 break;
@@ -462,16 +553,49 @@ class AICouncilManager {
                 this.addSystemMessage(chatContainer, data.message);
                 break;
 
+            case 'ranking_complete':
+                if (data.data && data.data.rankings.length) {
+                    const top = data.data.rankings.slice(0, 3)
+                        .map(r => `${this.escapeHtml(r.model_name)} (${r.score}/10)`)
+                        .join(', ');
+                    this.addSystemMessage(chatContainer, `🏅 Peer rankings: ${top}`);
+                }
+                break;
+
+            case 'synthesis_token':
+                this.appendSynthesisToken(chatContainer, data.data);
+                break;
+
             case 'synthesis_complete':
                 this.addSynthesisMessage(chatContainer, data.data);
                 break;
 
             case 'council_complete':
+                this.setSessionActive(false);
                 this.addSystemMessage(chatContainer, data.message, 'success');
                 break;
 
+            case 'queue_position':
+                this.setSessionActive(true);
+                this.updateQueueStatus(chatContainer, data);
+                break;
+
+            case 'council_rejected':
+                this.setSessionActive(false);
+                this.addSystemMessage(chatContainer, data.message, 'error');
+                break;
+
+            case 'council_cancelled':
+                this.setSessionActive(false);
+                chatContainer.querySelectorAll('.chat-msg.thinking').forEach(el => el.remove());
+                document.getElementById('council-queue-status')?.remove();
+                document.getElementById('synthesis-streaming')?.remove();
+                this.addSystemMessage(chatContainer, data.message);
+                break;
+
             case 'news_sentiment':
                 this.handleNewsSentiment(data.data);
+                this.onSentiment?.(data.data);
                 break;
 
             case 'error':
@@ -506,6 +630,42 @@ class AICouncilManager {
         container.appendChild(msg);
     }
 
+    appendModelToken(container, modelName, chunk) {
+        const thinkingEl = document.getElementById(`thinking-${modelName.replace(/\s/g, '-')}`);
+        if (!thinkingEl) return;
+
+        const content = thinkingEl.querySelector('.chat-content');
+        if (!thinkingEl.dataset.streaming) {
+            thinkingEl.dataset.streaming = '1';
+            thinkingEl.streamedText = '';
+        }
+        thinkingEl.streamedText += chunk;
+        content.innerHTML = this.formatResponse(thinkingEl.streamedText);
+    }
+
+    appendSynthesisToken(container, chunk) {
+        let msg = document.getElementById('synthesis-streaming');
+        if (!msg) {
+            msg = document.createElement('div');
+            msg.className = 'chat-msg synthesis';
+            msg.id = 'synthesis-streaming';
+            msg.streamedText = '';
+            msg.innerHTML = `
+                <div class="chat-msg-header">
+                    <div class="chat-avatar" style="background:#FFD700">🏆</div>
+                    <div>
+                        <span class="chat-name">Council Synthesis</span>
+                        <span class="chat-specialty">Drafting...</span>
+                    </div>
+                </div>
+                <div class="chat-content" style="border-color:#FFD700; background: rgba(255,215,0,0.05);"></div>
+            `;
+            container.appendChild(msg);
+        }
+        msg.streamedText += chunk;
+        msg.querySelector('.chat-content').innerHTML = this.formatResponse(msg.streamedText);
+    }
+
     replaceThinkingWithResponse(container, data) {
         const thinkingId = `thinking-${data.model_name.replace(/\s/g, '-')}`;
         const thinkingEl = document.getElementById(thinkingId);
@@ -549,7 +709,13 @@ class AICouncilManager {
                 ${this.formatResponse(synthesis)}
             </div>
         `;
-        container.appendChild(msg);
+
+        const draft = document.getElementById('synthesis-streaming');
+        if (draft) {
+            draft.replaceWith(msg);
+        } else {
+            container.appendChild(msg);
+        }
     }
 
     formatResponse(text) {
@@ -593,6 +759,45 @@ class AICouncilManager {
         }));
     }
 
+    updateQueueStatus(container, data) {
+        let msg = document.getElementById('council-queue-status');
+        if (!msg) {
+            msg = document.createElement('div');
+            msg.className = 'chat-msg system-msg info';
+            msg.id = 'council-queue-status';
+            msg.innerHTML = '<div class="chat-content system"></div>';
+            container.appendChild(msg);
+        }
+        const wait = data.estimated_wait ? ` (about ${Math.ceil(data.estimated_wait)}s)` : '';
+        msg.querySelector('.chat-content').textContent = `${data.message}${wait}`;
+    }
+
+    subscribeQuotes() {
+        if (!this.connected) return;
+        this.ws.send(JSON.stringify({ action: 'subscribe_quotes' }));
+    }
+
+    // Follow one news topic: the server pushes a snapshot after each background refresh
+    subscribeSentiment(topic) {
+        const previous = this.sentimentTopic;
+        this.sentimentTopic = topic;
+        if (!this.connected) return;
+        if (previous && previous !== topic) {
+            this.ws.send(JSON.stringify({ action: 'unsubscribe_sentiment', topics: [previous] }));
+        }
+        this.ws.send(JSON.stringify({ action: 'subscribe_sentiment', topics: [topic] }));
+    }
+
+    cancelCouncil() {
+        if (!this.connected) return;
+        this.ws.send(JSON.stringify({ action: 'cancel_council' }));
+    }
+
+    setSessionActive(active) {
+        const cancelBtn = document.getElementById('cancel-council');
+        if (cancelBtn) cancelBtn.style.display = active ? '' : 'none';
+    }
+
     getNewsSentiment(topic) {
         if (!this.connected) return;
         this.ws.send(JSON.stringify({
@@ -719,10 +924,12 @@ class AlertsManager {
 class SentimentManager {
     constructor() {
         this.currentTopic = 'Bitcoin';
+        this.onTopicChange = null;
     }
 
     async analyzeTopic(topic) {
         this.currentTopic = topic;
+        this.onTopicChange?.(topic);
 
         // Update UI
         document.getElementById('voting-topic').textContent = `📊 Analyzing: ${topic}`;
@@ -753,6 +960,14 @@ class SentimentManager {
         }
     }
 
+    // Pushed snapshot from the server; only redraw if it is for the topic on screen
+    applyUpdate(data) {
+        const normalize = (topic) => (topic || '').toLowerCase().split(/\s+/).filter(Boolean).join(' ');
+        if (!data || !data.total || normalize(data.topic) !== normalize(this.currentTopic)) return;
+        document.getElementById('voting-date').textContent = new Date().toLocaleDateString();
+        this.displayResults(data);
+    }
+
     displayResults(data) {
         // Show voting stats
         document.getElementById('voting-stats').style.display = 'block';
@@ -937,6 +1152,7 @@ class StockExchangeApp {
 
         // AI Council
         document.getElementById('ask-council').addEventListener('click', () => this.askAI());
+        document.getElementById('cancel-council')?.addEventListener('click', () => this.aiCouncil.cancelCouncil());
         document.getElementById('ai-question').addEventListener('keypress', (e) => {
             if (e.key === 'Enter') this.askAI();
         });
@@ -976,7 +1192,9 @@ class StockExchangeApp {
             document.getElementById('ai-panel').classList.toggle('minimized');
         });
 
-        // Sentiment Analysis
+        // Sentiment Analysis: live updates for the selected topic arrive over the socket
+        this.sentiment.onTopicChange = (topic) => this.aiCouncil.subscribeSentiment(topic);
+        this.aiCouncil.onSentiment = (data) => this.sentiment.applyUpdate(data);
         document.getElementById('analyze-sentiment')?.addEventListener('click', () => {
             const topic = document.getElementById('news-topic').value.trim();
             if (topic) this.sentiment.analyzeTopic(topic);
@@ -1126,8 +1344,7 @@ class StockExchangeApp {
     }
 
     startMarketPolling() {
-        // Poll all market symbols
-        this.api.startPolling(ALL_SYMBOLS, (symbol, quote) => {
+        const onQuote = (symbol, quote) => {
             this.updateMarketCard(symbol, quote);
 
             // Update current symbol display if matches
@@ -1137,7 +1354,28 @@ class StockExchangeApp {
 
             // Check alerts
             this.alerts.check(symbol, quote.c);
-        });
+        };
+
+        // The server polls upstream once for everyone and pushes changed quotes;
+        // poll from the browser only while that feed is unavailable
+        this.aiCouncil.onQuotes = (quotes) => {
+            this.api.stopPolling();
+            this.api.updateConnectionStatus('Connected', true);
+            quotes.forEach(quote => {
+                this.api.lastQuotes.set(quote.symbol, quote);
+                onQuote(quote.symbol, quote);
+            });
+        };
+        this.aiCouncil.onQuotesUnavailable = () => {
+            if (!this.api.pollInterval) this.api.startPolling(ALL_SYMBOLS, onQuote);
+        };
+
+        // The socket may have opened before these handlers existed; ask again for a fresh snapshot
+        if (this.aiCouncil.connected) {
+            this.aiCouncil.subscribeQuotes();
+        } else if (!this.aiCouncil.ws || this.aiCouncil.ws.readyState !== WebSocket.CONNECTING) {
+            this.aiCouncil.onQuotesUnavailable();
+        }
     }
 
     updateMarketCard(symbol, quote) {
@@ -1258,9 +1496,13 @@ class StockExchangeApp {
             default: from = now - 604800; resolution = '15';
         }
 
-        const candles = await this.api.getCandles(this.currentSymbol, resolution, from, now);
+        // Prefer the server's candle store, which also returns the indicator series
+        const serverCandles = await this.api.getServerCandles(
+            this.currentSymbol, resolution, from, now, 'sma:20,sma:50,bb:20:2,rsi:14');
+        const candles = serverCandles || await this.api.getCandles(this.currentSymbol, resolution, from, now);
+        this.chart.setServerIndicators(serverCandles?.t, serverCandles?.indicators);
 
-        if (candles && candles.s === 'ok' && candles.t) {
+        if (candles && (candles.s === 'ok' || serverCandles) && candles.t) {
             const data = candles.t.map((t, i) => ({
                 time: t,
                 open: candles.o[i],
@@ -1322,6 +1564,12 @@ class StockExchangeApp {
                 this.chart.addMA(20, '#FFD700');
                 this.chart.addMA(50, '#00D4FF');
                 break;
+            case 'rsi':
+                this.chart.addRSI(14);
+                break;
+            case 'bb':
+                this.chart.addBollinger(20, 2);
+                break;
         }
     }
 
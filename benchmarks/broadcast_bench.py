@@ -0,0 +1,155 @@
+"""
+Broadcast Fan-out Benchmark
+===========================
+Simulates hundreds of WebSocket subscribers (a few of them slow or stalled)
+and compares the original sequential ``await send_json`` broadcast with the
+queued ConnectionManager: how long the broadcaster is blocked, and how soon
+healthy subscribers receive every message.
+
+Run with: python benchmarks/broadcast_bench.py [--subscribers 500] [--messages 50]
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from server import ConnectionManager, encode_message  # noqa: E402
+
+
+class FakeWebSocket:
+    """Stands in for starlette's WebSocket with a configurable per-send latency"""
+
+    def __init__(self, latency=0.0, stalled=False):
+        self.latency = latency
+        self.stalled = stalled
+        self.received = 0
+        self.done = asyncio.Event()
+        self.expected = 0
+
+    async def accept(self):
+        pass
+
+    async def close(self, code=1000):
+        pass
+
+    async def _deliver(self):
+        if self.stalled:
+            await asyncio.sleep(3600)
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        self.received += 1
+        if self.received >= self.expected:
+            self.done.set()
+
+    async def send_text(self, text):
+        await self._deliver()
+
+    async def send_json(self, message):
+        encode_message(message)  # starlette serializes per call
+        await self._deliver()
+
+
+def make_subscribers(count, slow, stalled, expected):
+    sockets = []
+    for i in range(count):
+        if i < stalled:
+            ws = FakeWebSocket(stalled=True)
+        elif i < stalled + slow:
+            ws = FakeWebSocket(latency=0.01)
+        else:
+            ws = FakeWebSocket()
+        ws.expected = expected
+        sockets.append(ws)
+    return sockets
+
+
+async def legacy_broadcast(sockets, message):
+    """The original implementation: one awaited send per connection, in turn"""
+    for connection in sockets:
+        try:
+            await connection.send_json(message)
+        except Exception:
+            pass
+
+
+async def run_legacy(sockets, messages, payload, timeout):
+    healthy = [ws for ws in sockets if not ws.stalled]
+    start = time.perf_counter()
+    blocked = 0.0
+
+    async def producer():
+        nonlocal blocked
+        for i in range(messages):
+            t0 = time.perf_counter()
+            await legacy_broadcast(sockets, {"type": "news_sentiment", "seq": i, "data": payload})
+            blocked += time.perf_counter() - t0
+
+    task = asyncio.create_task(producer())
+    try:
+        await asyncio.wait_for(asyncio.gather(*(ws.done.wait() for ws in healthy)), timeout)
+        delivered = time.perf_counter() - start
+    except asyncio.TimeoutError:
+        delivered = None
+    if not task.done():
+        blocked = None  # still stuck inside a broadcast
+        task.cancel()
+    return blocked, delivered
+
+
+async def run_queued(sockets, messages, payload, timeout):
+    manager = ConnectionManager()
+    for ws in sockets:
+        await manager.connect(ws)
+    for channel in manager.channels.values():
+        channel.send_timeout = 1.0
+    healthy = [ws for ws in sockets if not ws.stalled]
+    start = time.perf_counter()
+    blocked = 0.0
+    for i in range(messages):
+        t0 = time.perf_counter()
+        await manager.broadcast({"type": "news_sentiment", "seq": i, "data": payload})
+        blocked += time.perf_counter() - t0
+    try:
+        await asyncio.wait_for(asyncio.gather(*(ws.done.wait() for ws in healthy)), timeout)
+        delivered = time.perf_counter() - start
+    except asyncio.TimeoutError:
+        delivered = None
+    await asyncio.sleep(1.2)  # let stalled writers hit their send timeout
+    stats = manager.stats()
+    for ws in list(manager.channels):
+        manager.disconnect(ws)
+    return blocked, delivered, stats
+
+
+def fmt(seconds):
+    return "   timed out" if seconds is None else f"{seconds * 1000:9.1f} ms"
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--subscribers", type=int, default=500)
+    parser.add_argument("--messages", type=int, default=50)
+    parser.add_argument("--slow", type=int, default=5, help="subscribers with 10 ms per send")
+    parser.add_argument("--stalled", type=int, default=1, help="subscribers that never finish a send")
+    parser.add_argument("--timeout", type=float, default=10.0)
+    args = parser.parse_args()
+
+    payload = {"topic": "Bitcoin", "articles": [{"title": "Bitcoin rallies " * 4, "vote": "AGREE"}] * 10}
+    print(f"{args.subscribers} subscribers ({args.slow} slow, {args.stalled} stalled), {args.messages} messages")
+
+    sockets = make_subscribers(args.subscribers, args.slow, args.stalled, args.messages)
+    blocked, delivered = await run_legacy(sockets, args.messages, payload, args.timeout)
+    print(f"  legacy  broadcaster blocked {fmt(blocked)}   healthy clients complete {fmt(delivered)}")
+
+    sockets = make_subscribers(args.subscribers, args.slow, args.stalled, args.messages)
+    blocked, delivered, stats = await run_queued(sockets, args.messages, payload, args.timeout)
+    print(f"  queued  broadcaster blocked {fmt(blocked)}   healthy clients complete {fmt(delivered)}")
+    print(f"  queued  manager stats after run: {stats}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
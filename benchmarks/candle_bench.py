@@ -0,0 +1,118 @@
+"""
+Candle Store Benchmark
+======================
+Times the NumPy indicator engine on a long synthetic series: a full
+computation of every indicator, the per-bar cost of incremental updates as
+new bars arrive, and the original browser-style moving average loop for
+comparison (on a slice, since it is O(bars x period)).
+
+Run with: python benchmarks/candle_bench.py [--bars 1000000]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from server import CandleSeries, CandleStore, parse_indicator  # noqa: E402
+
+SPECS = "sma:20,sma:50,ema:20,bb:20:2,rsi:14,macd:12:26:9,atr:14"
+
+
+def make_bars(count, seed=7):
+    rng = np.random.default_rng(seed)
+    close = 100 + np.cumsum(rng.normal(0, 0.5, count))
+    spread = rng.random(count)
+    return {
+        "t": np.arange(count, dtype=np.int64) * 60,
+        "o": close + rng.normal(0, 0.1, count),
+        "h": close + spread,
+        "l": close - spread,
+        "c": close,
+        "v": rng.random(count) * 1000
+    }
+
+
+def legacy_sma(closes, period):
+    """The original addMA loop from app.js"""
+    result = []
+    for i in range(period - 1, len(closes)):
+        total = 0
+        for j in range(period):
+            total += closes[i - j]
+        result.append(total / period)
+    return result
+
+
+def timed(fn, repeat=3):
+    best = float("inf")
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def full_series(bars, specs):
+    series = CandleSeries(max_bars=len(bars["t"]))
+    series.merge(bars["t"], bars["o"], bars["h"], bars["l"], bars["c"], bars["v"])
+    for spec in specs:
+        series.indicator(spec)
+    return series
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--bars", type=int, default=1_000_000)
+    parser.add_argument("--appends", type=int, default=2000)
+    parser.add_argument("--legacy-bars", type=int, default=100_000)
+    args = parser.parse_args()
+
+    bars = make_bars(args.bars)
+    specs = [parse_indicator(spec) for spec in SPECS.split(",")]
+
+    print(f"{args.bars} bars, indicators: {SPECS}")
+    full_time, series = timed(lambda: full_series(bars, specs))
+    print(f"  load + all indicators     : {full_time * 1000:9.1f} ms")
+    for spec in specs:
+        spec_time, _ = timed(lambda: full_series(bars, [spec]))
+        print(f"    {spec.key:<22}: {spec_time * 1000:9.1f} ms (incl. load)")
+
+    # Incremental: the series already covers bars[:-appends]; feed the rest one bar at a time
+    head = args.bars - args.appends
+    partial = CandleSeries(max_bars=args.bars)
+    partial.merge(*(bars[name][:head] for name in CandleSeries.COLUMNS))
+    for spec in specs:
+        partial.indicator(spec)
+    start = time.perf_counter()
+    for i in range(head, args.bars):
+        partial.merge(*(bars[name][i:i + 1] for name in CandleSeries.COLUMNS))
+        for spec in specs:
+            partial.indicator(spec)
+    per_bar = (time.perf_counter() - start) / args.appends
+    print(f"  incremental new bar       : {per_bar * 1e6:9.1f} us per bar (all indicators)")
+    print(f"  full recompute per bar    : {full_time * 1e6:9.1f} us per bar")
+
+    drift = max(
+        float(np.nanmax(np.abs(series.indicator(spec)[name] - partial.indicator(spec)[name])))
+        for spec in specs for name in spec.outputs
+    )
+    print(f"  incremental vs full drift : {drift:.2e}")
+
+    payload_time, payload = timed(lambda: CandleStore.payload(series, specs, limit=5000))
+    print(f"  payload (5000 bars)       : {payload_time * 1000:9.1f} ms")
+
+    closes = bars["c"][:args.legacy_bars].tolist()
+    legacy_time, _ = timed(lambda: legacy_sma(closes, 50), repeat=1)
+    sma_time, _ = timed(lambda: full_series({k: v[:args.legacy_bars] for k, v in bars.items()}, [specs[1]]))
+    print(f"  legacy SMA(50) loop       : {legacy_time * 1000:9.1f} ms for {args.legacy_bars} bars")
+    print(f"  vectorized SMA(50)        : {sma_time * 1000:9.1f} ms for {args.legacy_bars} bars")
+
+
+if __name__ == "__main__":
+    main()
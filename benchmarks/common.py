@@ -0,0 +1,76 @@
+"""
+Benchmark Helpers
+=================
+Timing, latency percentiles and JSON result files shared by the benchmark
+scripts, so runs can be saved and compared against a baseline.
+"""
+
+import json
+import platform
+import sys
+import time
+from datetime import datetime
+
+
+def timed(fn, repeat=3):
+    best = float("inf")
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def percentiles(samples):
+    """Summary of latency samples (seconds) in milliseconds"""
+    if not samples:
+        return {"count": 0}
+    ordered = sorted(samples)
+
+    def rank(p):
+        return ordered[min(len(ordered) - 1, max(0, int(round(p / 100 * len(ordered) + 0.5)) - 1))] * 1000
+
+    return {
+        "count": len(ordered),
+        "mean_ms": round(sum(ordered) / len(ordered) * 1000, 3),
+        "p50_ms": round(rank(50), 3),
+        "p95_ms": round(rank(95), 3),
+        "p99_ms": round(rank(99), 3),
+        "max_ms": round(ordered[-1] * 1000, 3)
+    }
+
+
+def write_results(path, name, results, config=None):
+    document = {
+        "benchmark": name,
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "config": config or {},
+        "results": results
+    }
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(document, f, indent=2)
+    print(f"\nResults written to {path}")
+
+
+def _numbers(tree, prefix=""):
+    if isinstance(tree, dict):
+        for key, value in tree.items():
+            yield from _numbers(value, f"{prefix}.{key}" if prefix else str(key))
+    elif isinstance(tree, (int, float)) and not isinstance(tree, bool):
+        yield prefix, tree
+
+
+def compare(results, baseline_path):
+    """Print every numeric result next to the same entry in a saved run"""
+    with open(baseline_path, encoding="utf-8") as f:
+        baseline = dict(_numbers(json.load(f).get("results", {})))
+    print(f"\nCompared with {baseline_path}:")
+    for key, value in _numbers(results):
+        if key not in baseline:
+            continue
+        before = baseline[key]
+        change = f"{(value - before) / before * 100:+7.1f}%" if before else "    n/a"
+        print(f"  {key:<48} {before:>12.3f} -> {value:>12.3f}  {change}")
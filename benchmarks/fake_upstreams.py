@@ -0,0 +1,135 @@
+"""
+Fake Upstreams
+==============
+Local stand-ins for the services the server depends on, so benchmarks run
+without Ollama cloud models or Google News:
+
+- Ollama: ``/api/generate`` (NDJSON streaming or a single JSON reply) and
+  ``/api/tags``. Latency before the first token, per-token delay, reply
+  length and error rate are configurable. Peer-ranking prompts get a valid
+  JSON ranking back.
+- RSS: ``/rss/search`` returns a Google-News-shaped feed after a delay.
+
+Run with: python benchmarks/fake_upstreams.py [--ollama-port 11500 --rss-port 11501 --latency 0.5]
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import re
+
+import uvicorn
+from fastapi import FastAPI
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+
+HEADLINES = [
+    "{q} surges to record high as buyers return",
+    "{q} slumps on rate fears and weak demand",
+    "Analysts see {q} holding steady ahead of data",
+    "{q} rally extends as growth beats forecasts",
+    "Investors worried about a {q} selloff",
+    "{q} outlook upgraded after strong quarter",
+    "{q} drops as traders take profit",
+    "What the latest report means for {q}"
+]
+
+
+def make_ollama_app(latency=0.5, token_delay=0.02, tokens=40, error_rate=0.0):
+    app = FastAPI()
+    words = "the market shows mixed signals with momentum building while risk remains elevated".split()
+
+    def reply_words(model, prompt):
+        if "Rate EACH response" in prompt:
+            names = re.findall(r"\*\*(.+?)\*\*", prompt)
+            ranking = {
+                "rankings": [{"model_name": n, "score": random.randint(4, 9), "reason": "clear"} for n in names],
+                "best_insight": "manage position size"
+            }
+            return ["```json\n", json.dumps(ranking), "\n```"]
+        return [f"{model}:"] + [random.choice(words) for _ in range(tokens)]
+
+    @app.post("/api/generate")
+    async def generate(body: dict):
+        if error_rate and random.random() < error_rate:
+            return JSONResponse({"error": "simulated failure"}, status_code=500)
+        model = body.get("model", "")
+        parts = reply_words(model, body.get("prompt", ""))
+        await asyncio.sleep(latency)
+        if not body.get("stream", True):
+            await asyncio.sleep(token_delay * len(parts))
+            return {"model": model, "response": " ".join(parts), "done": True}
+
+        async def stream():
+            for part in parts:
+                yield json.dumps({"model": model, "response": part + " ", "done": False}) + "\n"
+                await asyncio.sleep(token_delay)
+            yield json.dumps({"model": model, "response": "", "done": True, "eval_count": len(parts)}) + "\n"
+
+        return StreamingResponse(stream(), media_type="application/x-ndjson")
+
+    @app.get("/api/tags")
+    async def tags():
+        return {"models": []}
+
+    return app
+
+
+def make_rss_feed(query, items):
+    parts = ['<?xml version="1.0" encoding="UTF-8"?><rss version="2.0"><channel><title>Fake News</title>']
+    for i in range(items):
+        title = random.choice(HEADLINES).format(q=query or "Markets")
+        parts.append(
+            f"<item><title>{title} #{i}</title><link>https://news.example.com/{i}</link>"
+            f"<pubDate>Mon, 05 Jan 2026 12:00:00 GMT</pubDate>"
+            f"<source url=\"https://source{i % 12}.example.com\">Source {i % 12}</source></item>"
+        )
+    parts.append("</channel></rss>")
+    return "".join(parts)
+
+
+def make_rss_app(latency=0.3, items=100):
+    app = FastAPI()
+
+    @app.get("/rss/search")
+    async def search(q: str = ""):
+        await asyncio.sleep(latency)
+        query = q.split(" when:")[0]
+        return Response(make_rss_feed(query, items), media_type="application/rss+xml")
+
+    return app
+
+
+async def serve(ollama_port, rss_port, args):
+    servers = [
+        uvicorn.Server(uvicorn.Config(
+            make_ollama_app(args.latency, args.token_delay, args.tokens, args.error_rate),
+            host="127.0.0.1", port=ollama_port, log_level="warning")),
+        uvicorn.Server(uvicorn.Config(
+            make_rss_app(args.rss_latency, args.rss_items),
+            host="127.0.0.1", port=rss_port, log_level="warning"))
+    ]
+    await asyncio.gather(*(server.serve() for server in servers))
+
+
+def add_arguments(parser):
+    parser.add_argument("--latency", type=float, default=0.5, help="seconds before the first token")
+    parser.add_argument("--token-delay", type=float, default=0.02)
+    parser.add_argument("--tokens", type=int, default=40)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--rss-latency", type=float, default=0.3)
+    parser.add_argument("--rss-items", type=int, default=100)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--ollama-port", type=int, default=11500)
+    parser.add_argument("--rss-port", type=int, default=11501)
+    add_arguments(parser)
+    args = parser.parse_args()
+    print(f"Fake Ollama on :{args.ollama_port}, fake RSS on :{args.rss_port}")
+    asyncio.run(serve(args.ollama_port, args.rss_port, args))
+
+
+if __name__ == "__main__":
+    main()
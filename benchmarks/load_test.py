@@ -0,0 +1,312 @@
+"""
+End-to-End Load Test
+====================
+Starts the fake Ollama / RSS upstreams and ``server:app`` in child
+processes, then drives concurrent traffic against the server:
+
+- council: WebSocket ``start_council`` sessions (time to first token and to
+  council_complete)
+- ws_sentiment: WebSocket ``get_news_sentiment`` requests
+- http_news: ``GET /api/news/{topic}`` requests
+
+Each scenario reports p50/p95/p99 latency, throughput, errors and the
+server's event-loop lag over the run (sampled inside the server process).
+
+Run with: python benchmarks/load_test.py [--sessions 24 --council-clients 8]
+          [--json results.json] [--compare baseline.json]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import time
+
+import httpx
+import websockets
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BENCH_DIR)
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+
+from common import compare, percentiles, write_results  # noqa: E402
+from fake_upstreams import add_arguments as add_upstream_arguments  # noqa: E402
+
+TOPICS = ["Bitcoin", "Ethereum", "Solana", "Gold price", "EUR USD", "USD JPY",
+          "NVIDIA stock", "Alphabet stock", "Amazon stock", "Apple stock", "Tesla stock"]
+
+
+# ---- server side (child process) ----
+
+class LoopLagProbe:
+    """Samples how late a short sleep wakes up on the server's event loop"""
+
+    def __init__(self, interval=0.01):
+        self.interval = interval
+        self.samples = []
+
+    async def run(self):
+        while True:
+            start = time.perf_counter()
+            await asyncio.sleep(self.interval)
+            self.samples.append(max(0.0, time.perf_counter() - start - self.interval))
+
+    def stats(self, reset=False):
+        result = percentiles(self.samples)
+        if reset:
+            self.samples = []
+        return result
+
+
+async def serve(port):
+    import uvicorn
+    import server
+
+    probe = LoopLagProbe()
+
+    async def lag(reset: bool = False):
+        return probe.stats(reset)
+
+    server.app.add_api_route("/__bench/lag", lag, methods=["GET"])
+    task = asyncio.create_task(probe.run())
+    try:
+        await uvicorn.Server(uvicorn.Config(server.app, host="127.0.0.1", port=port, log_level="warning")).serve()
+    finally:
+        task.cancel()
+
+
+# ---- load generator ----
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+async def run_pool(workers, total, operation):
+    """Run ``operation(i)`` ``total`` times across ``workers`` tasks; collect latencies and errors"""
+    latencies, extra, errors = [], [], []
+    counter = iter(range(total))
+
+    async def worker():
+        for i in counter:
+            start = time.perf_counter()
+            try:
+                detail = await operation(i)
+                latencies.append(time.perf_counter() - start)
+                if detail is not None:
+                    extra.append(detail)
+            except Exception as e:
+                errors.append(f"{type(e).__name__}: {e}")
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(workers)))
+    wall = time.perf_counter() - start
+    return latencies, extra, errors, wall
+
+
+async def council_scenario(base_ws, args):
+    sockets = [await websockets.connect(f"{base_ws}/ws", max_size=None) for _ in range(args.council_clients)]
+    free = asyncio.Queue()
+    for ws in sockets:
+        await ws.recv()  # initial model_status
+        free.put_nowait(ws)
+
+    async def session(i):
+        ws = await free.get()
+        try:
+            start = time.perf_counter()
+            first_token = None
+            await ws.send(json.dumps({"action": "start_council", "question": f"Load test question {i}: outlook?"}))
+            while True:
+                message = json.loads(await asyncio.wait_for(ws.recv(), args.timeout))
+                kind = message.get("type")
+                if kind == "model_token" and first_token is None:
+                    first_token = time.perf_counter() - start
+                elif kind == "council_complete":
+                    return first_token
+                elif kind in ("council_rejected", "council_cancelled", "error"):
+                    raise RuntimeError(message.get("message", kind))
+        finally:
+            free.put_nowait(ws)
+
+    try:
+        latencies, first_tokens, errors, wall = await run_pool(args.council_clients, args.sessions, session)
+    finally:
+        for ws in sockets:
+            await ws.close()
+    return {"latency": latencies, "first_token": first_tokens, "errors": errors, "wall": wall}
+
+
+async def ws_sentiment_scenario(base_ws, args):
+    sockets = [await websockets.connect(f"{base_ws}/ws", max_size=None) for _ in range(args.concurrency)]
+    free = asyncio.Queue()
+    for ws in sockets:
+        await ws.recv()
+        free.put_nowait(ws)
+
+    async def request(i):
+        ws = await free.get()
+        try:
+            await ws.send(json.dumps({"action": "get_news_sentiment", "topic": random.choice(TOPICS)}))
+            while True:
+                message = json.loads(await asyncio.wait_for(ws.recv(), args.timeout))
+                if message.get("type") == "news_sentiment":
+                    return None
+                if message.get("type") == "error":
+                    raise RuntimeError(message.get("message"))
+        finally:
+            free.put_nowait(ws)
+
+    try:
+        latencies, _, errors, wall = await run_pool(args.concurrency, args.sentiment_requests, request)
+    finally:
+        for ws in sockets:
+            await ws.close()
+    return {"latency": latencies, "errors": errors, "wall": wall}
+
+
+async def http_news_scenario(base_http, args):
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=base_http, timeout=args.timeout, limits=limits) as client:
+        async def request(i):
+            response = await client.get(f"/api/news/{random.choice(TOPICS)}")
+            data = response.json()
+            if response.status_code != 200 or "error" in data:
+                raise RuntimeError(data.get("error", response.status_code))
+
+        latencies, _, errors, wall = await run_pool(args.concurrency, args.http_requests, request)
+    return {"latency": latencies, "errors": errors, "wall": wall}
+
+
+def summarize(raw, lag):
+    result = {
+        "completed": len(raw["latency"]),
+        "errors": len(raw["errors"]),
+        "wall_s": round(raw["wall"], 3),
+        "throughput_rps": round(len(raw["latency"]) / raw["wall"], 2) if raw["wall"] else 0,
+        "latency": percentiles(raw["latency"]),
+        "loop_lag": lag
+    }
+    if raw.get("first_token"):
+        result["first_token"] = percentiles(raw["first_token"])
+    if raw["errors"]:
+        result["sample_errors"] = raw["errors"][:3]
+    return result
+
+
+def print_summary(name, result):
+    lat, lag = result["latency"], result["loop_lag"]
+    print(f"\n{name}: {result['completed']} ok, {result['errors']} errors in {result['wall_s']} s "
+          f"({result['throughput_rps']} req/s)")
+    if lat.get("count"):
+        print(f"  latency      p50 {lat['p50_ms']:9.1f}  p95 {lat['p95_ms']:9.1f}  p99 {lat['p99_ms']:9.1f} ms")
+    if result.get("first_token"):
+        ft = result["first_token"]
+        print(f"  first token  p50 {ft['p50_ms']:9.1f}  p95 {ft['p95_ms']:9.1f}  p99 {ft['p99_ms']:9.1f} ms")
+    if lag.get("count"):
+        print(f"  loop lag     p50 {lag['p50_ms']:9.2f}  p99 {lag['p99_ms']:9.2f}  max {lag['max_ms']:9.2f} ms")
+    for error in result.get("sample_errors", []):
+        print(f"  error: {error}")
+
+
+async def run_load(args, port):
+    base_http, base_ws = f"http://127.0.0.1:{port}", f"ws://127.0.0.1:{port}"
+    scenarios = {
+        "council": lambda: council_scenario(base_ws, args),
+        "ws_sentiment": lambda: ws_sentiment_scenario(base_ws, args),
+        "http_news": lambda: http_news_scenario(base_http, args)
+    }
+    results = {}
+    async with httpx.AsyncClient(base_url=base_http, timeout=10) as control:
+        for name in args.scenarios.split(","):
+            await control.get("/__bench/lag", params={"reset": True})
+            raw = await scenarios[name]()
+            lag = (await control.get("/__bench/lag", params={"reset": True})).json()
+            results[name] = summarize(raw, lag)
+            print_summary(name, results[name])
+    return results
+
+
+def wait_ready(url, timeout=30):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            if httpx.get(url, timeout=1).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError(f"{url} did not come up")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenarios", default="council,ws_sentiment,http_news")
+    parser.add_argument("--sessions", type=int, default=24, help="council sessions in total")
+    parser.add_argument("--council-clients", type=int, default=8)
+    parser.add_argument("--sentiment-requests", type=int, default=300)
+    parser.add_argument("--http-requests", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--timeout", type=float, default=120)
+    parser.add_argument("--server-env", action="append", default=[], metavar="KEY=VALUE",
+                        help="extra environment for the server process (repeatable)")
+    parser.add_argument("--json", help="write results to this file")
+    parser.add_argument("--compare", help="print changes against a saved results file")
+    parser.add_argument("--serve", type=int, help=argparse.SUPPRESS)
+    add_upstream_arguments(parser)
+    args = parser.parse_args()
+
+    if args.serve:
+        asyncio.run(serve(args.serve))
+        return
+
+    ollama_port, rss_port, server_port = free_port(), free_port(), free_port()
+    upstream_args = [
+        "--ollama-port", str(ollama_port), "--rss-port", str(rss_port),
+        "--latency", str(args.latency), "--token-delay", str(args.token_delay), "--tokens", str(args.tokens),
+        "--error-rate", str(args.error_rate), "--rss-latency", str(args.rss_latency),
+        "--rss-items", str(args.rss_items)
+    ]
+    # Every load client connects from 127.0.0.1, so per-client quotas are lifted to the global limits
+    env = dict(
+        os.environ,
+        OLLAMA_BASE_URL=f"http://127.0.0.1:{ollama_port}",
+        NEWS_RSS_URL=f"http://127.0.0.1:{rss_port}/rss/search",
+        CONVERSATION_DB_PATH="", SENTIMENT_HISTORY_DIR="", RESPONSE_CACHE_PATH="",
+        SENTIMENT_REFRESH_INTERVAL="0", QUOTE_POLL_INTERVAL="0", HEALTH_PROBE_INTERVAL="0",
+        COUNCIL_MAX_SESSIONS=str(args.council_clients), COUNCIL_SESSIONS_PER_CLIENT=str(args.council_clients),
+        COUNCIL_MAX_QUEUE="1000", MODEL_CALL_BUDGET="64", MODEL_CALLS_PER_CLIENT="64"
+    )
+    for item in args.server_env:
+        key, _, value = item.partition("=")
+        env[key] = value
+
+    processes = [
+        subprocess.Popen([sys.executable, os.path.join(BENCH_DIR, "fake_upstreams.py"), *upstream_args]),
+        subprocess.Popen([sys.executable, os.path.abspath(__file__), "--serve", str(server_port)],
+                         env=env, cwd=os.path.dirname(BENCH_DIR))
+    ]
+    try:
+        wait_ready(f"http://127.0.0.1:{ollama_port}/api/tags")
+        wait_ready(f"http://127.0.0.1:{server_port}/api/health")
+        results = asyncio.run(run_load(args, server_port))
+    finally:
+        for process in processes:
+            process.terminate()
+        for process in processes:
+            process.wait(timeout=10)
+
+    config = {k: v for k, v in vars(args).items() if k not in ("json", "compare", "serve")}
+    if args.json:
+        write_results(args.json, "load_test", results, config)
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == "__main__":
+    main()
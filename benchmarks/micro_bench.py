@@ -0,0 +1,168 @@
+"""
+Micro-Benchmarks
+================
+Times the hot in-process paths without any network:
+
+- SentimentAnalyzer.analyze (per headline) and analyze_many (batch)
+- NewsAgent._parse_xml on a Google-News-shaped feed (capped and full)
+- ConversationDatabase: add_conversation, batched SQLite flush,
+  get_context_summary and paginated get_history
+- PromptCompactor on a council's worth of overlapping answers (time and
+  size reduction at the default synthesis budget)
+
+Run with: python benchmarks/micro_bench.py [--json results.json] [--compare baseline.json]
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import sys
+import tempfile
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BENCH_DIR)
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+
+from common import compare, timed, write_results  # noqa: E402
+from fake_upstreams import make_rss_feed  # noqa: E402
+from server import (  # noqa: E402
+    AI_COUNCIL, COLLABORATION_PROMPT, SYNTHESIS_PROMPT_TOKENS, ConversationDatabase, NewsAgent, PromptCompactor,
+    SentimentAnalyzer, estimate_tokens
+)
+
+
+def bench_sentiment(count):
+    rng = random.Random(7)
+    vocabulary = ["Bitcoin", "stocks", "gold", "yen", "traders", "market", "report", "after", "the", "on"]
+    vocabulary += SentimentAnalyzer.BULLISH_KEYWORDS + SentimentAnalyzer.BEARISH_KEYWORDS
+    headlines = [" ".join(rng.choice(vocabulary) for _ in range(rng.randint(6, 14))) for _ in range(count)]
+    analyzer = SentimentAnalyzer()
+    analyzer.analyze(headlines[0])  # compile outside the timed region
+    single, _ = timed(lambda: [analyzer.analyze(h) for h in headlines])
+    batch, _ = timed(lambda: analyzer.analyze_many(headlines))
+    return {
+        "headlines": count,
+        "analyze_us_per_headline": round(single / count * 1e6, 3),
+        "analyze_many_us_per_headline": round(batch / count * 1e6, 3)
+    }
+
+
+def bench_parse_xml(items):
+    feed = make_rss_feed("Bitcoin", items).encode("utf-8")
+    agent = NewsAgent("Bitcoin")
+    capped, articles = timed(lambda: agent._parse_xml(feed, max_articles=100))
+    full, everything = timed(lambda: agent._parse_xml(feed))
+    return {
+        "items": items,
+        "feed_bytes": len(feed),
+        "capped_100_ms": round(capped * 1000, 3),
+        "full_ms": round(full * 1000, 3),
+        "full_us_per_item": round(full / max(1, len(everything)) * 1e6, 3)
+    }
+
+
+async def bench_conversation_db(entries):
+    responses = [
+        {"model_id": m["id"], "model_name": m["name"], "response": "Momentum is building; watch support. " * 8,
+         "success": True}
+        for m in AI_COUNCIL
+    ]
+    with tempfile.TemporaryDirectory() as directory:
+        db = ConversationDatabase(path=os.path.join(directory, "bench.db"), flush_interval=3600)
+        await db.start()
+        try:
+            start = time.perf_counter()
+            for i in range(entries):
+                await db.add_conversation(f"Question {i}?", responses, "Synthesis text " * 40)
+            add = time.perf_counter() - start
+
+            start = time.perf_counter()
+            await db.flush()
+            flush = time.perf_counter() - start
+
+            context, _ = timed(lambda: db.get_context_summary(), repeat=20)
+
+            start = time.perf_counter()
+            pages, before = 0, None
+            while True:
+                page = await db.get_history(before_id=before, limit=100)
+                pages += 1
+                if len(page) < 100:
+                    break
+                before = page[-1]["id"]
+            history = time.perf_counter() - start
+        finally:
+            await db.stop()
+    return {
+        "entries": entries,
+        "add_us_per_entry": round(add / entries * 1e6, 3),
+        "flush_ms": round(flush * 1000, 3),
+        "context_summary_us": round(context * 1e6, 3),
+        "history_pages": pages,
+        "history_ms_per_page": round(history / pages * 1000, 3)
+    }
+
+
+def bench_prompt_compaction(sentences_per_member):
+    rng = random.Random(11)
+    shared = [
+        "Bitcoin is testing strong resistance near $70,000 and a daily close above it would confirm the breakout.",
+        "The Federal Reserve's next rate decision remains the key macro catalyst for risk assets this month.",
+        "Traders should size positions conservatively and keep stops below the 50-day moving average.",
+        "On-chain data shows long-term holders are still accumulating, which supports the bullish case."
+    ]
+    vocabulary = "market momentum volume liquidity volatility support resistance trend breakout macro yields dollar".split()
+    blocks = []
+    for member in AI_COUNCIL[:-1]:
+        sentences = [
+            rng.choice(shared) if rng.random() < 0.3
+            else " ".join(rng.choice(vocabulary) for _ in range(rng.randint(10, 22))).capitalize() + "."
+            for _ in range(sentences_per_member)
+        ]
+        blocks.append((f"**{member['name']}** ({member['specialty']}): ", " ".join(sentences)))
+    fixed = estimate_tokens(COLLABORATION_PROMPT.format(question="Where is BTC heading?", responses="", rankings=""))
+    compactor = PromptCompactor("bench", SYNTHESIS_PROMPT_TOKENS, mark_repeats=True)
+    elapsed, (_, report) = timed(lambda: compactor.compact(blocks, fixed), repeat=5)
+    return {
+        "members": len(blocks),
+        "sentences": report["sentences"],
+        "compact_ms": round(elapsed * 1000, 3),
+        "near_duplicates": report["near_duplicates"],
+        "tokens_before": report["tokens_before"],
+        "tokens_after": report["tokens_after"],
+        "reduction_pct": report["reduction_pct"]
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--headlines", type=int, default=20000)
+    parser.add_argument("--items", type=int, default=5000)
+    parser.add_argument("--entries", type=int, default=2000)
+    parser.add_argument("--sentences", type=int, default=20, help="sentences per member answer")
+    parser.add_argument("--json", help="write results to this file")
+    parser.add_argument("--compare", help="print changes against a saved results file")
+    args = parser.parse_args()
+
+    results = {
+        "sentiment": bench_sentiment(args.headlines),
+        "parse_xml": bench_parse_xml(args.items),
+        "conversation_db": asyncio.run(bench_conversation_db(args.entries)),
+        "prompt_compaction": bench_prompt_compaction(args.sentences)
+    }
+    for name, values in results.items():
+        print(f"{name}:")
+        for key, value in values.items():
+            print(f"  {key:<30}: {value}")
+
+    config = {"headlines": args.headlines, "items": args.items, "entries": args.entries, "sentences": args.sentences}
+    if args.json:
+        write_results(args.json, "micro_bench", results, config)
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == "__main__":
+    main()
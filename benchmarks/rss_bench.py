@@ -0,0 +1,95 @@
+"""
+RSS Parser Benchmark
+====================
+Compares the original whole-document ``ET.fromstring`` parse against the
+incremental RSSItemParser on a large synthetic feed: parse time and peak
+Python memory, with and without the ``max_articles`` cutoff.
+
+Run with: python benchmarks/rss_bench.py [--items 50000] [--chunk 16384]
+"""
+
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+import xml.etree.ElementTree as ET
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from server import RSSItemParser  # noqa: E402
+
+
+def make_feed(items):
+    parts = ['<?xml version="1.0" encoding="UTF-8"?><rss version="2.0"><channel><title>Bench</title>']
+    for i in range(items):
+        parts.append(
+            f"<item><title>Bitcoin rallies as traders buy the dip #{i}</title>"
+            f"<link>https://news.example.com/articles/{i}</link><guid>{i}</guid>"
+            f"<pubDate>Mon, 05 Jan 2026 12:00:00 GMT</pubDate>"
+            f"<description>&lt;a href=\"https://news.example.com/{i}\"&gt;story&lt;/a&gt;</description>"
+            f"<source url=\"https://source{i % 20}.example.com\">Source {i % 20}</source></item>"
+        )
+    parts.append("</channel></rss>")
+    return "".join(parts).encode("utf-8")
+
+
+def legacy_parse(xml_content, max_articles):
+    """The original implementation: build the full tree, then slice"""
+    articles = []
+    try:
+        root = ET.fromstring(xml_content)
+        for item in root.findall('./channel/item'):
+            title = item.find('title').text if item.find('title') is not None else "No Title"
+            link = item.find('link').text if item.find('link') is not None else "No Link"
+            pub_date = item.find('pubDate').text if item.find('pubDate') is not None else "Unknown Date"
+            source = item.find('source').text if item.find('source') is not None else "Unknown Source"
+            articles.append({'title': title, 'link': link, 'pub_date': pub_date, 'source': source})
+    except ET.ParseError:
+        pass
+    return articles[:max_articles]
+
+
+def streaming_parse(xml_content, max_articles, chunk_size):
+    parser = RSSItemParser(max_articles)
+    articles = []
+    for offset in range(0, len(xml_content), chunk_size):
+        articles.extend(parser.feed(xml_content[offset:offset + chunk_size]))
+        if parser.done:
+            break
+    return articles
+
+
+def measure(fn):
+    # Time and memory are taken in separate runs; tracemalloc slows Python code down
+    start = time.perf_counter()
+    result = fn()
+    elapsed = time.perf_counter() - start
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak, len(result)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--items", type=int, default=50000)
+    parser.add_argument("--chunk", type=int, default=16384)
+    args = parser.parse_args()
+
+    feed = make_feed(args.items)
+    print(f"feed: {args.items} items, {len(feed) / 1e6:.1f} MB, {args.chunk} byte chunks")
+    cases = [
+        ("legacy, max 100", lambda: legacy_parse(feed, 100)),
+        ("streaming, max 100", lambda: streaming_parse(feed, 100, args.chunk)),
+        ("legacy, all items", lambda: legacy_parse(feed, None)),
+        ("streaming, all items", lambda: streaming_parse(feed, None, args.chunk)),
+    ]
+    for name, fn in cases:
+        elapsed, peak, count = measure(fn)
+        print(f"  {name:22s} {elapsed * 1000:9.1f} ms  peak {peak / 1e6:7.2f} MB  ({count} articles)")
+
+
+if __name__ == "__main__":
+    main()
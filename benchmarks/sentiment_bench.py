@@ -0,0 +1,87 @@
+"""
+Sentiment Engine Benchmark
+==========================
+Compares the compiled single-pass SentimentAnalyzer against the original
+per-keyword substring scan on a synthetic set of headlines.
+
+Run with: python benchmarks/sentiment_bench.py [--headlines 20000]
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from server import SentimentAnalyzer  # noqa: E402
+
+FILLER = [
+    'Bitcoin', 'Ethereum', 'Solana', 'NVIDIA', 'Tesla', 'Apple', 'gold', 'dollar', 'yen',
+    'investors', 'traders', 'analysts', 'market', 'shares', 'price', 'week', 'after',
+    'report', 'earnings', 'Fed', 'rates', 'inflation', 'beard', 'death', 'bathroom',
+    'support', 'sources', 'say', 'as', 'the', 'on', 'amid', 'ahead', 'of', 'data'
+]
+
+
+def legacy_analyze(text):
+    """The original implementation: one substring scan per keyword"""
+    text_lower = text.lower()
+    bullish_score = 0
+    bearish_score = 0
+    for keyword in SentimentAnalyzer.BULLISH_KEYWORDS:
+        if keyword in text_lower:
+            bullish_score += 1
+    for keyword in SentimentAnalyzer.BEARISH_KEYWORDS:
+        if keyword in text_lower:
+            bearish_score += 1
+    if bullish_score > bearish_score:
+        return 'bullish'
+    elif bearish_score > bullish_score:
+        return 'bearish'
+    return 'neutral'
+
+
+def make_headlines(count, seed=7):
+    rng = random.Random(seed)
+    vocabulary = FILLER * 4 + SentimentAnalyzer.BULLISH_KEYWORDS + SentimentAnalyzer.BEARISH_KEYWORDS
+    return [
+        " ".join(rng.choice(vocabulary) for _ in range(rng.randint(6, 14))).capitalize()
+        for _ in range(count)
+    ]
+
+
+def timed(fn, repeat=3):
+    best = float("inf")
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--headlines", type=int, default=20000)
+    args = parser.parse_args()
+
+    headlines = make_headlines(args.headlines)
+    analyzer = SentimentAnalyzer()
+    analyzer.analyze_many(headlines[:1])  # compile outside the timed region
+
+    legacy_time, legacy = timed(lambda: [legacy_analyze(h) for h in headlines])
+    single_time, _ = timed(lambda: [analyzer.analyze(h) for h in headlines])
+    batch_time, batch = timed(lambda: analyzer.analyze_many(headlines))
+
+    changed = sum(1 for a, b in zip(legacy, batch) if a != b)
+    print(f"{args.headlines} headlines")
+    print(f"  legacy substring scan : {legacy_time * 1000:8.1f} ms")
+    print(f"  compiled analyze()    : {single_time * 1000:8.1f} ms  ({legacy_time / single_time:.1f}x)")
+    print(f"  compiled analyze_many : {batch_time * 1000:8.1f} ms  ({legacy_time / batch_time:.1f}x)")
+    print(f"  labels differing from legacy (substring false positives): {changed}")
+
+
+if __name__ == "__main__":
+    main()
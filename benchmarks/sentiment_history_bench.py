@@ -0,0 +1,66 @@
+"""
+Sentiment History Benchmark
+===========================
+Fills a topic with months of synthetic snapshots, then reports the file
+size and how long the rolling-window aggregates and a bucketed series
+take to read back through the memory map.
+
+Run with: python benchmarks/sentiment_history_bench.py [--days 180 --every 60]
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BENCH_DIR)
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+
+from common import timed  # noqa: E402
+from server import SENTIMENT_HISTORY_WINDOWS, SentimentHistory  # noqa: E402
+
+
+def run(directory, args):
+    history = SentimentHistory(directory, min_spacing=0)
+    rng = np.random.default_rng(7)
+    now = time.time()
+    start = now - args.days * 86400
+    count = args.days * 86400 // args.every
+
+    begin = time.perf_counter()
+    for i in range(count):
+        agree, disagree, neutral = (int(x) for x in rng.integers(0, 40, 3))
+        history.record("Bitcoin", {
+            "total": agree + disagree + neutral, "agree": agree, "disagree": disagree,
+            "neutral": neutral, "confidence": abs(agree - disagree)
+        }, start + i * args.every)
+    write_time = time.perf_counter() - begin
+
+    size = history.stats()["bytes"]
+    print(f"{count} snapshots over {args.days} days ({size / 1e6:.2f} MB on disk)")
+    print(f"  record                    : {write_time / count * 1e6:8.1f} us per snapshot")
+
+    windows = list(SENTIMENT_HISTORY_WINDOWS)
+    agg_time, _ = timed(lambda: history.aggregates("Bitcoin", windows, now), repeat=5)
+    print(f"  aggregates {','.join(windows):<15}: {agg_time * 1000:8.2f} ms")
+    series_time, series = timed(lambda: history.series("Bitcoin", 30 * 86400, 3600, now), repeat=5)
+    print(f"  30d series, 1h buckets    : {series_time * 1000:8.2f} ms ({len(series['t'])} points)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--days", type=int, default=180)
+    parser.add_argument("--every", type=int, default=60, help="seconds between snapshots")
+    args = parser.parse_args()
+
+    # The history (and its memory maps) is released when run() returns, before the directory goes
+    with tempfile.TemporaryDirectory(prefix="sentiment_history_") as directory:
+        run(directory, args)
+
+
+if __name__ == "__main__":
+    main()
@@ -22,10 +22,10 @@ cd /d "%~dp0"
 
 :: Install dependencies if needed
 echo [INFO] Checking dependencies...
-pip show fastapi >nul 2>&1
+python -c "import fastapi, uvicorn, httpx, numpy" >nul 2>&1
 if errorlevel 1 (
     echo [INFO] Installing required packages...
-    pip install fastapi uvicorn httpx requests
+    pip install fastapi uvicorn httpx numpy
 )
 
 echo.
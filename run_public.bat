@@ -21,7 +21,7 @@ cd /d "%~dp0"
 
 :: Install dependencies
 echo [INFO] Installing dependencies...
-pip install fastapi uvicorn httpx requests >nul 2>&1
+pip install fastapi uvicorn httpx numpy >nul 2>&1
 
 echo.
 echo ============================================================
@@ -11,23 +11,71 @@ Or: uvicorn server:app --reload --host 0.0.0.0 --port 8000
 """
 
 import asyncio
+import contextvars
+import gzip
+import hashlib
+import math
 import json
+import re
+import sqlite3
+import threading
+import time
+import zlib
 import httpx
-import requests
+import numpy as np
+from contextlib import asynccontextmanager, contextmanager
+from urllib.parse import urlsplit
 import xml.etree.ElementTree as ET
-from fastapi import FastAPI, WebSocket, WebSocketDisconnect
-from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse
+from bisect import bisect_left
+from fastapi import FastAPI, Request, WebSocket, WebSocketDisconnect
+from fastapi.responses import JSONResponse, PlainTextResponse, Response
 from fastapi.middleware.cors import CORSMiddleware
-from typing import Optional, List, Dict
+from typing import Optional, List, Dict, Tuple
+from collections import OrderedDict, deque
+from itertools import islice
 from datetime import datetime
 import random
 import os
 
+try:
+    import brotli  # optional: adds br variants of the static assets
+except ImportError:
+    brotli = None
+
+try:
+    import fcntl  # Unix only: primary election for the shared state backend
+except ImportError:
+    fcntl = None
+
 # Get the directory where this script is located
 SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
 
-app = FastAPI(title="Stock Exchange Pro - AI Trading Council")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Create shared resources on startup and release them on shutdown"""
+    static_assets.load()
+    await state_backend.start()
+    await ollama_pool.start()
+    await conversation_db.start()
+    state_backend.when_primary(sentiment_scheduler.start)
+    model_health.start()
+    state_backend.when_primary(quote_aggregator.start)
+    try:
+        yield
+    finally:
+        await state_backend.stop()
+        await sentiment_scheduler.stop()
+        await model_health.stop()
+        await quote_aggregator.stop()
+        await ollama_pool.close()
+        response_cache.close()
+        await conversation_db.stop()
+        await close_news_client()
+
+
+app = FastAPI(title="Stock Exchange Pro - AI Trading Council", lifespan=lifespan)
 
 # Add CORS middleware for development
 app.add_middleware(
@@ -39,7 +87,326 @@ app.add_middleware(
 )
 
 
+# ======== Metrics & Tracing ========
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+RATE_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500)
+TRACE_MAX = int(os.environ.get("TRACE_MAX", "200"))
+TRACE_MAX_SPANS = 256
+
+
+class Counter:
+    def __init__(self, name: str, help_text: str, labels: Tuple[str, ...] = ()):
+        self.name = name
+        self.help = help_text
+        self.labels = labels
+        self.values: Dict[tuple, float] = {}
+
+    def inc(self, *labels: str, amount: float = 1.0):
+        self.values[labels] = self.values.get(labels, 0.0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        for labels, value in self.values.items():
+            lines.append(f"{self.name}{_label_text(self.labels, labels)} {value:g}")
+        return lines
+
+
+class Histogram:
+    """Fixed-bucket histogram; an observation is a bisect and two additions"""
+
+    def __init__(self, name: str, help_text: str, labels: Tuple[str, ...] = (), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.labels = labels
+        self.buckets = tuple(buckets)
+        self.series: Dict[tuple, list] = {}  # labels -> [bucket counts..., +Inf count, sum]
+
+    def observe(self, value: float, *labels: str):
+        series = self.series.get(labels)
+        if series is None:
+            series = self.series[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+        series[bisect_left(self.buckets, value)] += 1
+        series[-1] += value
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        for labels, series in self.series.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets + ("+Inf",), series):
+                cumulative += count
+                le = bound if isinstance(bound, str) else f"{bound:g}"
+                lines.append(f"{self.name}_bucket{_label_text(self.labels + ('le',), labels + (le,))} {cumulative}")
+            lines.append(f"{self.name}_sum{_label_text(self.labels, labels)} {series[-1]:.6f}")
+            lines.append(f"{self.name}_count{_label_text(self.labels, labels)} {cumulative}")
+        return lines
+
+
+def _label_text(names: Tuple[str, ...], values: tuple) -> str:
+    if not names:
+        return ""
+    pairs = []
+    for name, value in zip(names, values):
+        escaped = str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+        pairs.append(f'{name}="{escaped}"')
+    return "{" + ",".join(pairs) + "}"
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self.metrics: Dict[str, object] = {}
+
+    def counter(self, name: str, help_text: str, labels: Tuple[str, ...] = ()) -> Counter:
+        return self.metrics.setdefault(name, Counter(name, help_text, labels))
+
+    def histogram(self, name: str, help_text: str, labels: Tuple[str, ...] = (), buckets=LATENCY_BUCKETS) -> Histogram:
+        return self.metrics.setdefault(name, Histogram(name, help_text, labels, buckets))
+
+    def render(self) -> str:
+        lines = []
+        for metric in self.metrics.values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+metrics = MetricsRegistry()
+model_generate_seconds = metrics.histogram(
+    "council_model_generate_seconds", "Time for one model completion", ("model", "outcome"))
+model_tokens_per_second = metrics.histogram(
+    "council_model_tokens_per_second", "Generation speed per completion", ("model",), RATE_BUCKETS)
+model_tokens_total = metrics.counter("council_model_tokens_total", "Tokens generated", ("model",))
+stage_seconds = metrics.histogram(
+    "council_stage_seconds", "Council session stage durations", ("stage",))
+sessions_total = metrics.counter("council_sessions_total", "Council sessions by outcome", ("outcome",))
+news_fetch_seconds = metrics.histogram("news_fetch_seconds", "RSS download and parse time per fetch")
+news_parse_seconds = metrics.histogram("news_parse_seconds", "CPU time spent parsing RSS per fetch")
+sentiment_scoring_seconds = metrics.histogram("sentiment_scoring_seconds", "Headline scoring time per batch")
+ws_send_seconds = metrics.histogram("ws_send_seconds", "Time to write one WebSocket frame")
+ws_frames_total = metrics.counter("ws_frames_sent_total", "WebSocket frames written")
+prompt_tokens_total = metrics.counter(
+    "council_prompt_tokens_total", "Estimated prompt tokens before and after compaction", ("prompt", "stage"))
+archive_write_errors_total = metrics.counter(
+    "conversation_archive_write_errors_total", "Failed conversation archive batch writes (retried)")
+
+current_trace: contextvars.ContextVar = contextvars.ContextVar("current_trace", default=None)
+current_span: contextvars.ContextVar = contextvars.ContextVar("current_span", default=None)
+
+
+class Trace:
+    """Span timings for one council session, offsets relative to its start"""
+
+    def __init__(self, trace_id: str, name: str):
+        self.trace_id = trace_id
+        self.name = name
+        self.started_at = datetime.now().isoformat(timespec="milliseconds")
+        self.origin = time.perf_counter()
+        self.duration: Optional[float] = None
+        self.status = "running"
+        self.spans: List[dict] = []
+        self.dropped_spans = 0
+
+    def to_dict(self) -> dict:
+        return {
+            "trace_id": self.trace_id,
+            "name": self.name,
+            "started_at": self.started_at,
+            "status": self.status,
+            "duration_ms": round(self.duration * 1000, 2) if self.duration is not None else None,
+            "spans": self.spans,
+            "dropped_spans": self.dropped_spans
+        }
+
+
+class Tracer:
+    """Keeps the most recent ``max_traces`` traces for lookup by id"""
+
+    def __init__(self, max_traces: int = TRACE_MAX):
+        self.max_traces = max_traces
+        self.traces: OrderedDict = OrderedDict()
+
+    def start(self, name: str) -> Trace:
+        trace = Trace(os.urandom(8).hex(), name)
+        self.traces[trace.trace_id] = trace
+        while len(self.traces) > self.max_traces:
+            self.traces.popitem(last=False)
+        current_trace.set(trace)
+        return trace
+
+    def finish(self, trace: Trace, status: str):
+        trace.duration = time.perf_counter() - trace.origin
+        trace.status = status
+
+    def get(self, trace_id: str) -> Optional[dict]:
+        trace = self.traces.get(trace_id)
+        return trace.to_dict() if trace else None
+
+    def recent(self, limit: int = 20) -> List[dict]:
+        return [
+            {k: v for k, v in trace.to_dict().items() if k != "spans"}
+            for trace in islice(reversed(self.traces.values()), limit)
+        ]
+
+
+tracer = Tracer()
+
+
+@contextmanager
+def span(name: str, histogram: Optional[Histogram] = None, labels: tuple = (), **attrs):
+    """Time a block into ``histogram`` and, inside a traced session, record it as a span.
+
+    Code running inside the block can add attributes with ``annotate``.
+    """
+    attrs = dict(attrs)
+    token = current_span.set(attrs)
+    start = time.perf_counter()
+    try:
+        yield attrs
+    except asyncio.CancelledError:
+        attrs["error"] = "cancelled"
+        raise
+    except Exception as e:
+        attrs["error"] = type(e).__name__
+        raise
+    finally:
+        duration = time.perf_counter() - start
+        current_span.reset(token)
+        if histogram is not None:
+            histogram.observe(duration, *labels)
+        record_span(name, start, duration, **attrs)
+
+
+def record_span(name: str, start: float, duration: float, **attrs):
+    """Add an already-measured span (``perf_counter`` start) to the current trace"""
+    trace = current_trace.get()
+    if trace is None:
+        return
+    if len(trace.spans) >= TRACE_MAX_SPANS:
+        trace.dropped_spans += 1
+        return
+    trace.spans.append({
+        "name": name,
+        "start_ms": round((start - trace.origin) * 1000, 2),
+        "duration_ms": round(duration * 1000, 2),
+        **attrs
+    })
+
+
+def annotate(**attrs):
+    """Attach attributes to the innermost open span, if any"""
+    attrs_of_span = current_span.get()
+    if attrs_of_span is not None:
+        attrs_of_span.update(attrs)
+
+
 # ======== News Sentiment Analysis ========
+NEWS_RSS_URL = os.environ.get("NEWS_RSS_URL", "https://news.google.com/rss/search")
+NEWS_FETCH_TIMEOUT = float(os.environ.get("NEWS_FETCH_TIMEOUT", "15"))
+NEWS_CACHE_TTL = float(os.environ.get("NEWS_CACHE_TTL", "300"))
+NEWS_CACHE_MAX_ENTRIES = int(os.environ.get("NEWS_CACHE_MAX_ENTRIES", "256"))
+
+# Batch sentiment requests: most topics per request / simultaneous feed downloads
+NEWS_BATCH_MAX_TOPICS = int(os.environ.get("NEWS_BATCH_MAX_TOPICS", "20"))
+NEWS_BATCH_CONCURRENCY = int(os.environ.get("NEWS_BATCH_CONCURRENCY", "4"))
+
+# Optional JSON file {"bullish": [...], "bearish": [...]} overriding the built-in keywords
+SENTIMENT_KEYWORDS_FILE = os.environ.get("SENTIMENT_KEYWORDS_FILE", "")
+SENTIMENT_KEYWORDS_CHECK_INTERVAL = 5.0
+
+_news_client: Optional[httpx.AsyncClient] = None
+
+
+def get_news_client() -> httpx.AsyncClient:
+    """Shared async client for RSS downloads, created on first use"""
+    global _news_client
+    if _news_client is None:
+        _news_client = httpx.AsyncClient(timeout=NEWS_FETCH_TIMEOUT, follow_redirects=True)
+    return _news_client
+
+
+async def close_news_client():
+    global _news_client
+    if _news_client is not None:
+        await _news_client.aclose()
+        _news_client = None
+
+
+class NewsCache:
+    """TTL cache of fetched articles with per-key request coalescing.
+
+    Concurrent callers asking for the same key share a single in-flight
+    download, so a burst of requests for one topic costs one upstream fetch
+    per TTL. Empty results (failed fetches) are not cached. At most
+    ``max_entries`` topics are kept; expired entries are dropped when touched
+    and the least recently used one is evicted when the cache is full.
+    """
+
+    def __init__(self, ttl: float = NEWS_CACHE_TTL, max_entries: int = NEWS_CACHE_MAX_ENTRIES):
+        self.ttl = ttl
+        self.max_entries = max(1, max_entries)
+        self._entries: OrderedDict = OrderedDict()
+        self._inflight: Dict[tuple, asyncio.Task] = {}
+
+    async def get_or_fetch(self, key: tuple, fetch, refresh: bool = False) -> List[Dict]:
+        """Return cached articles for ``key``; ``refresh`` skips the cache but still coalesces"""
+        entry = self._entries.get(key)
+        if entry is not None:
+            if time.monotonic() - entry[0] >= self.ttl:
+                del self._entries[key]
+            elif not refresh:
+                self._entries.move_to_end(key)
+                return entry[1]
+
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.create_task(fetch())
+            self._inflight[key] = task
+            task.add_done_callback(lambda done: self._store(key, done))
+        # Shield so one caller going away doesn't cancel the fetch for everyone else
+        return await asyncio.shield(task)
+
+    def _store(self, key: tuple, task: asyncio.Task):
+        self._inflight.pop(key, None)
+        if task.cancelled() or task.exception() is not None:
+            return
+        if task.result():
+            self._entries[key] = (time.monotonic(), task.result())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        self._entries.clear()
+
+
+news_cache = NewsCache()
+
+
+def _trie_regex(words) -> str:
+    """Build a prefix-factored alternation ('bull(?:ish)?|...') matching any of ``words``.
+
+    Sharing prefixes lets the regex engine dispatch on one character at a time
+    instead of trying every keyword in turn, and the greedy optional suffixes
+    prefer the longest keyword at each position.
+    """
+    trie: Dict = {}
+    for word in words:
+        node = trie
+        for char in word:
+            node = node.setdefault(char, {})
+        node[""] = {}
+
+    def build(node: Dict) -> str:
+        terminal = "" in node
+        branches = [re.escape(char) + build(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ""
+        body = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+        if terminal:
+            return "(?:" + body + ")?"
+        return body
+
+    return "(?:" + build(trie) + ")"
+
+
 class SentimentAnalyzer:
     BULLISH_KEYWORDS = [
         'surge', 'soar', 'rally', 'bull', 'bullish', 'gain', 'gains', 'rises', 'rising',
@@ -62,19 +429,58 @@ class SentimentAnalyzer:
         'concern', 'concerns', 'worried', 'worry', 'fear', 'fears', 'panic', 'volatile'
     ]
     
-    def analyze(self, text):
-        text_lower = text.lower()
-        bullish_score = 0
-        bearish_score = 0
-        
-        for keyword in self.BULLISH_KEYWORDS:
-            if keyword in text_lower:
-                bullish_score += 1
-                
-        for keyword in self.BEARISH_KEYWORDS:
-            if keyword in text_lower:
-                bearish_score += 1
-        
+    # Compiled matcher shared by every instance: (pattern, {keyword: (bullish, bearish)})
+    _compiled = None
+    _keywords_mtime = None
+    _keywords_checked = 0.0
+
+    @classmethod
+    def set_keywords(cls, bullish: Optional[List[str]] = None, bearish: Optional[List[str]] = None):
+        """Replace the keyword sets; the matcher is rebuilt once, on next use"""
+        if bullish is not None:
+            cls.BULLISH_KEYWORDS = list(bullish)
+        if bearish is not None:
+            cls.BEARISH_KEYWORDS = list(bearish)
+        cls._compiled = None
+
+    @classmethod
+    def _reload_keywords_file(cls):
+        now = time.monotonic()
+        if not SENTIMENT_KEYWORDS_FILE or now - cls._keywords_checked < SENTIMENT_KEYWORDS_CHECK_INTERVAL:
+            return
+        cls._keywords_checked = now
+        try:
+            mtime = os.path.getmtime(SENTIMENT_KEYWORDS_FILE)
+            if mtime == cls._keywords_mtime:
+                return
+            with open(SENTIMENT_KEYWORDS_FILE, encoding="utf-8") as f:
+                keywords = json.load(f)
+            cls._keywords_mtime = mtime
+            cls.set_keywords(keywords.get("bullish"), keywords.get("bearish"))
+        except (OSError, ValueError) as e:
+            print(f"Sentiment keywords reload error: {e}")
+
+    @classmethod
+    def _matcher(cls):
+        cls._reload_keywords_file()
+        if cls._compiled is None:
+            cls._compiled = cls._compile(cls.BULLISH_KEYWORDS, cls.BEARISH_KEYWORDS)
+        return cls._compiled
+
+    @staticmethod
+    def _compile(bullish: List[str], bearish: List[str]):
+        polarity: Dict[str, tuple] = {}
+        for keyword in bullish:
+            polarity[keyword.lower()] = (1, 0)
+        for keyword in bearish:
+            bull, _ = polarity.get(keyword.lower(), (0, 0))
+            polarity[keyword.lower()] = (bull, 1)
+        # Lookarounds keep 'ath' out of 'death' and 'bear' out of 'beard'
+        pattern = re.compile(r"(?<!\w)" + _trie_regex(polarity) + r"(?!\w)")
+        return pattern, polarity
+
+    @staticmethod
+    def _label(bullish_score, bearish_score):
         if bullish_score > bearish_score:
             return 'bullish'
         elif bearish_score > bullish_score:
@@ -82,17 +488,130 @@ class SentimentAnalyzer:
         else:
             return 'neutral'
 
+    def analyze(self, text):
+        return self.analyze_many([text])[0]
+
+    def analyze_many(self, texts):
+        """Classify a batch of headlines with a single pass of the compiled matcher each"""
+        pattern, polarity = self._matcher()
+        findall = pattern.findall
+        results = []
+        for text in texts:
+            bullish_score = 0
+            bearish_score = 0
+            # Each distinct keyword counts once per headline
+            for keyword in set(findall(text.lower())):
+                bull, bear = polarity[keyword]
+                bullish_score += bull
+                bearish_score += bear
+            results.append(self._label(bullish_score, bearish_score))
+        return results
+
+
+class RSSItemParser:
+    """Incremental RSS parser that emits one article per ``<channel><item>``.
+
+    Feed it the body in chunks; each call returns the items completed so far.
+    Finished items are detached from the tree so memory stays flat on large
+    feeds, and parsing stops once ``max_articles`` items have been produced.
+    A malformed document ends the feed with whatever was parsed before the error.
+    """
+
+    # RSS tag -> (article key, default when the tag is missing)
+    FIELDS = {
+        'title': ('title', "No Title"),
+        'link': ('link', "No Link"),
+        'pubDate': ('pub_date', "Unknown Date"),
+        'source': ('source', "Unknown Source"),
+    }
+
+    def __init__(self, max_articles=None):
+        self.max_articles = max_articles
+        self.count = 0
+        self.failed = False
+        self._parser = ET.XMLPullParser(events=("start", "end"))
+        self._path: List[str] = []
+        self._channel = None
+
+    @property
+    def done(self):
+        return self.failed or (self.max_articles is not None and self.count >= self.max_articles)
+
+    def feed(self, data) -> List[Dict]:
+        articles = []
+        if self.done:
+            return articles
+        try:
+            self._parser.feed(data)
+            for event, elem in self._parser.read_events():
+                if self._handle(event, elem, articles):
+                    break
+        except ET.ParseError:
+            self.failed = True
+        return articles
+
+    def _handle(self, event, elem, articles) -> bool:
+        """Process one parser event; returns True once the article limit is reached"""
+        if event == "start":
+            self._path.append(elem.tag)
+            if self._path[1:] == ['channel']:
+                self._channel = elem
+            return False
+
+        is_item = self._path[1:] == ['channel', 'item']
+        self._path.pop()
+        if not is_item:
+            return False
+
+        article = {key: default for key, default in self.FIELDS.values()}
+        for child in elem:
+            field = self.FIELDS.get(child.tag)
+            if field is not None:
+                article[field[0]] = child.text
+        self._channel.remove(elem)
+        articles.append(article)
+        self.count += 1
+        return self.max_articles is not None and self.count >= self.max_articles
+
 
 class NewsAgent:
     def __init__(self, topic="Bitcoin"):
         self.topic = topic
-        self.base_url = "https://news.google.com/rss/search"
+        self.base_url = NEWS_RSS_URL
         self.headers = {
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
         }
         self.sentiment_analyzer = SentimentAnalyzer()
 
-    def fetch_news(self, days_ago=1, max_articles=100):
+    async def fetch_news(self, days_ago=1, max_articles=100, refresh=False):
+        key = (self.topic.strip().lower(), days_ago, max_articles)
+        return await news_cache.get_or_fetch(key, lambda: self._download_news(days_ago, max_articles), refresh)
+
+    async def _download_news(self, days_ago, max_articles):
+        """Download the feed, scoring each headline as soon as its item is parsed"""
+        try:
+            with span("news_fetch", news_fetch_seconds, topic=self.topic) as attrs:
+                articles = []
+                score_time = 0.0
+                async for article in self.stream_news(days_ago, max_articles):
+                    started = time.perf_counter()
+                    article['sentiment'] = self.sentiment_analyzer.analyze(article['title'])
+                    score_time += time.perf_counter() - started
+                    articles.append(article)
+                sentiment_scoring_seconds.observe(score_time)
+                attrs["articles"] = len(articles)
+                attrs["scoring_ms"] = round(score_time * 1000, 2)
+                return articles
+        except Exception as e:
+            print(f"News fetch error: {e}")
+            return []
+
+    async def stream_news(self, days_ago=1, max_articles=100):
+        """Yield articles while the feed is still downloading.
+
+        The body is parsed chunk by chunk and the connection is dropped as soon
+        as ``max_articles`` items have been read.
+        """
         time_query = f"when:{days_ago}d"
         full_query = f"{self.topic} {time_query}"
         
@@ -103,35 +622,29 @@ class NewsAgent:
             'ceid': 'US:en'
         }
 
+        parser = RSSItemParser(max_articles)
+        parse_time = 0.0
         try:
-            response = requests.get(self.base_url, params=params, headers=self.headers, timeout=15)
-            response.raise_for_status()
-            articles = self._parse_xml(response.content)
-            return articles[:max_articles]
-        except Exception as e:
-            print(f"News fetch error: {e}")
-            return []
+            async with get_news_client().stream("GET", self.base_url, params=params, headers=self.headers) as response:
+                response.raise_for_status()
+                async for chunk in response.aiter_bytes():
+                    started = time.perf_counter()
+                    articles = parser.feed(chunk)
+                    parse_time += time.perf_counter() - started
+                    for article in articles:
+                        yield article
+                    if parser.done:
+                        break
+        finally:
+            news_parse_seconds.observe(parse_time)
+            annotate(parse_ms=round(parse_time * 1000, 2))
 
-    def _parse_xml(self, xml_content):
-        articles = []
-        try:
-            root = ET.fromstring(xml_content)
-            for item in root.findall('./channel/item'):
-                title = item.find('title').text if item.find('title') is not None else "No Title"
-                link = item.find('link').text if item.find('link') is not None else "No Link"
-                pub_date = item.find('pubDate').text if item.find('pubDate') is not None else "Unknown Date"
-                source = item.find('source').text if item.find('source') is not None else "Unknown Source"
-                articles.append({
-                    'title': title,
-                    'link': link,
-                    'pub_date': pub_date,
-                    'source': source
-                })
-        except ET.ParseError:
-            pass
-        return articles
+    def _parse_xml(self, xml_content, max_articles=None):
+        with span("news_parse", news_parse_seconds):
+            return RSSItemParser(max_articles).feed(xml_content)
 
-    def analyze_sentiment(self, articles):
+    def analyze_sentiment(self, articles, sentiments=None):
+        """Tally votes for ``articles``; pass ``sentiments`` when the headlines are already scored"""
         results = {
             'total': len(articles),
             'agree': 0,
@@ -140,9 +653,10 @@ class NewsAgent:
             'articles': []
         }
         
-        for article in articles:
-            sentiment = self.sentiment_analyzer.analyze(article['title'])
-            
+        if sentiments is None:
+            with span("sentiment_scoring", sentiment_scoring_seconds, headlines=len(articles)):
+                sentiments = self.sentiment_analyzer.analyze_many([article['title'] for article in articles])
+        for article, sentiment in zip(articles, sentiments):
             if sentiment == 'bullish':
                 results['agree'] += 1
                 vote = 'AGREE'
@@ -161,12 +675,16 @@ class NewsAgent:
         
         return results
 
-    def get_sentiment_summary(self):
-        articles = self.fetch_news(days_ago=1, max_articles=100)
+    async def get_sentiment_summary(self, refresh=False):
+        articles = await self.fetch_news(days_ago=1, max_articles=100, refresh=refresh)
         if not articles:
             return None
-        
-        results = self.analyze_sentiment(articles)
+        # Headlines were scored while the feed downloaded; only the tally is left
+        sentiments = [article.get('sentiment') for article in articles]
+        return self.summarize(articles, sentiments if None not in sentiments else None)
+
+    def summarize(self, articles, sentiments=None):
+        results = self.analyze_sentiment(articles, sentiments)
         total = results['total']
         agree = results['agree']
         disagree = results['disagree']
@@ -205,15 +723,552 @@ class NewsAgent:
         }
 
 
-# ======== In-Memory Conversation Database ========
+def _article_digest(text: str) -> bytes:
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=8).digest()
+
+
+def article_identity(article: Dict) -> List[bytes]:
+    """Hashes of an article's normalized link and title; a match on either marks a repeat"""
+    keys = []
+    link = (article.get("link") or "").split("#")[0].strip()
+    if link and link != "No Link":
+        keys.append(_article_digest(link))
+    title = " ".join((article.get("title") or "").lower().split())
+    if title and title != "no title":
+        keys.append(_article_digest(title))
+    return keys
+
+
+def summarize_topics(topic_articles: Dict[str, List[Dict]]) -> Tuple[Dict[str, Optional[dict]], dict]:
+    """Sentiment summaries for several topics, scoring each distinct headline once.
+
+    An article repeated within a topic (same link or normalized title) is
+    counted once. Stories that show up under several topics, such as a
+    market-wide selloff, are scored once and the label reused everywhere.
+    """
+    kept: Dict[str, List[Dict]] = {}
+    everywhere = set()
+    fetched = 0
+    for topic, articles in topic_articles.items():
+        seen = set()
+        kept[topic] = []
+        for article in articles:
+            fetched += 1
+            keys = article_identity(article)
+            if any(key in seen for key in keys):
+                continue
+            seen.update(keys)
+            everywhere.add(keys[0] if keys else id(article))
+            kept[topic].append(article)
+
+    # The analyzer lower-cases its input, so headlines differing only in case score alike
+    headlines = list({article['title'].lower(): None for articles in kept.values() for article in articles})
+    with span("sentiment_scoring", sentiment_scoring_seconds, headlines=len(headlines)):
+        labels = dict(zip(headlines, SentimentAnalyzer().analyze_many(headlines)))
+
+    summaries = {
+        topic: NewsAgent(topic).summarize(articles, [labels[a['title'].lower()] for a in articles]) if articles else None
+        for topic, articles in kept.items()
+    }
+    return summaries, {
+        "articles": fetched,
+        "unique_articles": len(everywhere),
+        "headlines_scored": len(headlines)
+    }
+
+
+# ======== Shared State Backend ========
+# "local" keeps history, sentiment snapshots and fan-out inside one process.
+# "shared" lets several workers on one Linux host (uvicorn --workers N) act as
+# one server: history lives in the shared SQLite archive, and events travel
+# over a Unix-domain socket hub run by whichever worker holds the primary lock
+STATE_BACKEND = os.environ.get("STATE_BACKEND", "local")
+STATE_DIR = os.environ.get("STATE_DIR", os.path.join(SCRIPT_DIR, "state"))
+STATE_RECONNECT_DELAY = float(os.environ.get("STATE_RECONNECT_DELAY", "1"))
+STATE_MAX_EVENT_BYTES = 16 * 1024 * 1024
+STATE_OUTBOX_SIZE = 1024
+
+
+class LocalStateBackend:
+    """Single-process backend: there are no other workers to tell.
+
+    Components apply their own changes locally and then ``publish`` them;
+    handlers registered with ``on`` only run for events from other workers.
+    """
+
+    name = "local"
+
+    def __init__(self):
+        self.handlers: Dict[str, list] = {}
+        self.is_primary = True
+        self._on_promote: list = []
+
+    def on(self, kind: str, handler):
+        self.handlers.setdefault(kind, []).append(handler)
+
+    def when_primary(self, callback):
+        """Run ``callback`` now if this worker does the once-per-host work, else when it takes over"""
+        if self.is_primary:
+            callback()
+        else:
+            self._on_promote.append(callback)
+
+    async def start(self):
+        pass
+
+    async def stop(self):
+        pass
+
+    async def publish(self, kind: str, data):
+        """Send an event to every other worker"""
+
+    async def _dispatch(self, kind: str, data):
+        for handler in self.handlers.get(kind, ()):
+            try:
+                result = handler(data)
+                if asyncio.iscoroutine(result):
+                    await result
+            except Exception as e:
+                print(f"State event error ({kind}): {e}")
+
+    def stats(self) -> dict:
+        return {"backend": self.name, "primary": self.is_primary}
+
+
+class SharedStateBackend(LocalStateBackend):
+    """Multi-worker backend for one host.
+
+    Workers race for an exclusive ``flock`` on ``primary.lock``; the winner
+    binds ``bus.sock`` and relays each event it receives to every other
+    worker. The rest connect to it and, when it goes away, retry until one of
+    them takes the lock over and runs the deferred ``when_primary`` work.
+    Events are newline-delimited JSON; while disconnected, outgoing events
+    wait in a bounded outbox.
+    """
+
+    name = "shared"
+
+    def __init__(self, directory: str = STATE_DIR, reconnect_delay: float = STATE_RECONNECT_DELAY):
+        super().__init__()
+        self.directory = directory
+        self.socket_path = os.path.join(directory, "bus.sock")
+        self.lock_path = os.path.join(directory, "primary.lock")
+        self.reconnect_delay = reconnect_delay
+        self.is_primary = False
+        self.events_sent = 0
+        self.events_received = 0
+        self.peers: set = set()
+        self._outbox: deque = deque(maxlen=STATE_OUTBOX_SIZE)
+        self._lock_file = None
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._reader: Optional[asyncio.StreamReader] = None
+        self._writer: Optional[asyncio.StreamWriter] = None
+        self._task: Optional[asyncio.Task] = None
+
+    async def start(self):
+        if fcntl is None:
+            raise RuntimeError("STATE_BACKEND=shared needs a Unix host (fcntl)")
+        os.makedirs(self.directory, exist_ok=True)
+        try:
+            await self._attach()
+        except OSError as e:
+            print(f"State bus not reachable yet: {e}")
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        self._disconnect()
+        for peer in list(self.peers):
+            peer.close()
+        self.peers.clear()
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+            if os.path.exists(self.socket_path):
+                os.unlink(self.socket_path)
+        if self._lock_file is not None:
+            self._lock_file.close()  # releases the lock for the next primary
+            self._lock_file = None
+        self.is_primary = False
+
+    async def publish(self, kind: str, data):
+        line = (encode_message({"kind": kind, "data": data}) + "\n").encode()
+        self.events_sent += 1
+        if self.is_primary:
+            self._relay(line)
+        elif self._writer is not None and not self._writer.is_closing():
+            self._writer.write(line)
+        else:
+            self._outbox.append(line)
+
+    def _try_lock(self) -> bool:
+        lock_file = open(self.lock_path, "a")
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            lock_file.close()
+            return False
+        self._lock_file = lock_file
+        return True
+
+    async def _attach(self):
+        """Become the primary if the lock is free, otherwise connect to the one that holds it"""
+        if self._try_lock():
+            if os.path.exists(self.socket_path):
+                os.unlink(self.socket_path)  # left behind by a primary that died
+            self._server = await asyncio.start_unix_server(
+                self._serve_peer, self.socket_path, limit=STATE_MAX_EVENT_BYTES
+            )
+            self.is_primary = True
+            print(f"State backend: worker {os.getpid()} is primary")
+            while self._outbox:
+                self._relay(self._outbox.popleft())
+            callbacks, self._on_promote = self._on_promote, []
+            for callback in callbacks:
+                callback()
+            return
+        self._reader, self._writer = await asyncio.open_unix_connection(
+            self.socket_path, limit=STATE_MAX_EVENT_BYTES
+        )
+        while self._outbox:
+            self._writer.write(self._outbox.popleft())
+
+    def _disconnect(self):
+        if self._writer is not None:
+            self._writer.close()
+        self._reader = self._writer = None
+
+    async def _run(self):
+        """Follower loop: apply events from the primary; reconnect or take over when it goes away"""
+        while not self.is_primary:
+            try:
+                if self._reader is None:
+                    await self._attach()
+                    continue
+                line = await self._reader.readline()
+                if not line:
+                    raise ConnectionError("primary closed the connection")
+                await self._receive(line)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"State bus error: {e!r}; retrying in {self.reconnect_delay}s")
+                self._disconnect()
+                await asyncio.sleep(self.reconnect_delay)
+
+    async def _serve_peer(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.peers.add(writer)
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                self._relay(line, exclude=writer)
+                await self._receive(line)
+        except Exception as e:
+            print(f"State bus peer error: {e!r}")
+        finally:
+            self.peers.discard(writer)
+            writer.close()
+
+    def _relay(self, line: bytes, exclude=None):
+        for peer in list(self.peers):
+            if peer is exclude:
+                continue
+            if peer.transport.get_write_buffer_size() > STATE_MAX_EVENT_BYTES:
+                print("State bus: dropping a worker that stopped reading")
+                self.peers.discard(peer)
+                peer.close()
+                continue
+            peer.write(line)
+
+    async def _receive(self, line: bytes):
+        event = json.loads(line)
+        self.events_received += 1
+        await self._dispatch(event["kind"], event["data"])
+
+    def stats(self) -> dict:
+        return {
+            **super().stats(),
+            "pid": os.getpid(),
+            "peers": len(self.peers),
+            "connected": self.is_primary or self._writer is not None,
+            "outbox": len(self._outbox),
+            "events_sent": self.events_sent,
+            "events_received": self.events_received
+        }
+
+
+state_backend = SharedStateBackend() if STATE_BACKEND == "shared" else LocalStateBackend()
+
+
+# ======== Prompt Compaction ========
+# Token budgets (estimated at ~4 characters per token) for the moderator's
+# synthesis prompt and for the history injected into every member's system
+# prompt (0 = no cap), and the estimated Jaccard similarity of word 3-shingles
+# at which two sentences count as the same point
+SYNTHESIS_PROMPT_TOKENS = int(os.environ.get("SYNTHESIS_PROMPT_TOKENS", "3000"))
+CONTEXT_SUMMARY_TOKENS = int(os.environ.get("CONTEXT_SUMMARY_TOKENS", "400"))
+COMPACTION_SIMILARITY = float(os.environ.get("COMPACTION_SIMILARITY", "0.5"))
+MINHASH_PERMUTATIONS = 64
+MINHASH_BANDS = 32
+
+_SENTENCE_BREAK = re.compile(r"(?<=[.!?])\s+|\s*\n\s*")
+_WORDS = re.compile(r"\$?\d+(?:[.,]\d+)*%?|[a-z][a-z']*")
+
+
+def estimate_tokens(text: str) -> int:
+    return (len(text) + 3) // 4
+
+
+class PromptCompactor:
+    """Fits several blocks of text (one per member or session) into a token budget.
+
+    Blocks are split into sentences and each sentence gets a MinHash
+    signature over its word 3-shingles. Banded LSH finds earlier sentences
+    it probably resembles; one whose estimated similarity to a kept sentence
+    reaches ``similarity`` is dropped, and the kept sentence counts the
+    repeat (shown as ``[+N]`` when ``mark_repeats`` is set). Earlier blocks
+    win ties; a block left with nothing of its own reads ``repeat_note``. If
+    the rest is still over budget, the budget is shared evenly between
+    blocks, short blocks passing on what they don't use, and each block keeps
+    its most distinctive sentences (most shingles no other block uses) in
+    their original order. A block whose every sentence is bigger than its
+    share keeps the start of its first sentence.
+    """
+
+    def __init__(self, name: str, budget_tokens: int, similarity: float = COMPACTION_SIMILARITY,
+                 mark_repeats: bool = False, repeat_note: str = "(no points beyond those above)",
+                 permutations: int = MINHASH_PERMUTATIONS, bands: int = MINHASH_BANDS):
+        self.name = name
+        self.budget_tokens = budget_tokens
+        self.mark_repeats = mark_repeats
+        self.repeat_note = repeat_note
+        self.bands = bands
+        self.rows = permutations // bands
+        self.min_matches = math.ceil(similarity * self.rows * bands)
+        # Fixed seed: the same responses always compact to the same prompt, so the response cache still hits
+        rng = np.random.default_rng(0x5EED)
+        self.a = rng.integers(1, 2 ** 63, self.rows * bands, dtype=np.uint64) | np.uint64(1)
+        self.b = rng.integers(0, 2 ** 63, self.rows * bands, dtype=np.uint64)
+        self.calls = 0
+        self.tokens_before = 0
+        self.tokens_after = 0
+        self.near_duplicates = 0
+
+    def _shingles(self, sentence: str) -> set:
+        words = _WORDS.findall(sentence.lower())
+        if len(words) < 3:
+            return {" ".join(words) or sentence.lower()}
+        return {" ".join(words[i:i + 3]) for i in range(len(words) - 2)}
+
+    def _signature(self, shingles: set) -> np.ndarray:
+        hashes = np.fromiter((zlib.crc32(s.encode("utf-8")) for s in shingles), dtype=np.uint64, count=len(shingles))
+        # Multiply-shift hashing; uint64 arithmetic wraps, which is what we want here
+        return ((self.a[:, None] * hashes[None, :] + self.b[:, None]) >> np.uint64(32)).min(axis=1)
+
+    def compact(self, blocks: List[Tuple[str, str]], fixed_tokens: int = 0) -> Tuple[List[str], dict]:
+        """Compact the bodies of ``(header, body)`` blocks; returns the new bodies and a size report"""
+        blocks = [(header, body or "") for header, body in blocks]
+        sentences = []  # (block, text, shingles, signature)
+        for index, (_, body) in enumerate(blocks):
+            for text in _SENTENCE_BREAK.split(body):
+                if text.strip():
+                    shingles = self._shingles(text)
+                    sentences.append((index, text.strip(), shingles, self._signature(shingles)))
+
+        # Near-duplicates: LSH candidates, confirmed on the full signature
+        buckets: Dict[tuple, List[int]] = {}
+        repeats = [0] * len(sentences)
+        kept = []
+        for i, (_, _, _, signature) in enumerate(sentences):
+            keys = [(band, signature[band * self.rows:(band + 1) * self.rows].tobytes()) for band in range(self.bands)]
+            match = next((
+                j for key in keys for j in buckets.get(key, ())
+                if np.count_nonzero(sentences[j][3] == signature) >= self.min_matches
+            ), None)
+            if match is not None:
+                repeats[match] += 1
+                continue
+            kept.append(i)
+            for key in keys:
+                buckets.setdefault(key, []).append(i)
+
+        clipped: Dict[int, str] = {}
+
+        def rendered(i: int) -> str:
+            if i in clipped:
+                return clipped[i]
+            text = sentences[i][1]
+            return f"{text} [+{repeats[i]}]" if self.mark_repeats and repeats[i] else text
+
+        per_block: Dict[int, List[int]] = {index: [] for index in range(len(blocks))}
+        for i in kept:
+            per_block[sentences[i][0]].append(i)
+        repeats_only = {index for index, (_, body) in enumerate(blocks) if body.strip() and not per_block[index]}
+
+        # Budget: water-fill the blocks from smallest to largest
+        available = None
+        if self.budget_tokens > 0:
+            headers = sum(estimate_tokens(header) for header, _ in blocks)
+            available = max(0, self.budget_tokens - fixed_tokens - headers)
+        trimmed = 0
+        if available is not None:
+            owners: Dict[str, set] = {}
+            for i in kept:
+                for shingle in sentences[i][2]:
+                    owners.setdefault(shingle, set()).add(sentences[i][0])
+            cost = {i: estimate_tokens(rendered(i)) + 1 for i in kept}
+            order = sorted(per_block, key=lambda index: sum(cost[i] for i in per_block[index]))
+            for position, index in enumerate(order):
+                share = available // (len(order) - position)
+                chosen, used = self._select(per_block[index], cost, owners, sentences, share)
+                if not chosen and per_block[index] and share > 1:
+                    first = per_block[index][0]
+                    clipped[first] = self._clip(rendered(first), share - 1)
+                    chosen, used = [first], estimate_tokens(clipped[first]) + 1
+                trimmed += len(per_block[index]) - len(chosen)
+                per_block[index] = chosen
+                available -= used
+
+        bodies = []
+        for index, (_, body) in enumerate(blocks):
+            selected = per_block[index]
+            originals = sum(1 for s in sentences if s[0] == index)
+            if len(selected) == originals and not clipped.keys() & set(selected) and \
+                    not any(repeats[i] for i in selected if self.mark_repeats):
+                bodies.append(body)
+            elif index in repeats_only:
+                bodies.append(self.repeat_note)
+            else:
+                bodies.append(" ".join(rendered(i) for i in selected))
+
+        before = fixed_tokens + sum(estimate_tokens(header + body) for header, body in blocks)
+        after = fixed_tokens + sum(estimate_tokens(header + body) for (header, _), body in zip(blocks, bodies))
+        duplicates = len(sentences) - len(kept)
+        self.calls += 1
+        self.tokens_before += before
+        self.tokens_after += after
+        self.near_duplicates += duplicates
+        prompt_tokens_total.inc(self.name, "original", amount=before)
+        prompt_tokens_total.inc(self.name, "compacted", amount=after)
+        return bodies, {
+            "sentences": len(sentences),
+            "near_duplicates": duplicates,
+            "trimmed": trimmed,
+            "tokens_before": before,
+            "tokens_after": after,
+            "reduction_pct": round((1 - after / before) * 100, 1) if before else 0.0
+        }
+
+    @staticmethod
+    def _select(block: List[int], cost: Dict[int, int], owners: Dict[str, set], sentences: list, share: int):
+        """Most distinctive sentences of one block that fit in ``share`` tokens, in original order"""
+        total = sum(cost[i] for i in block)
+        if total <= share:
+            return block, total
+
+        def distinctive(i: int) -> float:
+            shingles = sentences[i][2]
+            return sum(1 for s in shingles if len(owners[s]) == 1) / len(shingles)
+
+        chosen, used = [], 0
+        # Stable sort: among equally distinctive sentences the earlier one wins
+        for i in sorted(block, key=distinctive, reverse=True):
+            if used + cost[i] <= share:
+                chosen.append(i)
+                used += cost[i]
+        return sorted(chosen), used
+
+    @staticmethod
+    def _clip(text: str, tokens: int) -> str:
+        """``text`` cut at a word boundary to fit ``tokens``, marked with an ellipsis"""
+        limit = tokens * 4 - 1
+        if len(text) <= limit + 1:
+            return text
+        head = text[:limit]
+        return (head.rsplit(" ", 1)[0] if " " in head else head).rstrip() + "…"
+
+    def stats(self) -> dict:
+        return {
+            "calls": self.calls,
+            "budget_tokens": self.budget_tokens,
+            "tokens_before": self.tokens_before,
+            "tokens_after": self.tokens_after,
+            "near_duplicates": self.near_duplicates,
+            "reduction_pct": round((1 - self.tokens_after / self.tokens_before) * 100, 1) if self.tokens_before else 0.0
+        }
+
+
+synthesis_compactor = PromptCompactor("synthesis", SYNTHESIS_PROMPT_TOKENS, mark_repeats=True)
+context_compactor = PromptCompactor("context", CONTEXT_SUMMARY_TOKENS, repeat_note="(same points as a later session)")
+
+
+# ======== Conversation Database ========
+# SQLite archive of every council session; set to "" to keep history in memory only
+CONVERSATION_DB_PATH = os.environ.get("CONVERSATION_DB_PATH", os.path.join(SCRIPT_DIR, "council_history.db"))
+CONVERSATION_FLUSH_INTERVAL = float(os.environ.get("CONVERSATION_FLUSH_INTERVAL", "0.5"))
+
+
 class ConversationDatabase:
-    def __init__(self, max_history: int = 50):
-        self.conversations: List[Dict] = []
+    """Recent council sessions in a fixed-size ring buffer, archived to SQLite.
+
+    The ring buffer is the hot window used for prompt context. Every entry is
+    also queued for an append-only SQLite (WAL) archive; a background task
+    writes queued entries in batches from a worker thread so the event loop
+    never waits on disk. IDs are monotonic and continue across restarts.
+    ``clear_history`` only empties the hot window; the archive is kept, and
+    the last cleared id is stored with it so a restart doesn't reload them.
+
+    With ``shared`` set, several workers use the same archive: each entry is
+    inserted straight away so SQLite hands out the id, and the other workers
+    add it to their hot windows when it arrives over the state backend.
+    """
+
+    def __init__(self, max_history: int = 50, path: str = CONVERSATION_DB_PATH,
+                 flush_interval: float = CONVERSATION_FLUSH_INTERVAL, shared: bool = STATE_BACKEND == "shared"):
+        self.recent: deque = deque(maxlen=max_history)
         self.max_history = max_history
-    
-    def add_conversation(self, question: str, responses: List[Dict], synthesis: str, rankings: List[Dict] = None):
+        self.path = path
+        self.shared = shared
+        self.flush_interval = flush_interval
+        self.next_id = 1
+        self._pending: List[Dict] = []
+        self._wake = asyncio.Event()
+        self._writer: Optional[asyncio.Task] = None
+        self._db: Optional[sqlite3.Connection] = None
+        self._db_lock = threading.Lock()
+        self._context_cache: tuple = (None, "")
+
+    async def start(self):
+        """Open the archive, reload the hot window and start the batch writer"""
+        if self.shared and not self.path:
+            raise RuntimeError("STATE_BACKEND=shared needs CONVERSATION_DB_PATH for the shared history")
+        if not self.path or self._writer is not None:
+            return
+        self.recent.extend(await asyncio.to_thread(self._load_recent))
+        if not self.shared:
+            self._writer = asyncio.create_task(self._write_loop())
+
+    async def stop(self):
+        if self._writer is not None:
+            self._writer.cancel()
+            await asyncio.gather(self._writer, return_exceptions=True)
+            self._writer = None
+        await self.flush()
+        with self._db_lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+    async def add_conversation(self, question: str, responses: List[Dict], synthesis: str,
+                               rankings: List[Dict] = None) -> Dict:
         entry = {
-            "id": len(self.conversations) + 1,
+            "id": None,
             "timestamp": datetime.now().isoformat(),
             "question": question,
             "responses": [
@@ -227,39 +1282,254 @@ class ConversationDatabase:
             "synthesis": synthesis[:1000] if synthesis else "",
             "rankings": rankings or []
         }
-        self.conversations.append(entry)
-        
-        if len(self.conversations) > self.max_history:
-            self.conversations = self.conversations[-self.max_history:]
+        if self.shared:
+            # The archive is the one id sequence every worker shares
+            entry["id"] = await asyncio.to_thread(self._insert, entry)
+        else:
+            entry["id"] = self.next_id
+            self.next_id += 1
+            if self.path:
+                self._pending.append(entry)
+                self._wake.set()
+        self.remember(entry)
+        await state_backend.publish("conversation", entry)
+        return entry
+
+    def remember(self, entry: Dict):
+        """Add an entry to the hot window, keeping id order when workers' entries cross"""
+        if self.recent and entry["id"] < self.recent[-1]["id"]:
+            entries = sorted([*self.recent, entry], key=lambda e: e["id"])[-self.max_history:]
+            self.recent.clear()
+            self.recent.extend(entries)
+        else:
+            self.recent.append(entry)
     
     def get_context_summary(self, max_entries: int = 5) -> str:
-        if not self.conversations:
+        """Recent sessions for the member prompts, capped at ``CONTEXT_SUMMARY_TOKENS``"""
+        if not self.recent:
             return ""
         
-        recent = self.conversations[-max_entries:]
-        context_parts = ["=== PREVIOUS COUNCIL DISCUSSIONS ===\n"]
-        
-        for conv in recent:
-            context_parts.append(f"\n[Session #{conv['id']}]")
-            context_parts.append(f"USER QUESTION: {conv['question']}")
-            context_parts.append(f"SYNTHESIS: {conv['synthesis'][:200]}...")
+        # Newest first, so a point repeated across sessions is kept in its latest form
+        recent = list(islice(reversed(self.recent), max_entries))
+        key = (max_entries, tuple(conv["id"] for conv in recent))
+        if self._context_cache[0] == key:
+            return self._context_cache[1]
+
+        title = "=== PREVIOUS COUNCIL DISCUSSIONS ===\n"
+        blocks = [
+            (f"\n[Session #{conv['id']}]\nUSER QUESTION: {conv['question']}\nSYNTHESIS: ", conv["synthesis"])
+            for conv in recent
+        ]
+        bodies, _ = context_compactor.compact(blocks, fixed_tokens=estimate_tokens(title))
+        context_parts = [title] + [header + body for (header, _), body in zip(blocks, bodies)][::-1]
         
-        return "\n".join(context_parts)
+        summary = "\n".join(context_parts)
+        self._context_cache = (key, summary)
+        return summary
     
     def get_all_conversations(self) -> List[Dict]:
-        return self.conversations
+        return list(self.recent)
     
     def get_conversation_count(self) -> int:
-        return len(self.conversations)
+        return len(self.recent)
     
-    def clear_history(self):
-        self.conversations = []
+    async def clear_history(self):
+        self.recent.clear()
+        if self.path:
+            await self.flush()
+            await asyncio.to_thread(self._mark_cleared)
+        await state_backend.publish("history_cleared", {})
+
+    async def get_conversation(self, conversation_id: int) -> Optional[Dict]:
+        for entry in self.recent:
+            if entry["id"] == conversation_id:
+                return entry
+        if not self.path:
+            return None
+        await self.flush()
+        rows = await asyncio.to_thread(
+            self._query, "SELECT * FROM conversations WHERE id = ?", (conversation_id,)
+        )
+        return rows[0] if rows else None
+
+    async def get_history(self, before_id: Optional[int] = None, limit: int = 20,
+                          since: Optional[str] = None, until: Optional[str] = None) -> List[Dict]:
+        """Newest-first page of archived sessions; pass the last id seen as ``before_id`` for the next page"""
+        if not self.path:
+            entries = [
+                e for e in reversed(self.recent)
+                if (before_id is None or e["id"] < before_id)
+                and (since is None or e["timestamp"] >= since)
+                and (until is None or e["timestamp"] <= until)
+            ]
+            return entries[:limit]
+
+        await self.flush()
+        clauses, params = [], []
+        if before_id is not None:
+            clauses.append("id < ?")
+            params.append(before_id)
+        if since is not None:
+            clauses.append("timestamp >= ?")
+            params.append(since)
+        if until is not None:
+            clauses.append("timestamp <= ?")
+            params.append(until)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        params.append(limit)
+        return await asyncio.to_thread(
+            self._query, f"SELECT * FROM conversations {where} ORDER BY id DESC LIMIT ?", tuple(params)
+        )
+
+    async def flush(self):
+        """Write all queued entries to the archive; if the write fails they stay queued"""
+        batch, self._pending = self._pending, []
+        if not batch:
+            return
+        try:
+            await asyncio.to_thread(self._write_batch, batch)
+        except BaseException:
+            # Entries queued meanwhile go after the failed batch so ids stay in order
+            self._pending = batch + self._pending
+            raise
+
+    async def _write_loop(self):
+        while True:
+            await self._wake.wait()
+            # Give concurrent sessions a moment to land in the same batch
+            await asyncio.sleep(self.flush_interval)
+            self._wake.clear()
+            try:
+                await self.flush()
+            except Exception as e:
+                archive_write_errors_total.inc()
+                print(f"Conversation archive write error, retrying {len(self._pending)} entries: {e}")
+                self._wake.set()
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._db is None:
+            self._db = sqlite3.connect(self.path, check_same_thread=False)
+            self._db.row_factory = sqlite3.Row
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("PRAGMA synchronous=NORMAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS conversations ("
+                "id INTEGER PRIMARY KEY, timestamp TEXT NOT NULL, question TEXT, "
+                "responses TEXT, synthesis TEXT, rankings TEXT)"
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS conversations_timestamp ON conversations (timestamp)")
+            self._db.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value INTEGER)")
+        return self._db
+
+    @staticmethod
+    def _row(entry: Dict) -> tuple:
+        return (entry["id"], entry["timestamp"], entry["question"], json.dumps(entry["responses"]),
+                entry["synthesis"], json.dumps(entry["rankings"]))
+
+    def _write_batch(self, batch: List[Dict]):
+        with self._db_lock:
+            db = self._connect()
+            try:
+                db.executemany("INSERT OR REPLACE INTO conversations VALUES (?, ?, ?, ?, ?, ?)", map(self._row, batch))
+                db.commit()
+            except Exception:
+                db.rollback()
+                raise
+
+    def _insert(self, entry: Dict) -> int:
+        """Insert one entry and return the id SQLite assigned to it"""
+        with self._db_lock:
+            db = self._connect()
+            cursor = db.execute("INSERT INTO conversations VALUES (?, ?, ?, ?, ?, ?)", self._row(entry))
+            db.commit()
+            return cursor.lastrowid
+
+    def _query(self, sql: str, params: tuple) -> List[Dict]:
+        with self._db_lock:
+            rows = self._connect().execute(sql, params).fetchall()
+        return [
+            {**dict(row), "responses": json.loads(row["responses"]), "rankings": json.loads(row["rankings"])}
+            for row in rows
+        ]
+
+    def _mark_cleared(self):
+        """Remember that every archived session so far was cleared from the hot window"""
+        with self._db_lock:
+            db = self._connect()
+            db.execute(
+                "INSERT OR REPLACE INTO meta VALUES "
+                "('cleared_through', (SELECT COALESCE(MAX(id), 0) FROM conversations))"
+            )
+            db.commit()
+
+    def _load_recent(self) -> List[Dict]:
+        rows = self._query(
+            "SELECT * FROM conversations WHERE id > "
+            "(SELECT COALESCE(MAX(value), 0) FROM meta WHERE key = 'cleared_through') "
+            "ORDER BY id DESC LIMIT ?", (self.max_history,)
+        )
+        with self._db_lock:
+            last_id = self._connect().execute("SELECT MAX(id) FROM conversations").fetchone()[0]
+        if last_id:
+            self.next_id = max(self.next_id, last_id + 1)
+        return rows[::-1]
 
 
 conversation_db = ConversationDatabase()
+state_backend.on("conversation", conversation_db.remember)
+state_backend.on("history_cleared", lambda _: conversation_db.recent.clear())
 
 # Ollama API endpoint
-OLLAMA_BASE_URL = "http://localhost:11434"
+OLLAMA_BASE_URL = os.environ.get("OLLAMA_BASE_URL", "http://localhost:11434")
+
+# Shared Ollama connection pool
+OLLAMA_CONNECT_TIMEOUT = float(os.environ.get("OLLAMA_CONNECT_TIMEOUT", "5"))
+OLLAMA_READ_TIMEOUT = float(os.environ.get("OLLAMA_READ_TIMEOUT", "120"))
+OLLAMA_MAX_CONNECTIONS = int(os.environ.get("OLLAMA_MAX_CONNECTIONS", "64"))
+OLLAMA_MAX_CONNECTIONS_PER_HOST = int(os.environ.get("OLLAMA_MAX_CONNECTIONS_PER_HOST", "32"))
+OLLAMA_MAX_KEEPALIVE = int(os.environ.get("OLLAMA_MAX_KEEPALIVE", "32"))
+OLLAMA_KEEPALIVE_EXPIRY = float(os.environ.get("OLLAMA_KEEPALIVE_EXPIRY", "60"))
+
+# Token streaming: relay partial output, coalesced into frames of at most
+# TOKEN_FLUSH_CHARS characters or TOKEN_FLUSH_INTERVAL seconds
+OLLAMA_STREAMING = os.environ.get("OLLAMA_STREAMING", "1") != "0"
+TOKEN_FLUSH_INTERVAL = float(os.environ.get("TOKEN_FLUSH_INTERVAL", "0.05"))
+TOKEN_FLUSH_CHARS = int(os.environ.get("TOKEN_FLUSH_CHARS", "64"))
+
+# Model response cache; RESPONSE_CACHE_PATH enables the on-disk (SQLite) copy
+RESPONSE_CACHE_TTL = float(os.environ.get("RESPONSE_CACHE_TTL", "3600"))
+RESPONSE_CACHE_MAX_ENTRIES = int(os.environ.get("RESPONSE_CACHE_MAX_ENTRIES", "512"))
+RESPONSE_CACHE_MAX_BYTES = int(os.environ.get("RESPONSE_CACHE_MAX_BYTES", str(8 * 1024 * 1024)))
+RESPONSE_CACHE_PATH = os.environ.get("RESPONSE_CACHE_PATH", "")
+
+# Council execution limits (seconds / number of simultaneous model calls)
+COUNCIL_MAX_CONCURRENCY = int(os.environ.get("COUNCIL_MAX_CONCURRENCY", "10"))
+COUNCIL_MODEL_TIMEOUT = float(os.environ.get("COUNCIL_MODEL_TIMEOUT", "90"))
+COUNCIL_SESSION_TIMEOUT = float(os.environ.get("COUNCIL_SESSION_TIMEOUT", "150"))
+
+# Admission control shared by all clients: concurrent sessions / model calls,
+# per-client quotas, and the longest queue before new sessions are rejected
+COUNCIL_MAX_SESSIONS = int(os.environ.get("COUNCIL_MAX_SESSIONS", "4"))
+COUNCIL_SESSIONS_PER_CLIENT = int(os.environ.get("COUNCIL_SESSIONS_PER_CLIENT", "1"))
+COUNCIL_MAX_QUEUE = int(os.environ.get("COUNCIL_MAX_QUEUE", "16"))
+MODEL_CALL_BUDGET = int(os.environ.get("MODEL_CALL_BUDGET", "24"))
+MODEL_CALLS_PER_CLIENT = int(os.environ.get("MODEL_CALLS_PER_CLIENT", "10"))
+
+# Model health: probe interval, circuit breaker thresholds, and how long the
+# moderator may run before a backup synthesis is started (0 disables hedging)
+HEALTH_PROBE_INTERVAL = float(os.environ.get("HEALTH_PROBE_INTERVAL", "15"))
+HEALTH_PROBE_TIMEOUT = float(os.environ.get("HEALTH_PROBE_TIMEOUT", "10"))
+BREAKER_FAILURE_THRESHOLD = int(os.environ.get("BREAKER_FAILURE_THRESHOLD", "3"))
+BREAKER_COOLDOWN = float(os.environ.get("BREAKER_COOLDOWN", "60"))
+SYNTHESIS_HEDGE_AFTER = float(os.environ.get("SYNTHESIS_HEDGE_AFTER", "0"))
+
+# Peer ranking: up to RANKING_MAX_RANKERS members score each other; the stage
+# ends once RANKING_QUORUM rankings parse or RANKING_TIMEOUT passes
+RANKING_QUORUM = int(os.environ.get("RANKING_QUORUM", "3"))
+RANKING_MAX_RANKERS = int(os.environ.get("RANKING_MAX_RANKERS", "5"))
+RANKING_TIMEOUT = float(os.environ.get("RANKING_TIMEOUT", "45"))
+RANKING_MAX_RESPONSE_CHARS = int(os.environ.get("RANKING_MAX_RESPONSE_CHARS", "1200"))
+RANKING_PROMPT_BUDGET = int(os.environ.get("RANKING_PROMPT_BUDGET", "9000"))
 
 # AI Council Members - Each model with a persona
 AI_COUNCIL = [
@@ -343,48 +1613,1792 @@ Create a synthesis that:
 Keep your synthesis to 4-6 paragraphs. Be authoritative and professional."""
 
 
-class ConnectionManager:
-    def __init__(self):
-        self.active_connections: list[WebSocket] = []
+# Outgoing WebSocket frames are queued per connection; a consumer that falls
+# WS_SEND_QUEUE_SIZE frames behind either loses its oldest droppable frames
+# ("drop_oldest") or is disconnected ("disconnect")
+WS_SEND_QUEUE_SIZE = int(os.environ.get("WS_SEND_QUEUE_SIZE", "256"))
+WS_SEND_TIMEOUT = float(os.environ.get("WS_SEND_TIMEOUT", "10"))
+WS_SLOW_CONSUMER_POLICY = os.environ.get("WS_SLOW_CONSUMER_POLICY", "drop_oldest")
+
+
+def encode_message(message: dict) -> str:
+    # Same encoding as WebSocket.send_json
+    return json.dumps(message, separators=(",", ":"), ensure_ascii=False)
+
+
+class ClientChannel:
+    """Bounded outgoing queue for one socket, drained by its own writer task.
+
+    Broadcast frames are marked droppable; frames addressed to this client
+    (session output) never are, so when they overflow the queue the client is
+    cut loose instead. A send that errors or stalls past ``send_timeout`` also
+    closes the channel.
+    """
+
+    def __init__(self, websocket: WebSocket, on_dead, max_size: int = WS_SEND_QUEUE_SIZE,
+                 policy: str = WS_SLOW_CONSUMER_POLICY, send_timeout: float = WS_SEND_TIMEOUT):
+        self.websocket = websocket
+        self.on_dead = on_dead
+        self.max_size = max_size
+        self.policy = policy
+        self.send_timeout = send_timeout
+        self.topics: set = set()
+        self.quote_symbols: set = set()
+        self.closed = False
+        self.dropped = 0
+        self._queue: deque = deque()
+        self._ready = asyncio.Event()
+        self._writer = asyncio.create_task(self._drain())
+
+    @property
+    def queued(self) -> int:
+        return len(self._queue)
+
+    def put(self, text: str, droppable: bool = False) -> bool:
+        if self.closed:
+            return False
+        if len(self._queue) >= self.max_size:
+            if not (self.policy == "drop_oldest" and self._drop_oldest()):
+                self.on_dead(self, "slow consumer")
+                return False
+        self._queue.append((text, droppable))
+        self._ready.set()
+        return True
+
+    def _drop_oldest(self) -> bool:
+        for index, (_, droppable) in enumerate(self._queue):
+            if droppable:
+                del self._queue[index]
+                self.dropped += 1
+                return True
+        return False
+
+    async def _drain(self):
+        try:
+            while True:
+                await self._ready.wait()
+                while self._queue:
+                    text, _ = self._queue.popleft()
+                    started = time.perf_counter()
+                    await asyncio.wait_for(self.websocket.send_text(text), self.send_timeout)
+                    ws_send_seconds.observe(time.perf_counter() - started)
+                    ws_frames_total.inc()
+                self._ready.clear()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            self.on_dead(self, f"send failed: {e!r}")
+
+    def close(self):
+        if self.closed:
+            return
+        self.closed = True
+        self._queue.clear()
+        if self._writer is not asyncio.current_task():
+            self._writer.cancel()
+
+
+class ConnectionManager:
+    def __init__(self):
+        self.active_connections: list[WebSocket] = []
+        self.channels: Dict[WebSocket, ClientChannel] = {}
+        self.dropped_frames = 0
+        self.slow_disconnects = 0
 
     async def connect(self, websocket: WebSocket):
         await websocket.accept()
         self.active_connections.append(websocket)
+        self.channels[websocket] = ClientChannel(websocket, self._on_dead)
 
     def disconnect(self, websocket: WebSocket):
         if websocket in self.active_connections:
             self.active_connections.remove(websocket)
+        channel = self.channels.pop(websocket, None)
+        if channel is not None:
+            self.dropped_frames += channel.dropped
+            channel.close()
+
+    def _on_dead(self, channel: ClientChannel, reason: str):
+        """A channel overflowed or its socket errored: drop it and close the socket"""
+        if channel.closed:
+            return
+        if reason == "slow consumer":
+            self.slow_disconnects += 1
+        print(f"Dropping WebSocket client: {reason}")
+        self.disconnect(channel.websocket)
+        asyncio.create_task(self._close_quietly(channel.websocket))
+
+    @staticmethod
+    async def _close_quietly(websocket: WebSocket):
+        try:
+            await websocket.close(code=1013)
+        except Exception:
+            pass
+
+    async def send(self, websocket: WebSocket, message: dict):
+        """Queue a frame for one client; never blocks on the network"""
+        channel = self.channels.get(websocket)
+        if channel is not None:
+            channel.put(encode_message(message))
+
+    def subscribe(self, websocket: WebSocket, topics, replace: bool = False):
+        """Subscribe a socket to sentiment updates for ``topics``"""
+        channel = self.channels.get(websocket)
+        if channel is None:
+            return
+        keys = {normalize_topic(topic) for topic in topics if topic}
+        if replace:
+            channel.topics = keys
+        else:
+            channel.topics |= keys
+
+    def unsubscribe(self, websocket: WebSocket, topics):
+        channel = self.channels.get(websocket)
+        if channel is not None:
+            channel.topics -= {normalize_topic(topic) for topic in topics}
 
     async def broadcast(self, message: dict):
-        for connection in self.active_connections:
-            try:
-                await connection.send_json(message)
-            except:
-                pass
+        text = encode_message(message)  # serialize once for every subscriber
+        for channel in list(self.channels.values()):
+            channel.put(text, droppable=True)
+
+    async def publish(self, topic: str, message: dict):
+        """Send ``message`` to every socket subscribed to ``topic``"""
+        key = normalize_topic(topic)
+        text = None
+        for channel in list(self.channels.values()):
+            if key in channel.topics:
+                text = text or encode_message(message)
+                channel.put(text, droppable=True)
+
+    def subscribe_quotes(self, websocket: WebSocket, symbols):
+        channel = self.channels.get(websocket)
+        if channel is not None:
+            channel.quote_symbols = set(symbols)
+
+    async def publish_quotes(self, quotes: Dict[str, dict]):
+        """Send each subscriber the subset of ``quotes`` it follows, one frame per distinct subset"""
+        frames: Dict[frozenset, str] = {}
+        for channel in list(self.channels.values()):
+            wanted = frozenset(channel.quote_symbols & quotes.keys())
+            if not wanted:
+                continue
+            if wanted not in frames:
+                frames[wanted] = encode_message({
+                    "type": "quotes",
+                    "data": [quotes[symbol] for symbol in sorted(wanted)]
+                })
+            channel.put(frames[wanted], droppable=True)
+
+    def stats(self) -> dict:
+        return {
+            "connections": len(self.channels),
+            "queued_frames": sum(c.queued for c in self.channels.values()),
+            "dropped_frames": self.dropped_frames + sum(c.dropped for c in self.channels.values()),
+            "slow_consumer_disconnects": self.slow_disconnects
+        }
 
 
 manager = ConnectionManager()
 
 
-async def query_ollama(model_id: str, prompt: str, system: str = "") -> Optional[str]:
-    """Query a specific Ollama model"""
+# ======== Background Sentiment Refresh ========
+# Topics refreshed server-side; defaults mirror the symbols in MARKETS (app.js)
+SENTIMENT_WATCHLIST = [
+    topic.strip() for topic in os.environ.get(
+        "SENTIMENT_WATCHLIST",
+        "Bitcoin,Ethereum,Solana,Gold price,EUR USD,USD JPY,"
+        "NVIDIA stock,Alphabet stock,Amazon stock,Apple stock,Tesla stock"
+    ).split(",") if topic.strip()
+]
+SENTIMENT_REFRESH_INTERVAL = float(os.environ.get("SENTIMENT_REFRESH_INTERVAL", "300"))  # 0 disables
+SENTIMENT_REFRESH_JITTER = float(os.environ.get("SENTIMENT_REFRESH_JITTER", "30"))
+SENTIMENT_REFRESH_STAGGER = float(os.environ.get("SENTIMENT_REFRESH_STAGGER", "2"))
+
+
+def normalize_topic(topic: str) -> str:
+    return " ".join(topic.lower().split())
+
+
+class SentimentScheduler:
+    """Keeps a fresh sentiment snapshot for each watched topic.
+
+    Every topic gets its own refresh loop; start times are staggered and each
+    interval is jittered so upstream fetches don't line up. New snapshots are
+    pushed to subscribed sockets, and on-demand requests are answered from the
+    latest snapshot while it is younger than ``max_age``. Only watched topics
+    are written to the sentiment history, so arbitrary lookups can't add files.
+    """
+
+    def __init__(self, topics: List[str] = SENTIMENT_WATCHLIST,
+                 interval: float = SENTIMENT_REFRESH_INTERVAL,
+                 jitter: float = SENTIMENT_REFRESH_JITTER,
+                 stagger: float = SENTIMENT_REFRESH_STAGGER):
+        self.topics = list(topics)
+        self.watched = {normalize_topic(topic) for topic in self.topics}
+        self.interval = interval
+        self.jitter = jitter
+        self.stagger = stagger
+        self.max_age = interval * 3
+        self.snapshots: Dict[str, tuple] = {}
+        self._tasks: List[asyncio.Task] = []
+
+    def start(self):
+        if self.interval <= 0 or self._tasks:
+            return
+        for index, topic in enumerate(self.topics):
+            self._tasks.append(asyncio.create_task(self._run(topic, index * self.stagger)))
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def _run(self, topic: str, delay: float):
+        await asyncio.sleep(delay)
+        agent = NewsAgent(topic)
+        while True:
+            try:
+                await self.refresh(topic, agent)
+            except Exception as e:
+                print(f"Sentiment refresh error for {topic}: {e}")
+            await asyncio.sleep(max(1.0, self.interval + random.uniform(-self.jitter, self.jitter)))
+
+    async def refresh(self, topic: str, agent: Optional[NewsAgent] = None) -> Optional[dict]:
+        agent = agent or NewsAgent(topic)
+        summary = await agent.get_sentiment_summary(refresh=True)
+        if summary:
+            await self.share({"topic": topic, "summary": summary, "fresh": True})
+        return summary
+
+    async def share(self, snapshot: dict):
+        await self.apply(snapshot)
+        await state_backend.publish("sentiment", snapshot)
+
+    async def apply(self, snapshot: dict):
+        """Record a snapshot from any worker; fresh ones are also served and pushed to subscribers"""
+        topic, summary = snapshot["topic"], snapshot["summary"]
+        if state_backend.is_primary and normalize_topic(topic) in self.watched:
+            sentiment_history.record(topic, summary)  # single writer per history file
+        if snapshot["fresh"]:
+            self.snapshots[normalize_topic(topic)] = (time.monotonic(), summary)
+            await manager.publish(topic, {"type": "news_sentiment", "data": summary})
+
+    def latest(self, topic: str) -> Optional[dict]:
+        entry = self.snapshots.get(normalize_topic(topic))
+        if entry is None or time.monotonic() - entry[0] > self.max_age:
+            return None
+        return entry[1]
+
+    async def get_summary(self, topic: str) -> Optional[dict]:
+        """Latest snapshot if there is one, otherwise an on-demand (cached) fetch"""
+        snapshot = self.latest(topic)
+        if snapshot is not None:
+            return snapshot
+        summary = await NewsAgent(topic).get_sentiment_summary()
+        if summary:
+            await self.share({"topic": topic, "summary": summary, "fresh": False})
+        return summary
+
+    async def get_summaries(self, topics: List[str]) -> dict:
+        """Summaries for several topics in one pass.
+
+        Topics with a live snapshot are answered from it. The rest are
+        downloaded concurrently, at most ``NEWS_BATCH_CONCURRENCY`` at a time,
+        and scored together so shared headlines are only scored once.
+        """
+        by_key: Dict[str, str] = {}
+        for topic in topics:
+            if topic and topic.strip():
+                by_key.setdefault(normalize_topic(topic), topic.strip())
+        unique = list(by_key.values())
+        if len(unique) > NEWS_BATCH_MAX_TOPICS:
+            raise ValueError(f"At most {NEWS_BATCH_MAX_TOPICS} topics per request")
+        results = {topic: self.latest(topic) for topic in unique}
+        missing = [topic for topic, snapshot in results.items() if snapshot is None]
+        semaphore = asyncio.Semaphore(max(1, NEWS_BATCH_CONCURRENCY))
+
+        async def fetch(topic: str) -> List[Dict]:
+            async with semaphore:
+                return await NewsAgent(topic).fetch_news(days_ago=1, max_articles=100)
+
+        fetched = await asyncio.gather(*(fetch(topic) for topic in missing))
+        summaries, stats = summarize_topics(dict(zip(missing, fetched)))
+        for topic, summary in summaries.items():
+            results[topic] = summary
+            if summary:
+                await self.share({"topic": topic, "summary": summary, "fresh": False})
+        return {"results": results, "stats": {**stats, "from_snapshot": len(unique) - len(missing)}}
+
+
+sentiment_scheduler = SentimentScheduler()
+state_backend.on("sentiment", sentiment_scheduler.apply)
+
+
+# ======== Sentiment History ========
+# One append-only file of fixed-width records per topic; set to "" to disable
+SENTIMENT_HISTORY_DIR = os.environ.get("SENTIMENT_HISTORY_DIR", os.path.join(SCRIPT_DIR, "sentiment_history"))
+SENTIMENT_HISTORY_MIN_SPACING = float(os.environ.get("SENTIMENT_HISTORY_MIN_SPACING", "60"))
+SENTIMENT_HISTORY_OPEN_MAPS = int(os.environ.get("SENTIMENT_HISTORY_OPEN_MAPS", "32"))  # each holds a file descriptor
+SENTIMENT_HISTORY_WINDOWS = {"1h": 3600, "24h": 86400, "7d": 7 * 86400, "30d": 30 * 86400}
+
+
+class SentimentHistory:
+    """Compact time series of sentiment snapshots, one binary file per topic.
+
+    Each snapshot is a 16-byte record (timestamp, article counts, confidence),
+    so a topic sampled every five minutes grows by about 140 KB a month.
+    Files are only ever appended to; reads memory-map them and aggregate
+    with NumPy over the time range they need, without building Python
+    objects per record. Snapshots closer than ``min_spacing`` to the previous
+    one for the same topic are skipped so cached re-reads don't pad the series.
+    At most ``max_maps`` files stay mapped; the least recently read is unmapped.
+    """
+
+    MAGIC = b"SNTH\x01\x00\x00\x00"
+    RECORD = np.dtype([
+        ("ts", "<u4"), ("total", "<u2"), ("agree", "<u2"),
+        ("disagree", "<u2"), ("neutral", "<u2"), ("confidence", "<f4")
+    ])
+
+    def __init__(self, directory: str = SENTIMENT_HISTORY_DIR, min_spacing: float = SENTIMENT_HISTORY_MIN_SPACING,
+                 max_maps: int = SENTIMENT_HISTORY_OPEN_MAPS):
+        self.directory = directory
+        self.min_spacing = min_spacing
+        self.max_maps = max(1, max_maps)
+        self.last_recorded: Dict[str, int] = {}
+        self._maps: OrderedDict = OrderedDict()  # path -> (size, memmap), least recently read first
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.directory)
+
+    def _path(self, topic: str) -> str:
+        slug = re.sub(r"[^a-z0-9]+", "-", normalize_topic(topic)).strip("-") or "topic"
+        return os.path.join(self.directory, f"{slug}.bin")
+
+    def record(self, topic: str, summary: dict, timestamp: Optional[float] = None) -> bool:
+        if not self.enabled or not summary:
+            return False
+        path = self._path(topic)
+        ts = int(timestamp if timestamp is not None else time.time())
+        last = self.last_recorded.get(path)
+        if last is None:
+            records = self._records(path)
+            last = int(records["ts"][-1]) if len(records) else None
+        if last is not None and ts - last < self.min_spacing:
+            return False
+        entry = np.zeros(1, dtype=self.RECORD)
+        entry["ts"] = ts
+        for field in ("total", "agree", "disagree", "neutral"):
+            entry[field] = min(int(summary.get(field, 0)), 65535)
+        entry["confidence"] = summary.get("confidence", 0)
+        os.makedirs(self.directory, exist_ok=True)
+        with open(path, "ab") as f:
+            if f.tell() == 0:
+                f.write(self.MAGIC)
+            f.write(entry.tobytes())
+        self.last_recorded[path] = ts
+        return True
+
+    def _records(self, path: str) -> np.ndarray:
+        """Memory-mapped records for ``path``; remapped only when the file has grown"""
+        try:
+            size = os.path.getsize(path)
+        except OSError:
+            return np.zeros(0, dtype=self.RECORD)
+        count = (size - len(self.MAGIC)) // self.RECORD.itemsize
+        if count <= 0:
+            return np.zeros(0, dtype=self.RECORD)
+        cached = self._maps.get(path)
+        if cached is None or cached[0] != size:
+            records = np.memmap(path, dtype=self.RECORD, mode="r", offset=len(self.MAGIC), shape=(count,))
+            self._maps[path] = cached = (size, records)
+        self._maps.move_to_end(path)
+        while len(self._maps) > self.max_maps:
+            # Dropping the last reference unmaps the file and releases its descriptor
+            self._maps.popitem(last=False)
+        return cached[1]
+
+    def _window(self, records: np.ndarray, start: float, end: float) -> np.ndarray:
+        times = records["ts"]
+        lo = int(np.searchsorted(times, start, side="left"))
+        hi = int(np.searchsorted(times, end, side="right"))
+        return records[lo:hi]
+
+    @staticmethod
+    def _means(window: np.ndarray) -> Optional[dict]:
+        total = window["total"].astype(np.float64)
+        valid = total > 0
+        if not valid.any():
+            return None
+        total = total[valid]
+        agree = window["agree"][valid] / total * 100
+        disagree = window["disagree"][valid] / total * 100
+        neutral = window["neutral"][valid] / total * 100
+        return {
+            "samples": int(valid.sum()),
+            "agree_pct": round(float(agree.mean()), 1),
+            "disagree_pct": round(float(disagree.mean()), 1),
+            "neutral_pct": round(float(neutral.mean()), 1),
+            "net_score": round(float((agree - disagree).mean()), 1),
+            "confidence": round(float(window["confidence"][valid].mean()), 1)
+        }
+
+    def aggregates(self, topic: str, windows: List[str], now: Optional[float] = None) -> dict:
+        """Mean sentiment over each trailing window, with the change against the window before it"""
+        records = self._records(self._path(topic))
+        now = now if now is not None else time.time()
+        result = {}
+        for name in windows:
+            span = SENTIMENT_HISTORY_WINDOWS[name]
+            current = self._means(self._window(records, now - span, now))
+            if current is not None:
+                previous = self._means(self._window(records, now - 2 * span, now - span - 1))
+                current["delta"] = round(current["net_score"] - previous["net_score"], 1) if previous else None
+            result[name] = current
+        return result
+
+    def series(self, topic: str, span: float, bucket: float, now: Optional[float] = None) -> dict:
+        """Bucketed net-score means over the last ``span`` seconds (empty buckets omitted)"""
+        records = self._records(self._path(topic))
+        now = now if now is not None else time.time()
+        window = self._window(records, now - span, now)
+        window = window[window["total"] > 0]
+        if not len(window):
+            return {"t": [], "net_score": [], "samples": []}
+        total = window["total"].astype(np.float64)
+        net = (window["agree"].astype(np.float64) - window["disagree"]) / total * 100
+        index = ((window["ts"] - (now - span)) // bucket).astype(np.int64)
+        counts = np.bincount(index)
+        sums = np.bincount(index, weights=net)
+        filled = np.nonzero(counts)[0]
+        return {
+            "t": (now - span + filled * bucket).astype(np.int64).tolist(),
+            "net_score": np.round(sums[filled] / counts[filled], 1).tolist(),
+            "samples": counts[filled].tolist()
+        }
+
+    def stats(self) -> dict:
+        if not self.enabled or not os.path.isdir(self.directory):
+            return {"enabled": self.enabled, "topics": 0, "bytes": 0}
+        files = [os.path.join(self.directory, name) for name in os.listdir(self.directory) if name.endswith(".bin")]
+        return {"enabled": True, "topics": len(files), "bytes": sum(os.path.getsize(f) for f in files)}
+
+
+sentiment_history = SentimentHistory()
+
+
+# ======== Market Quotes ========
+# Symbols polled server-side; defaults mirror ALL_SYMBOLS in app.js
+QUOTE_SYMBOLS = [
+    symbol.strip() for symbol in os.environ.get(
+        "QUOTE_SYMBOLS",
+        "BINANCE:BTCUSDT,BINANCE:ETHUSDT,BINANCE:SOLUSDT,OANDA:XAU_USD,OANDA:EUR_USD,OANDA:USD_JPY,"
+        "NVDA,GOOGL,AMZN,AAPL,TSLA"
+    ).split(",") if symbol.strip()
+]
+QUOTE_UPSTREAM_URL = os.environ.get("QUOTE_UPSTREAM_URL", "https://finnhub.io/api/v1")
+FINNHUB_API_KEY = os.environ.get("FINNHUB_API_KEY", "")
+QUOTE_POLL_INTERVAL = float(os.environ.get("QUOTE_POLL_INTERVAL", "5"))  # 0 disables
+QUOTE_MAX_CONCURRENCY = int(os.environ.get("QUOTE_MAX_CONCURRENCY", "4"))
+QUOTE_FETCH_TIMEOUT = float(os.environ.get("QUOTE_FETCH_TIMEOUT", "10"))
+QUOTE_MAX_BACKOFF = float(os.environ.get("QUOTE_MAX_BACKOFF", "60"))
+QUOTE_FIELDS = ("c", "d", "dp", "h", "l", "o", "pc")
+
+
+class QuoteRateLimited(Exception):
+    pass
+
+
+class FinnhubQuoteSource:
+    """Reads quotes from Finnhub's ``/quote`` endpoint, or any server speaking the same shape.
+
+    Point ``QUOTE_UPSTREAM_URL`` at a local fake to run without Finnhub; a
+    source is anything with ``async fetch(symbol)`` and ``async close()``.
+    """
+
+    def __init__(self, base_url: str = QUOTE_UPSTREAM_URL, api_key: str = FINNHUB_API_KEY,
+                 timeout: float = QUOTE_FETCH_TIMEOUT):
+        self.base_url = base_url.rstrip("/")
+        self.api_key = api_key
+        self.timeout = timeout
+        self._client: Optional[httpx.AsyncClient] = None
+
+    @property
+    def configured(self) -> bool:
+        # Finnhub itself needs a key; a custom upstream may not
+        return bool(self.api_key) or "finnhub.io" not in self.base_url
+
+    async def _get(self, path: str, params: dict) -> Optional[dict]:
+        if self._client is None:
+            self._client = httpx.AsyncClient(base_url=self.base_url, timeout=self.timeout)
+        if self.api_key:
+            params["token"] = self.api_key
+        response = await self._client.get(path, params=params)
+        if response.status_code == 429:
+            raise QuoteRateLimited(params.get("symbol", path))
+        if response.status_code != 200:
+            return None
+        return response.json()
+
+    async def fetch(self, symbol: str) -> Optional[dict]:
+        data = await self._get("/quote", {"symbol": symbol})
+        return data if data and data.get("c") else None
+
+    async def fetch_candles(self, symbol: str, resolution: str, start: int, end: int) -> Optional[dict]:
+        # Finnhub keeps exchange-prefixed crypto and forex symbols on their own endpoints
+        if symbol.startswith("BINANCE:"):
+            path = "/crypto/candle"
+        elif symbol.startswith("OANDA:"):
+            path = "/forex/candle"
+        else:
+            path = "/stock/candle"
+        data = await self._get(path, {"symbol": symbol, "resolution": resolution, "from": start, "to": end})
+        return data if data and data.get("s") == "ok" else None
+
+    async def close(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+
+class QuoteAggregator:
+    """Polls every symbol once per interval and keeps the latest quote for all clients.
+
+    Upstream load is fixed by the symbol list, not by the number of open
+    browsers. Fetches run concurrently up to ``max_concurrency``; only quotes
+    whose fields changed since the last poll are pushed to subscribed sockets.
+    A 429 doubles the poll interval (up to ``QUOTE_MAX_BACKOFF``) until a
+    clean round resets it.
+    """
+
+    def __init__(self, source=None, symbols: List[str] = QUOTE_SYMBOLS,
+                 interval: float = QUOTE_POLL_INTERVAL, max_concurrency: int = QUOTE_MAX_CONCURRENCY):
+        self.source = source or FinnhubQuoteSource()
+        self.symbols = list(symbols)
+        self.interval = interval
+        self.max_concurrency = max(1, max_concurrency)
+        self.quotes: Dict[str, dict] = {}
+        self.backoff = interval
+        self.polls = 0
+        self.upstream_calls = 0
+        self.rate_limited = 0
+        self.pushed = 0
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def enabled(self) -> bool:
+        return self.interval > 0 and getattr(self.source, "configured", True)
+
+    def start(self):
+        if self.enabled and self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        await self.source.close()
+
+    async def _run(self):
+        while True:
+            started = time.monotonic()
+            try:
+                changed = await self.poll()
+                if changed:
+                    self.pushed += len(changed)
+                    await manager.publish_quotes(changed)
+                    await state_backend.publish("quotes", changed)
+            except Exception as e:
+                print(f"Quote poll error: {e}")
+            await asyncio.sleep(max(0.0, self.backoff - (time.monotonic() - started)))
+
+    async def poll(self) -> Dict[str, dict]:
+        """Fetch every symbol once; return the quotes that changed"""
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        limited = False
+
+        async def fetch(symbol: str) -> Tuple[str, Optional[dict]]:
+            nonlocal limited
+            async with semaphore:
+                if limited:
+                    return symbol, None
+                self.upstream_calls += 1
+                try:
+                    return symbol, await self.source.fetch(symbol)
+                except QuoteRateLimited:
+                    limited = True
+                except Exception as e:
+                    print(f"Quote fetch error for {symbol}: {e}")
+                return symbol, None
+
+        results = await asyncio.gather(*(fetch(symbol) for symbol in self.symbols))
+        self.polls += 1
+        if limited:
+            self.rate_limited += 1
+            self.backoff = min(self.backoff * 2, max(QUOTE_MAX_BACKOFF, self.interval))
+        else:
+            self.backoff = self.interval
+
+        changed = {}
+        for symbol, data in results:
+            if data is None:
+                continue
+            previous = self.quotes.get(symbol)
+            if previous is not None and all(previous.get(f) == data.get(f) for f in QUOTE_FIELDS):
+                continue
+            quote = {"symbol": symbol, **{f: data.get(f) for f in QUOTE_FIELDS}, "t": data.get("t")}
+            self.quotes[symbol] = quote
+            changed[symbol] = quote
+        return changed
+
+    async def apply(self, changed: Dict[str, dict]):
+        """Quotes polled by the primary worker"""
+        self.quotes.update(changed)
+        await manager.publish_quotes(changed)
+
+    def snapshot(self, symbols=None) -> List[dict]:
+        wanted = self.symbols if symbols is None else symbols
+        return [self.quotes[symbol] for symbol in wanted if symbol in self.quotes]
+
+    def stats(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "symbols": len(self.symbols),
+            "cached": len(self.quotes),
+            "interval": self.backoff,
+            "polls": self.polls,
+            "upstream_calls": self.upstream_calls,
+            "rate_limited_polls": self.rate_limited,
+            "quotes_pushed": self.pushed
+        }
+
+
+quote_aggregator = QuoteAggregator()
+state_backend.on("quotes", quote_aggregator.apply)
+
+
+# ======== Candles & Indicators ========
+CANDLE_MAX_BARS = int(os.environ.get("CANDLE_MAX_BARS", "200000"))  # per symbol/resolution
+CANDLE_MAX_SERIES = int(os.environ.get("CANDLE_MAX_SERIES", "64"))
+CANDLE_REFRESH_INTERVAL = float(os.environ.get("CANDLE_REFRESH_INTERVAL", "30"))
+CANDLE_HISTORY_SECONDS = {"1": 86400 * 7, "5": 86400 * 30, "15": 86400 * 60, "30": 86400 * 90,
+                          "60": 86400 * 180, "D": 86400 * 365 * 5, "W": 86400 * 365 * 20, "M": 86400 * 365 * 30}
+CANDLE_DEFAULT_INDICATORS = "sma:20,sma:50"
+
+
+def ema_fill(x: np.ndarray, out: np.ndarray, start: int, end: int, alpha: float, offset: int = 0):
+    """out[i] = alpha * x[i] + (1 - alpha) * out[i - 1] for start <= i < end (out[0] = x[0]).
+
+    ``x`` may be a slice holding only the new inputs, with ``x[0]`` being
+    bar ``offset``. The recursion is solved in closed form one block at a
+    time, so a long series costs a few thousand NumPy calls rather than a
+    Python step per bar. Blocks are sized so the decay powers stay well
+    inside float64 range.
+    """
+    if start >= end:
+        return
+    if start == 0:
+        out[0] = x[0]
+        start = 1
+    decay = 1.0 - alpha
+    if decay <= 0.0:
+        out[start:end] = x[start - offset:end - offset]
+        return
+    if end - start <= 16:
+        # A few new bars: plain floats beat NumPy call overhead
+        prev = float(out[start - 1])
+        for i in range(start, end):
+            prev = alpha * float(x[i - offset]) + decay * prev
+            out[i] = prev
+        return
+    block = int(max(1, min(1024, 250 / -math.log10(decay)))) if decay < 1.0 else 1024
+    powers = decay ** np.arange(1, block + 1)
+    prev = out[start - 1]
+    for lo in range(start, end, block):
+        hi = min(lo + block, end)
+        p = powers[:hi - lo]
+        # y_j = d^(j+1) * prev + alpha * sum_{i<=j} d^(j-i) * x_i
+        out[lo:hi] = p * (prev + alpha * np.cumsum(x[lo - offset:hi - offset] / p))
+        prev = out[hi - 1]
+
+
+ROLLING_CHUNK = 4096
+
+
+def rolling_mean(x: np.ndarray, start: int, end: int, period: int, with_std: bool = False):
+    """Mean (and population std) of the ``period`` values ending at each index in [start, end).
+
+    Windows are summed with cumulative sums taken one chunk at a time over
+    values shifted by the chunk's first input, so float error stays at the
+    scale of a chunk instead of growing with the whole history. Windows near
+    the start of the series cover fewer bars.
+    """
+    mean = np.empty(end - start)
+    std = np.empty(end - start) if with_std else None
+    for a in range(start, end, ROLLING_CHUNK):
+        b = min(a + ROLLING_CHUNK, end)
+        lo = max(0, a - period + 1)
+        shifted = x[lo:b] - x[lo]
+        idx = np.arange(a, b)
+        right = idx - lo + 1
+        left = np.maximum(idx - period + 1, 0) - lo
+        counts = right - left
+        csum = np.concatenate(([0.0], np.cumsum(shifted)))
+        shifted_mean = (csum[right] - csum[left]) / counts
+        mean[a - start:b - start] = shifted_mean + x[lo]
+        if with_std:
+            csq = np.concatenate(([0.0], np.cumsum(shifted * shifted)))
+            variance = (csq[right] - csq[left]) / counts - shifted_mean * shifted_mean
+            std[a - start:b - start] = np.sqrt(np.maximum(variance, 0.0))
+    return (mean, std) if with_std else mean
+
+
+class Indicator:
+    """Base class: fills its output columns for bars [start, end) given earlier values"""
+    name = ""
+    outputs: Tuple[str, ...] = ()
+    hidden: Tuple[str, ...] = ()  # running state kept alongside outputs
+
+    def __init__(self, *params: int):
+        self.params = params
+        self.key = ":".join([self.name, *map(str, params)])
+
+    @property
+    def warmup(self) -> int:
+        return self.params[0] - 1
+
+    def fill(self, bars: Dict[str, np.ndarray], out: Dict[str, np.ndarray], start: int, end: int):
+        raise NotImplementedError
+
+
+class SMAIndicator(Indicator):
+    name = "sma"
+    outputs = ("sma",)
+
+    def fill(self, bars, out, start, end):
+        out["sma"][start:end] = rolling_mean(bars["c"], start, end, self.params[0])
+
+
+class EMAIndicator(Indicator):
+    name = "ema"
+    outputs = ("ema",)
+
+    def fill(self, bars, out, start, end):
+        ema_fill(bars["c"], out["ema"], start, end, 2.0 / (self.params[0] + 1))
+
+
+class BollingerIndicator(Indicator):
+    name = "bb"
+    outputs = ("upper", "middle", "lower")
+
+    def __init__(self, period: int = 20, width: int = 2):
+        super().__init__(period, width)
+
+    def fill(self, bars, out, start, end):
+        period, width = self.params
+        mean, std = rolling_mean(bars["c"], start, end, period, with_std=True)
+        out["middle"][start:end] = mean
+        out["upper"][start:end] = mean + width * std
+        out["lower"][start:end] = mean - width * std
+
+
+class RSIIndicator(Indicator):
+    """Wilder's RSI"""
+    name = "rsi"
+    outputs = ("rsi",)
+    hidden = ("gain", "loss")
+
+    def __init__(self, period: int = 14):
+        super().__init__(period)
+
+    @property
+    def warmup(self) -> int:
+        return self.params[0]
+
+    def fill(self, bars, out, start, end):
+        close = bars["c"]
+        change = np.zeros(end - start)
+        lo = max(start, 1)
+        change[lo - start:] = close[lo:end] - close[lo - 1:end - 1]
+        alpha = 1.0 / self.params[0]
+        ema_fill(np.maximum(change, 0.0), out["gain"], start, end, alpha, offset=start)
+        ema_fill(np.maximum(-change, 0.0), out["loss"], start, end, alpha, offset=start)
+        gain, loss = out["gain"][start:end], out["loss"][start:end]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            rsi = 100.0 - 100.0 / (1.0 + gain / loss)
+        rsi[loss == 0] = 100.0
+        rsi[(loss == 0) & (gain == 0)] = 50.0
+        out["rsi"][start:end] = rsi
+
+
+class MACDIndicator(Indicator):
+    name = "macd"
+    outputs = ("macd", "signal", "hist")
+    hidden = ("fast", "slow")
+
+    def __init__(self, fast: int = 12, slow: int = 26, signal: int = 9):
+        super().__init__(fast, slow, signal)
+
+    @property
+    def warmup(self) -> int:
+        return self.params[1] + self.params[2] - 2
+
+    def fill(self, bars, out, start, end):
+        fast, slow, signal = self.params
+        ema_fill(bars["c"], out["fast"], start, end, 2.0 / (fast + 1))
+        ema_fill(bars["c"], out["slow"], start, end, 2.0 / (slow + 1))
+        out["macd"][start:end] = out["fast"][start:end] - out["slow"][start:end]
+        ema_fill(out["macd"], out["signal"], start, end, 2.0 / (signal + 1))
+        out["hist"][start:end] = out["macd"][start:end] - out["signal"][start:end]
+
+
+class ATRIndicator(Indicator):
+    """Average true range with Wilder smoothing"""
+    name = "atr"
+    outputs = ("atr",)
+    hidden = ("tr",)
+
+    def __init__(self, period: int = 14):
+        super().__init__(period)
+
+    def fill(self, bars, out, start, end):
+        high, low, close = bars["h"][start:end], bars["l"][start:end], bars["c"]
+        tr = out["tr"]
+        tr[start:end] = high - low
+        if end > 1:
+            lo = max(start, 1)
+            prev_close = close[lo - 1:end - 1]
+            offset = lo - start
+            tr[lo:end] = np.maximum.reduce([
+                high[offset:] - low[offset:],
+                np.abs(high[offset:] - prev_close),
+                np.abs(low[offset:] - prev_close)
+            ])
+        ema_fill(tr, out["atr"], start, end, 1.0 / self.params[0])
+
+
+INDICATORS = {cls.name: cls for cls in (SMAIndicator, EMAIndicator, BollingerIndicator,
+                                         RSIIndicator, MACDIndicator, ATRIndicator)}
+
+
+def parse_indicator(spec: str) -> Indicator:
+    """``"sma:20"`` -> SMAIndicator(20); missing parameters take the class defaults"""
+    name, *params = spec.strip().lower().split(":")
+    if name not in INDICATORS:
+        raise ValueError(f"Unknown indicator: {name}")
     try:
-        async with httpx.AsyncClient(timeout=120.0) as client:
-            payload = {
-                "model": model_id,
-                "prompt": prompt,
-                "system": system,
-                "stream": False
+        values = [int(p) for p in params if p]
+    except ValueError:
+        raise ValueError(f"Bad indicator parameters: {spec}")
+    if any(v < 1 or v > 1000 for v in values):
+        raise ValueError(f"Indicator parameters must be between 1 and 1000: {spec}")
+    if name in ("sma", "ema") and not values:
+        values = [20]
+    return INDICATORS[name](*values)
+
+
+class CandleSeries:
+    """Append-only OHLCV columns for one symbol/resolution, with indicators kept in step.
+
+    Columns are NumPy arrays with spare capacity, so new bars are copied into
+    place rather than rebuilding the series. A bar with the same timestamp as
+    the last one replaces it (the in-progress bar). Each indicator remembers how
+    many bars it has covered and only computes the rest. Once the series
+    overshoots ``max_bars`` by a quarter it is cut back to ``max_bars`` in one
+    move, so trimming stays amortised.
+    """
+
+    COLUMNS = ("t", "o", "h", "l", "c", "v")
+
+    def __init__(self, max_bars: int = CANDLE_MAX_BARS):
+        self.max_bars = max(1, max_bars)
+        self.length = 0
+        self.columns: Dict[str, np.ndarray] = {
+            name: np.empty(0, dtype=np.int64 if name == "t" else np.float64) for name in self.COLUMNS
+        }
+        self.indicators: Dict[str, Tuple[Indicator, Dict[str, np.ndarray]]] = {}
+        self.computed: Dict[str, int] = {}
+        self.dropped = 0
+        self.fetched_at = 0.0
+
+    @property
+    def capacity(self) -> int:
+        return len(self.columns["t"])
+
+    def bars(self) -> Dict[str, np.ndarray]:
+        return {name: column[:self.length] for name, column in self.columns.items()}
+
+    def _arrays(self):
+        yield from self.columns.values()
+        for _, out in self.indicators.values():
+            yield from out.values()
+
+    def _reserve(self, needed: int):
+        if needed <= self.capacity:
+            return
+        capacity = max(needed, min(self.capacity * 2, self.max_bars + self.max_bars // 4 + 1), 256)
+        for store in [self.columns] + [out for _, out in self.indicators.values()]:
+            for name, column in store.items():
+                grown = np.empty(capacity, dtype=column.dtype)
+                grown[:self.length] = column[:self.length]
+                store[name] = grown
+
+    def _trim(self):
+        excess = self.length - self.max_bars
+        if excess <= 0:
+            return
+        for array in self._arrays():
+            array[:self.max_bars] = array[excess:self.length]
+        self.length = self.max_bars
+        self.dropped += excess
+        # Recursive indicators carry on from their last value; windowed ones read only the tail
+        for key in self.computed:
+            self.computed[key] = max(0, self.computed[key] - excess)
+
+    def merge(self, t, o, h, l, c, v) -> int:
+        """Add bars (sorted by time); returns how many bars were added or replaced"""
+        t = np.asarray(t, dtype=np.int64)
+        if not len(t):
+            return 0
+        values = {"t": t, "o": o, "h": h, "l": l, "c": c, "v": v}
+        keep = np.ones(len(t), dtype=bool)
+        at = self.length
+        if self.length:
+            last = self.columns["t"][self.length - 1]
+            keep = t >= last
+            if keep.any() and t[keep][0] == last:
+                at = self.length - 1
+        count = int(keep.sum())
+        if not count:
+            return 0
+        self._reserve(at + count)
+        for name, column in self.columns.items():
+            column[at:at + count] = np.asarray(values[name], dtype=column.dtype)[keep]
+        self.length = at + count
+        for key in self.computed:
+            self.computed[key] = min(self.computed[key], at)
+        if self.length > self.max_bars + self.max_bars // 4:
+            self._trim()
+        return count
+
+    def indicator(self, spec: Indicator) -> Dict[str, np.ndarray]:
+        """Output columns for ``spec``, computing only bars not yet covered"""
+        if spec.key not in self.indicators:
+            out = {name: np.full(self.capacity, np.nan) for name in spec.outputs + spec.hidden}
+            self.indicators[spec.key] = (spec, out)
+            self.computed[spec.key] = 0
+        spec, out = self.indicators[spec.key]
+        start = self.computed[spec.key]
+        if start < self.length:
+            spec.fill(self.bars(), out, start, self.length)
+            self.computed[spec.key] = self.length
+        return {name: out[name][:self.length] for name in spec.outputs}
+
+
+def _json_column(values: np.ndarray, mask_before: int = 0) -> list:
+    """Plain list for JSON; NaN and warm-up values become null"""
+    column = np.round(values, 8)
+    column[:max(0, mask_before)] = np.nan
+    items = column.tolist()
+    if np.isnan(column).any():
+        items = [None if x != x else x for x in items]
+    return items
+
+
+class CandleStore:
+    """Candle series per (symbol, resolution), topped up from the quote upstream.
+
+    A series is fetched in full the first time and afterwards only from its
+    last bar onwards, at most once per ``refresh_interval``. Concurrent
+    requests for the same series share one fetch. The least recently used
+    series are dropped beyond ``max_series``.
+    """
+
+    def __init__(self, source=None, max_series: int = CANDLE_MAX_SERIES,
+                 refresh_interval: float = CANDLE_REFRESH_INTERVAL):
+        self.source = source
+        self.max_series = max_series
+        self.refresh_interval = refresh_interval
+        self.series: OrderedDict = OrderedDict()
+        self._locks: Dict[tuple, asyncio.Lock] = {}
+        self.upstream_calls = 0
+
+    async def get(self, symbol: str, resolution: str) -> CandleSeries:
+        key = (symbol, resolution)
+        series = self.series.get(key)
+        if series is None:
+            series = self.series[key] = CandleSeries()
+            while len(self.series) > self.max_series:
+                evicted, _ = self.series.popitem(last=False)
+                self._locks.pop(evicted, None)
+        self.series.move_to_end(key)
+        lock = self._locks.setdefault(key, asyncio.Lock())
+        async with lock:
+            if time.monotonic() - series.fetched_at >= self.refresh_interval:
+                await self._refresh(symbol, resolution, series)
+        return series
+
+    async def _refresh(self, symbol: str, resolution: str, series: CandleSeries):
+        source = self.source or quote_aggregator.source
+        if not getattr(source, "configured", True):
+            series.fetched_at = time.monotonic()
+            return
+        now = int(time.time())
+        if series.length:
+            since = int(series.columns["t"][series.length - 1])
+        else:
+            since = now - CANDLE_HISTORY_SECONDS.get(resolution, 86400 * 365)
+        self.upstream_calls += 1
+        try:
+            data = await source.fetch_candles(symbol, resolution, since, now)
+        except Exception as e:
+            print(f"Candle fetch error for {symbol}/{resolution}: {e}")
+            return
+        series.fetched_at = time.monotonic()
+        if data:
+            series.merge(data["t"], data["o"], data["h"], data["l"], data["c"], data.get("v", np.zeros(len(data["t"]))))
+
+    @staticmethod
+    def payload(series: CandleSeries, specs: List[Indicator], start: Optional[int] = None,
+                end: Optional[int] = None, limit: Optional[int] = None) -> dict:
+        """Columnar candles plus indicator series for bars in [start, end], newest ``limit``"""
+        times = series.columns["t"][:series.length]
+        lo = int(np.searchsorted(times, start, side="left")) if start is not None else 0
+        hi = int(np.searchsorted(times, end, side="right")) if end is not None else series.length
+        if limit:
+            lo = max(lo, hi - limit)
+        result = {"t": times[lo:hi].tolist()}
+        for name in ("o", "h", "l", "c", "v"):
+            result[name] = _json_column(series.columns[name][lo:hi])
+        indicators = {}
+        for spec in specs:
+            columns = series.indicator(spec)
+            indicators[spec.key] = {
+                name: _json_column(values[lo:hi], spec.warmup - series.dropped - lo)
+                for name, values in columns.items()
             }
-            response = await client.post(f"{OLLAMA_BASE_URL}/api/generate", json=payload)
-            if response.status_code == 200:
-                return response.json().get("response", "")
+        result["indicators"] = indicators
+        return result
+
+    def stats(self) -> dict:
+        return {
+            "series": len(self.series),
+            "bars": sum(s.length for s in self.series.values()),
+            "upstream_calls": self.upstream_calls
+        }
+
+
+candle_store = CandleStore()
+
+
+class OllamaPool:
+    """One keep-alive ``httpx.AsyncClient`` shared by every Ollama call.
+
+    The pool is opened and closed by the app lifespan. ``httpx`` only caps the
+    total number of connections, so a semaphore per host enforces the per-host
+    limit on top of it. Scripts that use the module without the app get a
+    client created lazily on first use.
+    """
+
+    def __init__(self, base_url: str = OLLAMA_BASE_URL,
+                 connect_timeout: float = OLLAMA_CONNECT_TIMEOUT,
+                 read_timeout: float = OLLAMA_READ_TIMEOUT,
+                 max_connections: int = OLLAMA_MAX_CONNECTIONS,
+                 max_connections_per_host: int = OLLAMA_MAX_CONNECTIONS_PER_HOST,
+                 max_keepalive: int = OLLAMA_MAX_KEEPALIVE,
+                 keepalive_expiry: float = OLLAMA_KEEPALIVE_EXPIRY):
+        self.base_url = base_url.rstrip("/")
+        self.timeout = httpx.Timeout(read_timeout, connect=connect_timeout)
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive,
+            keepalive_expiry=keepalive_expiry
+        )
+        self.max_connections_per_host = max(1, max_connections_per_host)
+        self._client: Optional[httpx.AsyncClient] = None
+        self._host_slots: Dict[str, asyncio.Semaphore] = {}
+
+    async def start(self):
+        if self._client is None:
+            self._client = httpx.AsyncClient(base_url=self.base_url, timeout=self.timeout, limits=self.limits)
+
+    async def close(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        if self._client is None:
+            self._client = httpx.AsyncClient(base_url=self.base_url, timeout=self.timeout, limits=self.limits)
+        return self._client
+
+    def host_slot(self, url: str = "") -> asyncio.Semaphore:
+        """Semaphore bounding concurrent requests to the host of ``url`` (default: Ollama)"""
+        host = urlsplit(url).netloc or urlsplit(self.base_url).netloc
+        if host not in self._host_slots:
+            self._host_slots[host] = asyncio.Semaphore(self.max_connections_per_host)
+        return self._host_slots[host]
+
+    async def post_json(self, path: str, payload: dict) -> httpx.Response:
+        async with self.host_slot(path):
+            return await self.client.post(path, json=payload)
+
+    async def stream_json_lines(self, path: str, payload: dict):
+        """POST ``payload`` and yield each decoded line of an NDJSON response"""
+        async with self.host_slot(path):
+            async with self.client.stream("POST", path, json=payload) as response:
+                response.raise_for_status()
+                async for line in response.aiter_lines():
+                    if line.strip():
+                        yield json.loads(line)
+
+
+ollama_pool = OllamaPool()
+
+
+class ResponseCache:
+    """LRU + TTL cache of model completions keyed by model, prompt and system prompt.
+
+    Prompts are normalized (case, punctuation, whitespace) so near-identical
+    questions share an entry, while the system prompt is hashed as-is because
+    it carries the persona. Council member answers also key on a hash of the
+    conversation history block (see ``get_council_response``), since follow-up
+    questions only make sense against the history they were asked in.
+    Memory is bounded by both entry count and total characters. With ``path``
+    set, entries are mirrored to SQLite off the event loop and survive a
+    restart.
+    """
+
+    PRUNE_EVERY = 100
+
+    def __init__(self, ttl: float = RESPONSE_CACHE_TTL, max_entries: int = RESPONSE_CACHE_MAX_ENTRIES,
+                 max_bytes: int = RESPONSE_CACHE_MAX_BYTES, path: str = RESPONSE_CACHE_PATH):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.path = path
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+        self._bytes = 0
+        self._puts = 0
+        self._db: Optional[sqlite3.Connection] = None
+        self._db_lock = threading.Lock()
+
+    @staticmethod
+    def normalize_prompt(prompt: str) -> str:
+        return " ".join(re.findall(r"\w+", prompt.lower()))
+
+    @classmethod
+    def make_key(cls, model_id: str, prompt: str, system: str = "", context: str = "") -> str:
+        system_hash = hashlib.sha256(system.encode("utf-8")).hexdigest()
+        parts = [model_id, cls.normalize_prompt(prompt), system_hash]
+        if context:
+            parts.append(hashlib.sha256(context.encode("utf-8")).hexdigest())
+        material = "\0".join(parts)
+        return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+    async def get(self, key: str) -> Optional[str]:
+        entry = self._entries.get(key)
+        if entry is not None:
+            if time.time() - entry[0] < self.ttl:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            self._evict(key)
+
+        if self.path:
+            row = await asyncio.to_thread(self._db_get, key)
+            if row is not None:
+                self._remember(key, row[0], row[1])
+                self.hits += 1
+                return row[1]
+
+        self.misses += 1
+        return None
+
+    async def put(self, key: str, value: str):
+        if not value or len(value) > self.max_bytes:
+            return
+        created = time.time()
+        self._remember(key, created, value)
+        if self.path:
+            await asyncio.to_thread(self._db_put, key, created, value)
+
+    def _remember(self, key: str, created: float, value: str):
+        if key in self._entries:
+            self._evict(key)
+        self._entries[key] = (created, value)
+        self._bytes += len(value)
+        while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+            self._evict(next(iter(self._entries)))
+
+    def _evict(self, key: str):
+        _, value = self._entries.pop(key)
+        self._bytes -= len(value)
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._db is None:
+            self._db = sqlite3.connect(self.path, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS responses (key TEXT PRIMARY KEY, created REAL, value TEXT)"
+            )
+        return self._db
+
+    def _db_get(self, key: str):
+        with self._db_lock:
+            return self._connect().execute(
+                "SELECT created, value FROM responses WHERE key = ? AND created > ?",
+                (key, time.time() - self.ttl)
+            ).fetchone()
+
+    def _db_put(self, key: str, created: float, value: str):
+        with self._db_lock:
+            db = self._connect()
+            db.execute("INSERT OR REPLACE INTO responses VALUES (?, ?, ?)", (key, created, value))
+            self._puts += 1
+            if self._puts % self.PRUNE_EVERY == 0:
+                db.execute("DELETE FROM responses WHERE created <= ?", (time.time() - self.ttl,))
+            db.commit()
+
+    def close(self):
+        with self._db_lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+    def clear(self):
+        self._entries.clear()
+        self._bytes = 0
+        if self.path:
+            with self._db_lock:
+                self._connect().execute("DELETE FROM responses")
+                self._db.commit()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "max_entries": self.max_entries,
+            "max_bytes": self.max_bytes,
+            "ttl": self.ttl,
+            "persistent": bool(self.path)
+        }
+
+
+response_cache = ResponseCache()
+
+
+class CancellationMetrics:
+    """Accounts for model work abandoned when a session is cancelled or times out.
+
+    Calls cut off mid-generation add their elapsed time to ``seconds_discarded``
+    and the rest of an average call to ``seconds_saved``; calls that never
+    started save a whole average call. The average is an EWMA over completed
+    Ollama calls.
+    """
+
+    def __init__(self, alpha: float = 0.2):
+        self.alpha = alpha
+        self.sessions_cancelled = 0
+        self.calls_cancelled = 0
+        self.calls_skipped = 0
+        self.seconds_discarded = 0.0
+        self.seconds_saved = 0.0
+        self.avg_call_seconds: Optional[float] = None
+
+    @contextmanager
+    def model_call(self):
+        started = time.monotonic()
+        try:
+            yield
+        except asyncio.CancelledError:
+            elapsed = time.monotonic() - started
+            self.calls_cancelled += 1
+            self.seconds_discarded += elapsed
+            if self.avg_call_seconds is not None:
+                self.seconds_saved += max(0.0, self.avg_call_seconds - elapsed)
+            raise
+        else:
+            elapsed = time.monotonic() - started
+            if self.avg_call_seconds is None:
+                self.avg_call_seconds = elapsed
+            else:
+                self.avg_call_seconds += self.alpha * (elapsed - self.avg_call_seconds)
+
+    def record_skipped(self, count: int = 1):
+        self.calls_skipped += count
+        if self.avg_call_seconds is not None:
+            self.seconds_saved += count * self.avg_call_seconds
+
+    def stats(self) -> dict:
+        return {
+            "sessions_cancelled": self.sessions_cancelled,
+            "calls_cancelled": self.calls_cancelled,
+            "calls_skipped": self.calls_skipped,
+            "model_seconds_discarded": round(self.seconds_discarded, 2),
+            "model_seconds_saved": round(self.seconds_saved, 2),
+            "avg_call_seconds": round(self.avg_call_seconds, 2) if self.avg_call_seconds is not None else None
+        }
+
+
+cancellation_metrics = CancellationMetrics()
+
+
+# ======== Admission Control ========
+# Identifies whose work a model call belongs to; set per council session
+current_client_id: contextvars.ContextVar = contextvars.ContextVar("current_client_id", default="server")
+
+
+class OverloadedError(Exception):
+    def __init__(self, message: str, retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class FairScheduler:
+    """A counting semaphore that hands out slots round-robin across clients.
+
+    Each client has its own FIFO of waiters and may hold at most
+    ``per_client_limit`` slots. Freed slots go to the next client in rotation
+    that is under its quota, so one busy client cannot starve the others. When
+    ``max_waiting`` requests are already queued, or with ``limit_client_queue``
+    a client already has ``per_client_limit`` waiting, new ones fail
+    immediately with ``OverloadedError``. Model calls inside an admitted
+    session must not fail that way, so their budget queues without a limit;
+    the session admission above it already bounds how many can wait.
+    """
+
+    POSITION_UPDATE_INTERVAL = 2.0
+
+    def __init__(self, capacity: int, per_client_limit: int, max_waiting: Optional[int] = None,
+                 limit_client_queue: bool = True, alpha: float = 0.2):
+        self.capacity = max(1, capacity)
+        self.per_client_limit = max(1, per_client_limit)
+        self.max_waiting = max_waiting
+        self.limit_client_queue = limit_client_queue
+        self.alpha = alpha
+        self.in_use = 0
+        self.active: Dict[str, int] = {}
+        self.queues: "OrderedDict[str, deque]" = OrderedDict()
+        self.avg_hold_seconds: Optional[float] = None
+        self.granted = 0
+        self.rejected = 0
+
+    @property
+    def waiting(self) -> int:
+        return sum(len(queue) for queue in self.queues.values())
+
+    def estimated_wait(self, position: int) -> Optional[float]:
+        if self.avg_hold_seconds is None:
+            return None
+        return round(self.avg_hold_seconds * math.ceil(position / self.capacity), 1)
+
+    def position(self, waiter: asyncio.Future) -> int:
+        """1-based place of ``waiter`` in round-robin service order"""
+        queues = [list(queue) for queue in self.queues.values()]
+        position = 0
+        for depth in range(max((len(q) for q in queues), default=0)):
+            for queue in queues:
+                if depth < len(queue):
+                    position += 1
+                    if queue[depth] is waiter:
+                        return position
+        return position
+
+    def _dispatch(self):
+        while self.in_use < self.capacity:
+            client_id = next(
+                (c for c in self.queues if self.active.get(c, 0) < self.per_client_limit), None
+            )
+            if client_id is None:
+                return
+            queue = self.queues.pop(client_id)
+            waiter = queue.popleft()
+            if queue:
+                self.queues[client_id] = queue  # back of the rotation
+            if waiter.done():
+                continue
+            waiter.set_result(True)
+            self.in_use += 1
+            self.active[client_id] = self.active.get(client_id, 0) + 1
+            self.granted += 1
+
+    def _forget(self, client_id: str, waiter: asyncio.Future):
+        queue = self.queues.get(client_id)
+        if queue is not None and waiter in queue:
+            queue.remove(waiter)
+            if not queue:
+                del self.queues[client_id]
+
+    async def acquire(self, client_id: str, on_wait=None):
+        """Wait for a slot; ``on_wait(position, estimated_wait)`` is awaited while queued"""
+        queue = self.queues.get(client_id)
+        queued = len(queue) if queue else 0
+        if ((self.max_waiting is not None and self.waiting >= self.max_waiting)
+                or (self.limit_client_queue and queued >= self.per_client_limit)):
+            self.rejected += 1
+            raise OverloadedError("The council is at capacity, please try again shortly.",
+                                  self.estimated_wait(self.waiting + 1))
+
+        waiter = asyncio.get_running_loop().create_future()
+        self.queues.setdefault(client_id, deque()).append(waiter)
+        self._dispatch()
+        last_position = None
+        try:
+            while not waiter.done():
+                if on_wait is None:
+                    await waiter
+                    break
+                position = self.position(waiter)
+                if position != last_position:
+                    last_position = position
+                    await on_wait(position, self.estimated_wait(position))
+                try:
+                    await asyncio.wait_for(asyncio.shield(waiter), self.POSITION_UPDATE_INTERVAL)
+                except asyncio.TimeoutError:
+                    pass
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                self.release(client_id)  # granted just as we gave up
+            else:
+                waiter.cancel()
+                self._forget(client_id, waiter)
+            raise
+
+    def release(self, client_id: str, held_seconds: Optional[float] = None):
+        self.in_use -= 1
+        self.active[client_id] -= 1
+        if not self.active[client_id]:
+            del self.active[client_id]
+        if held_seconds is not None:
+            if self.avg_hold_seconds is None:
+                self.avg_hold_seconds = held_seconds
+            else:
+                self.avg_hold_seconds += self.alpha * (held_seconds - self.avg_hold_seconds)
+        self._dispatch()
+
+    @asynccontextmanager
+    async def slot(self, client_id: str, on_wait=None):
+        await self.acquire(client_id, on_wait)
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            self.release(client_id, time.monotonic() - started)
+
+    def stats(self) -> dict:
+        return {
+            "capacity": self.capacity,
+            "in_use": self.in_use,
+            "waiting": self.waiting,
+            "clients": len(set(self.active) | set(self.queues)),
+            "granted": self.granted,
+            "rejected": self.rejected,
+            "avg_hold_seconds": round(self.avg_hold_seconds, 2) if self.avg_hold_seconds is not None else None
+        }
+
+
+session_admission = FairScheduler(COUNCIL_MAX_SESSIONS, COUNCIL_SESSIONS_PER_CLIENT, COUNCIL_MAX_QUEUE)
+model_call_budget = FairScheduler(MODEL_CALL_BUDGET, MODEL_CALLS_PER_CLIENT, limit_client_queue=False)
+
+
+# ======== Model Health ========
+# Models whose generate request actually went out (past the call budget); set per council fan-out
+generating_models: contextvars.ContextVar = contextvars.ContextVar("generating_models", default=None)
+
+
+class ModelHealth:
+    """Latency / error EWMAs and circuit-breaker state for one model"""
+
+    def __init__(self):
+        self.latency: Optional[float] = None
+        self.error_rate = 0.0
+        self.failures = 0
+        self.state = "closed"  # closed -> open -> half_open -> closed
+        self.opened_at = 0.0
+        self.trial_at = 0.0
+        self.calls = 0
+
+
+class ModelHealthMonitor:
+    """Tracks how each council model is doing and keeps failing ones out of sessions.
+
+    Real traffic and background probes both feed ``record``. After
+    ``failure_threshold`` consecutive failures a model's circuit opens and
+    sessions skip it; once ``cooldown`` has passed a single trial request
+    (a probe or a real call) is let through to decide whether it closes again.
+    A trial that is cancelled sends the circuit back to open, and one that never
+    reports back is superseded by a fresh trial after another ``cooldown``.
+    The backend itself is probed via ``/api/tags`` and live status is broadcast
+    to every client after each probe round.
+    """
+
+    def __init__(self, interval: float = HEALTH_PROBE_INTERVAL, probe_timeout: float = HEALTH_PROBE_TIMEOUT,
+                 failure_threshold: int = BREAKER_FAILURE_THRESHOLD, cooldown: float = BREAKER_COOLDOWN,
+                 alpha: float = 0.3):
+        self.interval = interval
+        self.probe_timeout = probe_timeout
+        self.failure_threshold = max(1, failure_threshold)
+        self.cooldown = cooldown
+        self.alpha = alpha
+        self.backend_online = True
+        self.models: Dict[str, ModelHealth] = {}
+        self._task: Optional[asyncio.Task] = None
+
+    def _get(self, model_id: str) -> ModelHealth:
+        if model_id not in self.models:
+            self.models[model_id] = ModelHealth()
+        return self.models[model_id]
+
+    def record(self, model_id: str, ok: bool, latency: float):
+        health = self._get(model_id)
+        health.calls += 1
+        health.error_rate += self.alpha * ((0.0 if ok else 1.0) - health.error_rate)
+        if ok:
+            health.latency = latency if health.latency is None else health.latency + self.alpha * (latency - health.latency)
+            health.failures = 0
+            health.state = "closed"
+        else:
+            health.failures += 1
+            if health.state == "half_open" or health.failures >= self.failure_threshold:
+                health.state = "open"
+                health.opened_at = time.monotonic()
+
+    def abandon(self, model_id: str):
+        """A call to ``model_id`` was cancelled before it finished; a half-open trial reopens"""
+        health = self._get(model_id)
+        if health.state == "half_open":
+            health.state = "open"
+            health.opened_at = time.monotonic()
+
+    def allow(self, model_id: str) -> bool:
+        """Whether a request to ``model_id`` should be sent now (claims the half-open trial)"""
+        health = self._get(model_id)
+        if health.state == "closed":
+            return True
+        now = time.monotonic()
+        if (health.state == "open" and now - health.opened_at >= self.cooldown) or \
+                (health.state == "half_open" and now - health.trial_at >= self.cooldown):
+            health.state = "half_open"
+            health.trial_at = now
+            return True
+        return False
+
+    def is_healthy(self, model_id: str) -> bool:
+        return self.backend_online and self._get(model_id).state == "closed"
+
+    def rank_moderators(self, preferred: dict) -> List[dict]:
+        """Healthy models to try as moderator: ``preferred`` first, then fastest first"""
+        healthy = [m for m in AI_COUNCIL if self.is_healthy(m["id"])]
+        if not healthy:
+            return [preferred]
+        others = sorted(
+            (m for m in healthy if m["id"] != preferred["id"]),
+            key=lambda m: self._get(m["id"]).latency if self._get(m["id"]).latency is not None else float("inf")
+        )
+        return ([preferred] if self.is_healthy(preferred["id"]) else []) + others
+
+    def status(self) -> List[dict]:
+        result = []
+        for model in AI_COUNCIL:
+            health = self._get(model["id"])
+            result.append({
+                "name": model["name"],
+                "specialty": model["specialty"],
+                "online": self.backend_online and health.state != "open",
+                "state": health.state,
+                "latency_ms": round(health.latency * 1000) if health.latency is not None else None,
+                "error_rate": round(health.error_rate, 3)
+            })
+        return result
+
+    def start(self):
+        if self.interval > 0 and self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _run(self):
+        while True:
+            try:
+                await self.probe()
+                await manager.broadcast({"type": "model_status", "data": self.status()})
+            except Exception as e:
+                print(f"Model health probe error: {e}")
+            await asyncio.sleep(self.interval)
+
+    async def probe(self):
+        try:
+            response = await asyncio.wait_for(ollama_pool.client.get("/api/tags"), self.probe_timeout)
+            self.backend_online = response.status_code == 200
+        except Exception:
+            self.backend_online = False
+        if self.backend_online:
+            await asyncio.gather(*(self._probe_model(model["id"]) for model in AI_COUNCIL))
+
+    async def _probe_model(self, model_id: str):
+        # Only models with an open circuit are probed; healthy ones are measured by real traffic
+        if self._get(model_id).state == "closed" or not self.allow(model_id):
+            return
+        payload = {"model": model_id, "prompt": "ping", "stream": False, "options": {"num_predict": 1}}
+        started = time.monotonic()
+        try:
+            response = await asyncio.wait_for(ollama_pool.post_json("/api/generate", payload), self.probe_timeout)
+            ok = response.status_code == 200
+        except Exception:
+            ok = False
+        self.record(model_id, ok, time.monotonic() - started)
+
+
+model_health = ModelHealthMonitor()
+
+
+class TokenCoalescer:
+    """Buffers streamed text and hands it to ``emit`` in small batches.
+
+    A batch is flushed once it reaches ``max_chars`` or ``interval`` seconds
+    have passed since the previous flush, so clients get a steady trickle of
+    frames instead of one per token.
+    """
+
+    def __init__(self, emit, interval: float = TOKEN_FLUSH_INTERVAL, max_chars: int = TOKEN_FLUSH_CHARS):
+        self.emit = emit
+        self.interval = interval
+        self.max_chars = max_chars
+        self._buffer: List[str] = []
+        self._size = 0
+        self._last_flush = time.monotonic()
+
+    async def add(self, text: str):
+        if not text:
+            return
+        self._buffer.append(text)
+        self._size += len(text)
+        if self._size >= self.max_chars or time.monotonic() - self._last_flush >= self.interval:
+            await self.flush()
+
+    async def flush(self):
+        self._last_flush = time.monotonic()
+        if not self._buffer:
+            return
+        chunk = "".join(self._buffer)
+        self._buffer = []
+        self._size = 0
+        await self.emit(chunk)
+
+
+async def stream_ollama(model_id: str, prompt: str, system: str, on_token) -> Optional[str]:
+    """Stream a completion, passing coalesced chunks to ``on_token``; returns the full text"""
+    payload = {
+        "model": model_id,
+        "prompt": prompt,
+        "system": system,
+        "stream": True
+    }
+    coalescer = TokenCoalescer(on_token)
+    parts: List[str] = []
+    try:
+        async for chunk in ollama_pool.stream_json_lines("/api/generate", payload):
+            if chunk.get("error"):
+                raise RuntimeError(chunk["error"])
+            piece = chunk.get("response", "")
+            if piece:
+                parts.append(piece)
+                await coalescer.add(piece)
+            if chunk.get("done"):
+                annotate(tokens=chunk.get("eval_count") or len(parts))
+                break
+        await coalescer.flush()
+        return "".join(parts)
+    except Exception as e:
+        print(f"Error streaming {model_id}: {e}")
+    return None
+
+
+async def query_ollama(model_id: str, prompt: str, system: str = "", on_token=None) -> Optional[str]:
+    """Query a specific Ollama model
+
+    When ``on_token`` is given (and streaming is enabled) the completion is
+    streamed and partial output is awaited through it as it arrives.
+    """
+    async with model_call_budget.slot(current_client_id.get()):
+        with cancellation_metrics.model_call(), span("generate", model=model_id) as attrs:
+            generating = generating_models.get()
+            if generating is not None:
+                generating.add(model_id)
+            started = time.monotonic()
+            try:
+                result = await _generate(model_id, prompt, system, on_token)
+            except asyncio.CancelledError:
+                # Deadline misses are counted as failures by whoever set the deadline
+                model_health.abandon(model_id)
+                raise
+            elapsed = time.monotonic() - started
+            model_health.record(model_id, result is not None, elapsed)
+            outcome = "ok" if result is not None else "error"
+            model_generate_seconds.observe(elapsed, model_id, outcome)
+            attrs["outcome"] = outcome
+            tokens = attrs.get("tokens")
+            if tokens and result is not None:
+                model_tokens_total.inc(model_id, amount=tokens)
+                model_tokens_per_second.observe(tokens / max(elapsed, 1e-6), model_id)
+            return result
+
+
+async def _generate(model_id: str, prompt: str, system: str, on_token) -> Optional[str]:
+    if on_token is not None and OLLAMA_STREAMING:
+        return await stream_ollama(model_id, prompt, system, on_token)
+    try:
+        payload = {
+            "model": model_id,
+            "prompt": prompt,
+            "system": system,
+            "stream": False
+        }
+        response = await ollama_pool.post_json("/api/generate", payload)
+        if response.status_code == 200:
+            data = response.json()
+            if data.get("eval_count"):
+                annotate(tokens=data["eval_count"])
+            return data.get("response", "")
     except Exception as e:
         print(f"Error querying {model_id}: {e}")
     return None
 
 
-async def get_council_response(model: dict, question: str) -> dict:
+async def query_ollama_cached(model_id: str, prompt: str, system: str = "", on_token=None,
+                              cacheable=None, cache_key: Optional[str] = None) -> Tuple[Optional[str], bool]:
+    """``query_ollama`` behind the response cache; returns ``(response, cache_hit)``
+
+    ``cacheable`` optionally vets a fresh response before it is stored;
+    ``cache_key`` replaces the default model/prompt/system key.
+    """
+    key = cache_key or response_cache.make_key(model_id, prompt, system)
+    cached = await response_cache.get(key)
+    if cached is not None:
+        return cached, True
+    response = await query_ollama(model_id, prompt, system, on_token=on_token)
+    if response and (cacheable is None or cacheable(response)):
+        await response_cache.put(key, response)
+    return response, False
+
+
+async def get_council_response(model: dict, question: str, on_token=None) -> dict:
     """Get response from a single council member"""
     context = conversation_db.get_context_summary()
     context_text = context if context else "This is the first question in this session."
@@ -393,47 +3407,540 @@ async def get_council_response(model: dict, question: str) -> dict:
         specialty=model["specialty"],
         conversation_context=context_text
     )
-    response = await query_ollama(model["id"], question, system_prompt)
-    
-    return {
+    # Keyed on persona, question and the compacted history block the answer was given against
+    persona = SENIOR_EXPERT_PROMPT.format(specialty=model["specialty"], conversation_context="")
+    key = response_cache.make_key(model["id"], question, persona, context_text)
+    response, cached = await query_ollama_cached(model["id"], question, system_prompt, on_token=on_token, cache_key=key)
+    return build_member_response(model, response, cached=cached)
+
+
+def build_member_response(model: dict, response: Optional[str], error: str = "", cached: bool = False) -> dict:
+    """Shape a council member's answer (or failure) for the client and the database"""
+    result = {
         "model_id": model["id"],
         "model_name": model["name"],
         "color": model["color"],
         "specialty": model["specialty"],
         "response": response if response else "Unable to generate response at this time.",
-        "success": response is not None
+        "success": response is not None,
+        "cached": cached
     }
+    if error:
+        result["error"] = error
+    return result
 
 
-async def synthesize_responses(question: str, responses: list[dict], rankings_text: str = "") -> str:
-    """Create a synthesis of all council responses using COLLABORATION_PROMPT"""
-    responses_text = "\n\n".join([
-        f"**{r['model_name']}** ({r['specialty']}): {r['response']}"
-        for r in responses
-    ])
+class CouncilExecutor:
+    """Queries council members concurrently and reports each answer as soon as it arrives.
+
+    A semaphore caps how many models are generating at once, every member gets
+    its own deadline, and the whole fan-out is bounded by a session deadline so
+    a single slow model cannot hold back synthesis.
+    """
+
+    def __init__(self, max_concurrency: int = COUNCIL_MAX_CONCURRENCY,
+                 model_timeout: float = COUNCIL_MODEL_TIMEOUT,
+                 session_timeout: float = COUNCIL_SESSION_TIMEOUT):
+        self.max_concurrency = max(1, max_concurrency)
+        self.model_timeout = model_timeout
+        self.session_timeout = session_timeout
+
+    async def run(self, question: str, members: List[dict], send) -> List[dict]:
+        """Fan the question out to ``members``; ``send`` is awaited with each client message.
+
+        Returns the responses in council order. Members that miss a deadline are
+        reported as failed responses rather than dropped.
+        """
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        results: Dict[str, dict] = {}
+        generating: set = set()  # members whose call got past the call budget
+
+        # Members behind an open circuit breaker are reported straight away
+        available = []
+        for model in members:
+            if model_health.allow(model["id"]):
+                available.append(model)
+            else:
+                results[model["id"]] = build_member_response(model, None, error="unavailable")
+                await send({"type": "model_response", "data": results[model["id"]]})
+
+        async def ask(model: dict) -> dict:
+            async def on_token(chunk: str):
+                await send({
+                    "type": "model_token",
+                    "model_id": model["id"],
+                    "model_name": model["name"],
+                    "data": chunk
+                })
+
+            generating_models.set(generating)
+            started = False
+            try:
+                async with semaphore:
+                    started = True
+                    await send({
+                        "type": "model_thinking",
+                        "model_id": model["id"],
+                        "model_name": model["name"]
+                    })
+                    try:
+                        return await asyncio.wait_for(
+                            get_council_response(model, question, on_token=on_token), self.model_timeout
+                        )
+                    except asyncio.TimeoutError:
+                        # A hung model never returns on its own, so the miss counts against its breaker;
+                        # time spent queued for the call budget is not the model's fault
+                        if model["id"] in generating:
+                            model_health.record(model["id"], False, self.model_timeout)
+                        return build_member_response(model, None, error="timeout")
+            except asyncio.CancelledError:
+                if not started:
+                    cancellation_metrics.record_skipped()
+                raise
+
+        tasks = {asyncio.create_task(ask(model)): model for model in available}
+        try:
+            for next_done in asyncio.as_completed(tasks, timeout=self.session_timeout):
+                try:
+                    response = await next_done
+                except asyncio.TimeoutError:
+                    break
+                results[response["model_id"]] = response
+                await send({"type": "model_response", "data": response})
+        finally:
+            pending = [task for task in tasks if not task.done()]
+            for task in pending:
+                task.cancel()
+            # Wait for cancelled members so their HTTP requests are torn down before we move on
+            await asyncio.gather(*pending, return_exceptions=True)
+
+        # Anything still outstanding missed the session deadline
+        for model in members:
+            if model["id"] not in results:
+                if model["id"] in generating:
+                    model_health.record(model["id"], False, self.session_timeout)
+                response = build_member_response(model, None, error="session_timeout")
+                results[model["id"]] = response
+                await send({"type": "model_response", "data": response})
+
+        return [results[model["id"]] for model in members]
+
+
+council_executor = CouncilExecutor()
+
+
+# ======== Peer Ranking ========
+def _json_candidates(text: str):
+    """Yield every top-level {...} / [...] span in ``text``; an unterminated span is closed off"""
+    stack: List[str] = []
+    start = None
+    in_string = escaped = False
+    for index, char in enumerate(text):
+        if in_string:
+            if escaped:
+                escaped = False
+            elif char == "\\":
+                escaped = True
+            elif char == '"':
+                in_string = False
+            continue
+        if char == '"' and stack:
+            in_string = True
+        elif char in "{[":
+            if not stack:
+                start = index
+            stack.append("}" if char == "{" else "]")
+        elif char in "}]" and stack:
+            if char != stack[-1]:
+                stack.clear()
+                continue
+            stack.pop()
+            if not stack:
+                yield text[start:index + 1]
+    if stack and start is not None:
+        yield text[start:] + ('"' if in_string else "") + "".join(reversed(stack))
+
+
+def _repair_json(candidate: str) -> str:
+    candidate = candidate.replace("\u201c", '"').replace("\u201d", '"').replace("\u2019", "'")
+    candidate = re.sub(r",\s*([}\]])", r"\1", candidate)
+    return re.sub(r'(?<=[{,])\s*([A-Za-z_]\w*)\s*:', r'"\1":', candidate)
+
+
+def extract_ranking_json(text: Optional[str]) -> Optional[dict]:
+    """Pull a ``{"rankings": [...]}`` object out of free-form model output.
+
+    Tolerates code fences, surrounding prose, trailing commas, unquoted keys,
+    smart quotes and truncated output; falls back to scraping name/score pairs.
+    """
+    if not text:
+        return None
+    text = re.sub(r"```(?:json)?", "", text)
+    for candidate in _json_candidates(text):
+        for attempt in (candidate, _repair_json(candidate)):
+            try:
+                data = json.loads(attempt)
+            except ValueError:
+                continue
+            if isinstance(data, dict) and isinstance(data.get("rankings"), list):
+                return data
+            if isinstance(data, list) and data and all(isinstance(item, dict) for item in data):
+                return {"rankings": data}
+
+    pairs = re.findall(
+        r'"?model_name"?\s*[:=]\s*"([^"]+)"[^{}]*?"?score"?\s*[:=]\s*"?(\d+(?:\.\d+)?)', text
+    )
+    if pairs:
+        return {"rankings": [{"model_name": name, "score": score} for name, score in pairs]}
+    return None
+
+
+def _match_member(name, members: List[dict]) -> Optional[dict]:
+    if not isinstance(name, str) or not name.strip():
+        return None
+    wanted = name.strip().lower()
+    for member in members:
+        if member["model_name"].lower() == wanted:
+            return member
+    # Partial names only count when they point at a single member ("DeepSeek" could be either)
+    partial = [m for m in members if m["model_name"].lower() in wanted or wanted in m["model_name"].lower()]
+    return partial[0] if len(partial) == 1 else None
+
+
+def _parse_score(value) -> Optional[float]:
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        score = float(value)
+    else:
+        found = re.search(r"\d+(?:\.\d+)?", str(value))
+        if not found:
+            return None
+        score = float(found.group())
+    return min(10.0, max(1.0, score))
+
+
+class PeerRankingStage:
+    """Council members score each other's answers in parallel.
+
+    Each ranker sees every other successful response, trimmed so the whole
+    prompt stays within ``prompt_budget`` characters. At most ``max_rankers``
+    are asked, and the stage returns as soon as ``quorum`` usable rankings are
+    in or ``timeout`` passes, so its latency doesn't grow with council size.
+    """
+
+    def __init__(self, quorum: int = RANKING_QUORUM, max_rankers: int = RANKING_MAX_RANKERS,
+                 timeout: float = RANKING_TIMEOUT, max_response_chars: int = RANKING_MAX_RESPONSE_CHARS,
+                 prompt_budget: int = RANKING_PROMPT_BUDGET):
+        self.quorum = max(1, quorum)
+        self.max_rankers = max(1, max_rankers)
+        self.timeout = timeout
+        self.max_response_chars = max_response_chars
+        self.prompt_budget = prompt_budget
+
+    def build_prompt(self, question: str, ranker: dict, candidates: List[dict]) -> str:
+        others = [r for r in candidates if r["model_id"] != ranker["model_id"]]
+        per_response = min(self.max_response_chars, self.prompt_budget // max(1, len(others)))
+        responses_text = "\n\n".join(
+            f"**{r['model_name']}** ({r['specialty']}): {r['response'][:per_response]}"
+            for r in others
+        )
+        return RANKING_PROMPT.format(question=question, responses=responses_text)
+
+    async def rank(self, question: str, ranker: dict, candidates: List[dict]) -> Optional[dict]:
+        prompt = self.build_prompt(question, ranker, candidates)
+        system = "You are a strict evaluator. Respond with JSON only."
+        text, _ = await query_ollama_cached(
+            ranker["model_id"], prompt, system, cacheable=lambda reply: extract_ranking_json(reply) is not None
+        )
+        data = extract_ranking_json(text)
+        if data is None:
+            return None
+
+        scores = {}
+        for item in data["rankings"]:
+            if not isinstance(item, dict):
+                continue
+            member = _match_member(item.get("model_name"), candidates)
+            score = _parse_score(item.get("score"))
+            # Ignore self-votes and anything we can't attribute
+            if member is None or score is None or member["model_id"] == ranker["model_id"]:
+                continue
+            scores[member["model_name"]] = score
+        if not scores:
+            return None
+        best_insight = data.get("best_insight") if isinstance(data.get("best_insight"), str) else ""
+        return {"ranker": ranker["model_name"], "scores": scores, "best_insight": best_insight}
+
+    async def run(self, question: str, responses: List[dict]) -> dict:
+        candidates = [r for r in responses if r.get("success")]
+        result = {"rankings": [], "best_insights": [], "rankers": [], "quorum_met": False}
+        if len(candidates) < 2:
+            return result
+
+        rankers = candidates[:self.max_rankers]
+        quorum = min(self.quorum, len(rankers))
+        tasks = [asyncio.create_task(self.rank(question, ranker, candidates)) for ranker in rankers]
+        ballots = []
+        try:
+            for next_done in asyncio.as_completed(tasks, timeout=self.timeout):
+                try:
+                    ballot = await next_done
+                except asyncio.TimeoutError:
+                    break
+                if ballot:
+                    ballots.append(ballot)
+                    if len(ballots) >= quorum:
+                        break
+        finally:
+            pending = [task for task in tasks if not task.done()]
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+
+        totals: Dict[str, List[float]] = {}
+        for ballot in ballots:
+            for name, score in ballot["scores"].items():
+                totals.setdefault(name, []).append(score)
+        result["rankings"] = sorted(
+            (
+                {"model_name": name, "score": round(sum(scores) / len(scores), 2), "votes": len(scores)}
+                for name, scores in totals.items()
+            ),
+            key=lambda r: r["score"],
+            reverse=True
+        )
+        result["best_insights"] = [b["best_insight"] for b in ballots if b["best_insight"]]
+        result["rankers"] = [b["ranker"] for b in ballots]
+        result["quorum_met"] = len(ballots) >= quorum
+        return result
+
+
+def format_rankings(ranking: dict) -> str:
+    """Render aggregated peer scores for COLLABORATION_PROMPT"""
+    if not ranking["rankings"]:
+        return ""
+    lines = [
+        f"{position}. {r['model_name']}: {r['score']}/10 ({r['votes']} votes)"
+        for position, r in enumerate(ranking["rankings"], start=1)
+    ]
+    if ranking["best_insights"]:
+        lines.append("\nBest insights named by the rankers:")
+        lines.extend(f"- {insight}" for insight in ranking["best_insights"])
+    return "\n".join(lines)
+
+
+ranking_stage = PeerRankingStage()
+
+
+async def synthesize_responses(question: str, responses: list[dict], rankings_text: str = "", on_token=None) -> str:
+    """Create a synthesis of all council responses using COLLABORATION_PROMPT.
+
+    The responses are compacted first: points several members made are kept
+    once and tagged ``[+N]``, and the prompt is fitted to ``SYNTHESIS_PROMPT_TOKENS``.
+    """
+    rankings = rankings_text if rankings_text else "No rankings available."
+    blocks = [(f"**{r['model_name']}** ({r['specialty']}): ", r['response']) for r in responses]
+    fixed = estimate_tokens(COLLABORATION_PROMPT.format(question=question, responses="", rankings=rankings))
+    bodies, report = synthesis_compactor.compact(blocks, fixed_tokens=fixed)
+    annotate(**{f"prompt_{key}": value for key, value in report.items()})
+    responses_text = "\n\n".join(header + body for (header, _), body in zip(blocks, bodies))
+    if report["near_duplicates"]:
+        responses_text = ("(Points made by several members appear once; [+N] marks how many others also made it.)\n\n"
+                          + responses_text)
     
     synthesis_prompt = COLLABORATION_PROMPT.format(
         question=question,
         responses=responses_text,
-        rankings=rankings_text if rankings_text else "No rankings available."
+        rankings=rankings
     )
     
-    # Use the last model (Qwen3 Coder) as moderator
-    moderator = AI_COUNCIL[-1]
+    # The last model (Qwen3 Coder) moderates unless it is unhealthy; then the fastest healthy model does
+    moderators = model_health.rank_moderators(AI_COUNCIL[-1])
     system = "You are the senior moderator synthesizing insights from the AI Trading Council. Be authoritative and professional."
-    result = await query_ollama(moderator["id"], synthesis_prompt, system)
+    if SYNTHESIS_HEDGE_AFTER > 0 and len(moderators) > 1:
+        result = await hedged_query(moderators[0], moderators[1], synthesis_prompt, system, on_token, SYNTHESIS_HEDGE_AFTER)
+    else:
+        result, _ = await query_ollama_cached(moderators[0]["id"], synthesis_prompt, system, on_token=on_token)
     
     return result if result else "Unable to synthesize responses at this time."
 
 
+async def hedged_query(primary: dict, backup: dict, prompt: str, system: str, on_token, hedge_after: float) -> Optional[str]:
+    """Ask ``primary``; if it hasn't answered within ``hedge_after`` seconds (or failed), race ``backup`` too.
+
+    Only the primary streams tokens. The first non-empty answer wins and the
+    other request is cancelled.
+    """
+    first = asyncio.create_task(query_ollama_cached(primary["id"], prompt, system, on_token=on_token))
+    pending = {first}
+    try:
+        done, pending = await asyncio.wait(pending, timeout=hedge_after)
+        if done and first.result()[0]:
+            return first.result()[0]
+        pending.add(asyncio.create_task(query_ollama_cached(backup["id"], prompt, system)))
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.result()[0]:
+                    return task.result()[0]
+        return None
+    finally:
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
+
+
+async def run_council_session(question: str, send, client_id: str = "server"):
+    """Admit, then run one full council session. Cancellable at any await, including while queued."""
+    current_client_id.set(client_id)
+
+    async def on_wait(position: int, estimated_wait: Optional[float]):
+        await send({
+            "type": "queue_position",
+            "position": position,
+            "estimated_wait": estimated_wait,
+            "message": f"Council is busy - you are #{position} in the queue."
+        })
+
+    trace = tracer.start(question[:100])
+    outcome = "error"
+    try:
+        queued_at = time.perf_counter()
+        async with session_admission.slot(client_id, on_wait):
+            waited = time.perf_counter() - queued_at
+            stage_seconds.observe(waited, "admission")
+            record_span("admission", queued_at, waited)
+            with span("session", stage_seconds, ("session",)):
+                await _council_session(question, send)
+            outcome = "completed"
+    except OverloadedError as e:
+        outcome = "rejected"
+        await send({
+            "type": "council_rejected",
+            "message": str(e),
+            "retry_after": e.retry_after
+        })
+    except asyncio.CancelledError:
+        outcome = "cancelled"
+        cancellation_metrics.sessions_cancelled += 1
+        raise
+    except Exception as e:
+        print(f"Council session error: {e}")
+    finally:
+        sessions_total.inc(outcome)
+        tracer.finish(trace, outcome)
+
+
+async def _council_session(question: str, send):
+    """Fan-out, peer ranking, synthesis and archive for an admitted session"""
+    synthesis_started = False
+    trace_id = current_trace.get().trace_id if current_trace.get() else None
+    try:
+        await send({
+            "type": "council_started",
+            "message": f"Council convened to discuss: {question[:100]}...",
+            "trace_id": trace_id
+        })
+        
+        # Gather responses from all council members concurrently
+        with span("members", stage_seconds, ("members",)):
+            responses = await council_executor.run(question, AI_COUNCIL[:-1], send)  # Skip the Strategist for now
+        
+        # Peer ranking
+        await send({
+            "type": "ranking_started",
+            "message": "Council members are ranking each other's insights..."
+        })
+        with span("ranking", stage_seconds, ("ranking",)):
+            ranking = await ranking_stage.run(question, responses)
+        await send({
+            "type": "ranking_complete",
+            "data": ranking
+        })
+        
+        # Synthesize responses
+        synthesis_started = True
+        await send({
+            "type": "synthesis_started",
+            "message": "Synthesizing council insights..."
+        })
+        
+        async def on_synthesis_token(chunk: str):
+            await send({"type": "synthesis_token", "data": chunk})
+
+        with span("synthesis", stage_seconds, ("synthesis",)):
+            synthesis = await synthesize_responses(
+                question, responses, rankings_text=format_rankings(ranking), on_token=on_synthesis_token
+            )
+        
+        await send({
+            "type": "synthesis_complete",
+            "data": synthesis
+        })
+        
+        # Save to database
+        entry = await conversation_db.add_conversation(
+            question=question,
+            responses=responses,
+            synthesis=synthesis,
+            rankings=ranking["rankings"]
+        )
+        
+        await send({
+            "type": "council_complete",
+            "message": f"Council session #{entry['id']} complete!",
+            "trace_id": trace_id
+        })
+    except asyncio.CancelledError:
+        if not synthesis_started:
+            cancellation_metrics.record_skipped()
+        raise
+
+
 @app.websocket("/ws")
 async def websocket_endpoint(websocket: WebSocket):
     await manager.connect(websocket)
+
+    async def send(message: dict):
+        await manager.send(websocket, message)
+
+    council_session: Optional[asyncio.Task] = None
+    # News requests also run as tasks, one per kind; a newer request replaces an older one
+    news_tasks: Dict[str, asyncio.Task] = {}
+    # Quotas are per remote address, so several tabs from one user share them
+    client_id = websocket.client.host if websocket.client else "unknown"
+
+    async def send_news_sentiment(topic: str):
+        sentiment_data = await sentiment_scheduler.get_summary(topic)
+        if sentiment_data:
+            await send({
+                "type": "news_sentiment",
+                "data": sentiment_data
+            })
+        else:
+            await send({
+                "type": "news_error",
+                "message": f"Unable to fetch news for {topic}"
+            })
+
+    async def send_news_batch(topics: List[str]):
+        try:
+            batch = await sentiment_scheduler.get_summaries(topics)
+        except ValueError as e:
+            await send({"type": "news_error", "message": str(e)})
+        else:
+            manager.subscribe(websocket, batch["results"].keys())
+            await send({"type": "news_sentiment_batch", "data": batch})
+
+    def run_news(kind: str, coro):
+        previous = news_tasks.get(kind)
+        if previous is not None and not previous.done():
+            previous.cancel()
+        news_tasks[kind] = asyncio.create_task(coro)
     
     # Send initial status
-    await websocket.send_json({
+    await send({
         "type": "model_status",
-        "data": [{"name": m["name"], "specialty": m["specialty"], "online": True} for m in AI_COUNCIL]
+        "data": model_health.status()
     })
     
     try:
@@ -444,123 +3951,396 @@ async def websocket_endpoint(websocket: WebSocket):
                 question = data.get("question", "")
                 
                 if not question:
-                    await websocket.send_json({
+                    await send({
                         "type": "error",
                         "message": "Please provide a question for the council."
                     })
                     continue
                 
-                await websocket.send_json({
-                    "type": "council_started",
-                    "message": f"Council convened to discuss: {question[:100]}..."
-                })
+                if council_session is not None and not council_session.done():
+                    await send({
+                        "type": "error",
+                        "message": "A council session is already running. Cancel it or wait for it to finish."
+                    })
+                    continue
                 
-                # Gather responses from all council members
-                responses = []
-                for model in AI_COUNCIL[:-1]:  # Skip the Strategist for now
-                    await websocket.send_json({
-                        "type": "model_thinking",
-                        "model_id": model["id"],
-                        "model_name": model["name"]
+                # Run the session as its own task so this loop keeps reading
+                # and can react to cancel_council or a disconnect
+                council_session = asyncio.create_task(run_council_session(question, send, client_id))
+            
+            elif data.get("action") == "cancel_council":
+                if council_session is not None and not council_session.done():
+                    council_session.cancel()
+                    await asyncio.gather(council_session, return_exceptions=True)
+                    await send({
+                        "type": "council_cancelled",
+                        "message": "Council session cancelled."
                     })
-                    
-                    response = await get_council_response(model, question)
-                    responses.append(response)
-                    
-                    await websocket.send_json({
-                        "type": "model_response",
-                        "data": response
+                else:
+                    await send({
+                        "type": "error",
+                        "message": "No council session is running."
                     })
-                
-                # Synthesize responses
-                await websocket.send_json({
-                    "type": "synthesis_started",
-                    "message": "Synthesizing council insights..."
-                })
-                
-                synthesis = await synthesize_responses(question, responses)
-                
-                await websocket.send_json({
-                    "type": "synthesis_complete",
-                    "data": synthesis
-                })
-                
-                # Save to database
-                conversation_db.add_conversation(
-                    question=question,
-                    responses=responses,
-                    synthesis=synthesis
-                )
-                
-                await websocket.send_json({
-                    "type": "council_complete",
-                    "message": f"Council session #{conversation_db.get_conversation_count()} complete!"
-                })
             
             elif data.get("action") == "get_news_sentiment":
                 topic = data.get("topic", "Bitcoin")
-                await websocket.send_json({
+                await send({
                     "type": "news_fetching",
                     "message": f"Fetching news sentiment for {topic}..."
                 })
                 
-                news_agent = NewsAgent(topic)
-                sentiment_data = news_agent.get_sentiment_summary()
-                
-                if sentiment_data:
-                    await websocket.send_json({
-                        "type": "news_sentiment",
-                        "data": sentiment_data
-                    })
-                else:
-                    await websocket.send_json({
-                        "type": "news_error",
-                        "message": f"Unable to fetch news for {topic}"
-                    })
+                manager.subscribe(websocket, [topic], replace=True)
+                # Fetching can take a while; keep reading (cancel_council etc.) meanwhile
+                run_news("topic", send_news_sentiment(topic))
+            
+            elif data.get("action") == "get_news_sentiment_batch":
+                topics = data.get("topics")
+                topics = [t for t in topics if isinstance(t, str)] if isinstance(topics, list) else []
+                run_news("batch", send_news_batch(topics))
+
+            elif data.get("action") == "subscribe_sentiment":
+                manager.subscribe(websocket, data.get("topics", []))
+                for topic in data.get("topics", []):
+                    snapshot = sentiment_scheduler.latest(topic)
+                    if snapshot:
+                        await send({"type": "news_sentiment", "data": snapshot})
+            
+            elif data.get("action") == "unsubscribe_sentiment":
+                manager.unsubscribe(websocket, data.get("topics", []))
+            
+            elif data.get("action") == "subscribe_quotes":
+                if not quote_aggregator.enabled:
+                    await send({"type": "quotes_unavailable"})
+                    continue
+                symbols = data.get("symbols") or quote_aggregator.symbols
+                manager.subscribe_quotes(websocket, symbols)
+                # Start the client off with everything cached; later frames carry changes only
+                await send({"type": "quotes", "data": quote_aggregator.snapshot(symbols)})
+            
+            elif data.get("action") == "unsubscribe_quotes":
+                manager.subscribe_quotes(websocket, [])
             
             elif data.get("action") == "clear_history":
-                conversation_db.clear_history()
-                await websocket.send_json({
+                await conversation_db.clear_history()
+                await send({
                     "type": "history_cleared",
                     "message": "Conversation history has been cleared."
                 })
                 
     except WebSocketDisconnect:
+        pass
+    finally:
         manager.disconnect(websocket)
+        # Nobody is listening any more; stop spending model time on this session
+        pending = [task for task in (council_session, *news_tasks.values()) if task is not None and not task.done()]
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
 
 
 # Health check endpoint
 @app.get("/api/health")
 async def health_check():
-    return {"status": "healthy", "timestamp": datetime.now().isoformat()}
+    return {
+        "status": "healthy",
+        "timestamp": datetime.now().isoformat(),
+        "websockets": manager.stats(),
+        "state": state_backend.stats()
+    }
+
+
+# Paginated council history (newest first)
+@app.get("/api/history")
+async def get_history(before_id: Optional[int] = None, limit: int = 20,
+                      since: Optional[str] = None, until: Optional[str] = None):
+    limit = max(1, min(limit, 100))
+    entries = await conversation_db.get_history(before_id=before_id, limit=limit, since=since, until=until)
+    return {
+        "conversations": entries,
+        "next_before_id": entries[-1]["id"] if len(entries) == limit else None
+    }
+
+
+@app.get("/api/history/{conversation_id}")
+async def get_history_entry(conversation_id: int):
+    entry = await conversation_db.get_conversation(conversation_id)
+    if entry:
+        return entry
+    return {"error": f"Conversation {conversation_id} not found"}
+
+
+# Council cancellation statistics
+@app.get("/api/council/stats")
+async def council_stats():
+    return {
+        "cancellation": cancellation_metrics.stats(),
+        "admission": session_admission.stats(),
+        "model_calls": model_call_budget.stats(),
+        "models": model_health.status(),
+        "prompt_compaction": {
+            "synthesis": synthesis_compactor.stats(),
+            "context": context_compactor.stats()
+        }
+    }
+
+
+# Model response cache statistics
+@app.get("/api/cache")
+async def cache_stats():
+    return {**response_cache.stats(), "static": static_assets.stats()}
+
+
+# Sentiment for several topics at once: /api/news?topics=Bitcoin,Ethereum,Solana
+@app.get("/api/news")
+async def get_news_sentiment_batch(topics: str = ""):
+    try:
+        return await sentiment_scheduler.get_summaries(topics.split(","))
+    except ValueError as e:
+        return {"error": str(e)}
 
 
 # News sentiment endpoint
 @app.get("/api/news/{topic}")
 async def get_news_sentiment(topic: str = "Bitcoin"):
-    news_agent = NewsAgent(topic)
-    sentiment_data = news_agent.get_sentiment_summary()
+    sentiment_data = await sentiment_scheduler.get_summary(topic)
     
     if sentiment_data:
         return sentiment_data
     return {"error": f"Unable to fetch news for {topic}"}
 
 
-# Serve static files
-app.mount("/static", StaticFiles(directory=SCRIPT_DIR), name="static")
+# Sentiment trend for a topic: rolling-window means and deltas, optionally a bucketed series
+@app.get("/api/news/{topic}/history")
+async def get_sentiment_history(topic: str, windows: str = "1h,24h,7d", span: str = "", bucket: int = 3600):
+    names = [w.strip() for w in windows.split(",") if w.strip()]
+    unknown = [w for w in names + ([span] if span else []) if w not in SENTIMENT_HISTORY_WINDOWS]
+    if unknown:
+        return {"error": f"Unknown window: {', '.join(unknown)} (use {', '.join(SENTIMENT_HISTORY_WINDOWS)})"}
+    result = {"topic": topic, "windows": sentiment_history.aggregates(topic, names)}
+    if span:
+        result["series"] = sentiment_history.series(topic, SENTIMENT_HISTORY_WINDOWS[span], max(60, bucket))
+    return result
+
+
+# Latest server-side quotes (the same cache pushed over the WebSocket)
+@app.get("/api/quotes")
+async def get_quotes(symbols: Optional[str] = None):
+    wanted = [s.strip() for s in symbols.split(",") if s.strip()] if symbols else None
+    return {"quotes": quote_aggregator.snapshot(wanted), "stats": quote_aggregator.stats()}
+
+
+# Prometheus text exposition of the stage metrics
+@app.get("/api/metrics")
+async def get_metrics():
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+
+# Recent council session traces, and the span breakdown of one
+@app.get("/api/traces")
+async def get_traces(limit: int = 20):
+    return {"traces": tracer.recent(max(1, min(limit, TRACE_MAX)))}
+
+
+@app.get("/api/traces/{trace_id}")
+async def get_trace(trace_id: str):
+    trace = tracer.get(trace_id)
+    if trace:
+        return trace
+    return {"error": f"Trace {trace_id} not found"}
+
+
+# Candles with indicator series in one columnar payload
+@app.get("/api/candles/{symbol}")
+async def get_candles(symbol: str, resolution: str = "D", start: Optional[int] = None, end: Optional[int] = None,
+                      indicators: str = CANDLE_DEFAULT_INDICATORS, limit: int = 5000):
+    if resolution not in CANDLE_HISTORY_SECONDS:
+        return {"error": f"Unsupported resolution: {resolution}"}
+    try:
+        specs = [parse_indicator(spec) for spec in indicators.split(",") if spec.strip()]
+    except ValueError as e:
+        return {"error": str(e)}
+    series = await candle_store.get(symbol, resolution)
+    return {
+        "symbol": symbol,
+        "resolution": resolution,
+        **candle_store.payload(series, specs, start, end, max(1, min(limit, CANDLE_MAX_BARS)))
+    }
 
 
+# ======== Static Assets ========
+# Frontend files served from memory; anything not listed here is a 404
+STATIC_ASSETS = [
+    name.strip() for name in os.environ.get("STATIC_ASSETS", "index.html,app.js,styles.css").split(",")
+    if name.strip()
+]
+STATIC_HOT_RELOAD = os.environ.get("STATIC_HOT_RELOAD", "0") == "1"
+STATIC_RELOAD_CHECK_INTERVAL = 1.0
+STATIC_MIN_COMPRESS_BYTES = 512
+STATIC_CONTENT_TYPES = {
+    ".html": "text/html; charset=utf-8",
+    ".js": "application/javascript; charset=utf-8",
+    ".css": "text/css; charset=utf-8",
+    ".json": "application/json",
+    ".svg": "image/svg+xml",
+    ".ico": "image/x-icon",
+    ".png": "image/png"
+}
+
+
+class StaticAsset:
+    """One allow-listed file with its precompressed variants and validators"""
+
+    def __init__(self, name: str, body: bytes, mtime: float):
+        self.name = name
+        self.mtime = mtime
+        self.content_type = STATIC_CONTENT_TYPES.get(os.path.splitext(name)[1], "application/octet-stream")
+        self.version = hashlib.sha256(body).hexdigest()[:16]
+        self.variants: Dict[str, bytes] = {"identity": body}
+        if len(body) >= STATIC_MIN_COMPRESS_BYTES:
+            compressed = gzip.compress(body, compresslevel=9, mtime=0)
+            if len(compressed) < len(body):
+                self.variants["gzip"] = compressed
+            if brotli is not None:
+                compressed = brotli.compress(body, quality=11)
+                if len(compressed) < len(body):
+                    self.variants["br"] = compressed
+
+    def etag(self, encoding: str) -> str:
+        return f'"{self.version}"' if encoding == "identity" else f'"{self.version}-{encoding}"'
+
+
+class StaticAssetCache:
+    """Allow-listed frontend files loaded once and served from memory.
+
+    Each file is read at startup and kept with gzip (and brotli, when the
+    module is installed) variants. Responses carry strong per-encoding ETags,
+    and conditional requests get a bare 304. ``index.html`` is rewritten so
+    its script and stylesheet URLs include a content version; those versioned
+    URLs are cached as immutable, while the HTML itself is always revalidated.
+    With hot reload on, files are re-read when their mtime changes.
+    """
+
+    def __init__(self, directory: str = SCRIPT_DIR, names: List[str] = STATIC_ASSETS,
+                 hot_reload: bool = STATIC_HOT_RELOAD):
+        self.directory = directory
+        self.names = list(names)
+        self.hot_reload = hot_reload
+        self.assets: Dict[str, StaticAsset] = {}
+        self._checked_at = 0.0
+        self.not_modified = 0
+
+    def load(self):
+        assets = {}
+        for name in self.names:
+            path = os.path.join(self.directory, name)
+            try:
+                with open(path, "rb") as f:
+                    assets[name] = (f.read(), os.path.getmtime(path))
+            except OSError as e:
+                print(f"Static asset {name} unavailable: {e}")
+        # Version the other assets first so the HTML can reference them
+        versions = {}
+        for name, (body, mtime) in assets.items():
+            if not name.endswith(".html"):
+                self.assets[name] = StaticAsset(name, body, mtime)
+                versions[name] = self.assets[name].version
+        for name, (body, mtime) in assets.items():
+            if name.endswith(".html"):
+                self.assets[name] = StaticAsset(name, self._versioned(body, versions), mtime)
+        for name in set(self.assets) - set(assets):
+            del self.assets[name]
+        self._checked_at = time.monotonic()
+
+    @staticmethod
+    def _versioned(html: bytes, versions: Dict[str, str]) -> bytes:
+        text = html.decode("utf-8")
+        for name, version in versions.items():
+            text = re.sub(r'((?:src|href)=")' + re.escape(name) + r'(")', rf"\g<1>{name}?v={version}\g<2>", text)
+        return text.encode("utf-8")
+
+    def _reload_if_changed(self):
+        if time.monotonic() - self._checked_at < STATIC_RELOAD_CHECK_INTERVAL:
+            return
+        self._checked_at = time.monotonic()
+        for name in self.names:
+            try:
+                mtime = os.path.getmtime(os.path.join(self.directory, name))
+            except OSError:
+                mtime = None
+            asset = self.assets.get(name)
+            if (asset.mtime if asset else None) != mtime:
+                self.load()
+                return
+
+    @staticmethod
+    def _accepted(header: str) -> set:
+        accepted = set()
+        for part in header.split(","):
+            coding, _, params = part.strip().partition(";")
+            params = params.strip()
+            try:
+                weight = float(params[2:]) if params.startswith("q=") else 1.0
+            except ValueError:
+                weight = 1.0
+            if weight > 0:
+                accepted.add(coding.strip().lower())
+        return accepted
+
+    def response(self, request: Request, name: str) -> Response:
+        if self.hot_reload:
+            self._reload_if_changed()
+        asset = self.assets.get(name)
+        if asset is None:
+            return JSONResponse({"error": "File not found"}, status_code=404)
+
+        accepted = self._accepted(request.headers.get("accept-encoding", ""))
+        encoding = next((e for e in ("br", "gzip") if e in asset.variants and e in accepted), "identity")
+        if name.endswith(".html") or request.query_params.get("v") != asset.version:
+            cache_control = "no-cache"
+        else:
+            cache_control = "public, max-age=31536000, immutable"
+        headers = {"ETag": asset.etag(encoding), "Cache-Control": cache_control, "Vary": "Accept-Encoding"}
+
+        # Any variant's tag names the same content, so it validates this response too
+        if_none_match = request.headers.get("if-none-match", "")
+        if if_none_match:
+            tags = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+            if "*" in tags or tags & {asset.etag(e) for e in asset.variants}:
+                self.not_modified += 1
+                return Response(status_code=304, headers=headers)
+
+        if encoding != "identity":
+            headers["Content-Encoding"] = encoding
+        return Response(asset.variants[encoding], media_type=asset.content_type, headers=headers)
+
+    def stats(self) -> dict:
+        return {
+            "assets": {
+                name: {encoding: len(body) for encoding, body in asset.variants.items()}
+                for name, asset in self.assets.items()
+            },
+            "not_modified": self.not_modified,
+            "hot_reload": self.hot_reload
+        }
+
+
+static_assets = StaticAssetCache()
+
+
+# Serve static files
 @app.get("/")
-async def root():
-    return FileResponse(os.path.join(SCRIPT_DIR, "index.html"))
+async def root(request: Request):
+    return static_assets.response(request, "index.html")
+
+
+@app.get("/static/{filename}")
+async def serve_static_file(request: Request, filename: str):
+    return static_assets.response(request, filename)
 
 
 @app.get("/{filename}")
-async def serve_file(filename: str):
-    filepath = os.path.join(SCRIPT_DIR, filename)
-    if os.path.exists(filepath):
-        return FileResponse(filepath)
-    return {"error": "File not found"}
+async def serve_file(request: Request, filename: str):
+    return static_assets.response(request, filename)
 
 
 if __name__ == "__main__":
@@ -578,4 +4358,11 @@ if __name__ == "__main__":
     print("    - WebSocket: ws://localhost:8000/ws")
     print("    - Health: http://localhost:8000/api/health")
     print("\n" + "=" * 60 + "\n")
-    uvicorn.run(app, host="0.0.0.0", port=8000)
+    # WEB_WORKERS > 1 runs several processes; pair it with STATE_BACKEND=shared
+    workers = int(os.environ.get("WEB_WORKERS", "1"))
+    if workers > 1 and STATE_BACKEND != "shared":
+        print("  Note: without STATE_BACKEND=shared each worker keeps its own history\n")
+    if workers > 1:
+        uvicorn.run("server:app", host="0.0.0.0", port=8000, workers=workers, app_dir=SCRIPT_DIR)
+    else:
+        uvicorn.run(app, host="0.0.0.0", port=8000)